@@ -0,0 +1 @@
+"""Motor de procesamiento para el dashboard de Islas de Calor Urbano (ICU)."""
@@ -0,0 +1,96 @@
+# --------------------------------------------------------------
+# batch.py — Agrupación de consultas escalares a GEE
+# Junta los valores que necesita un panel en un solo ee.Dictionary
+# y lo resuelve con un único getInfo(). Cada consulta bloqueante
+# queda medida (tiempo, bytes) en la traza del render (icu.tracing).
+# --------------------------------------------------------------
+
+import ee
+
+from icu.tracing import KIND_GEE, current_trace, payload_size, span
+
+
+class LiveGee:
+    """Las tres consultas bloqueantes, contra Earth Engine real."""
+
+    def get_info(self, ee_object):
+        return ee_object.getInfo()
+
+    def get_map_id(self, image, vis_params):
+        return image.getMapId(vis_params)
+
+    def compute_pixels(self, params):
+        return ee.data.computePixels(params)
+
+
+# Destino de las consultas, compartido por todo el proceso (icu.replay lo cambia
+# por un grabador o por respuestas grabadas)
+_gee = LiveGee()
+
+
+def get_gee():
+    return _gee
+
+
+def set_gee(backend=None):
+    """Cambia el destino de las consultas; None vuelve a Earth Engine real."""
+    global _gee
+    _gee = backend or LiveGee()
+
+
+def round_trips():
+    """Viajes de ida y vuelta a GEE del render actual (según su traza)."""
+    trace = current_trace()
+    return trace.round_trips if trace else 0
+
+
+def get_info(ee_object):
+    """getInfo() medido. Todas las consultas bloqueantes deben pasar por aquí."""
+    with span("getInfo", KIND_GEE) as info:
+        result = _gee.get_info(ee_object)
+        info.bytes = payload_size(result)
+    return result
+
+
+def get_map_id(image, vis_params):
+    """getMapId() medido (también es un viaje bloqueante a GEE)."""
+    with span("getMapId", KIND_GEE) as info:
+        result = _gee.get_map_id(image, vis_params)
+        info.bytes = payload_size({k: v for k, v in result.items() if k != "tile_fetcher"})
+    return result
+
+
+def compute_pixels(image, grid, file_format="NUMPY_NDARRAY"):
+    """ee.data.computePixels() medido: la imagen como arreglo en la malla `grid` (dict de GEE)."""
+    with span("computePixels", KIND_GEE) as info:
+        result = _gee.compute_pixels({"expression": image, "fileFormat": file_format, "grid": grid})
+        info.bytes = payload_size(result)
+    return result
+
+
+class RequestBatch:
+    def __init__(self):
+        self._pending = {}
+
+    def __len__(self):
+        return len(self._pending)
+
+    def add(self, name, value):
+        self._pending[name] = value
+        return self
+
+    def resolve(self):
+        """Evalúa todos los valores pendientes en un solo viaje a GEE."""
+        if not self._pending:
+            return {}
+        result = get_info(ee.Dictionary(self._pending))
+        self._pending = {}
+        return result
+
+
+def when_not_empty(count, value):
+    """Evalúa `value` en el servidor solo si la colección tiene imágenes (si no, null).
+
+    Evita que un compuesto vacío haga fallar todo el diccionario del lote.
+    """
+    return ee.Algorithms.If(ee.Number(count).gt(0), value, None)
@@ -0,0 +1,290 @@
+# --------------------------------------------------------------
+# benchmark.py — Banco de pruebas de los paneles, sin navegador
+# Renderiza cada panel de main.py con streamlit.testing (AppTest) para
+# cada localidad y reporta consultas a GEE, bytes, tiempo de pared y
+# memoria pico por render (de las trazas de icu.tracing). Normalmente
+# corre contra una grabación (icu.replay), sin red; con --baseline
+# marca regresiones respecto a una corrida guardada.
+#
+#   python -m icu.benchmark --record grabacion/            (GEE real; graba las respuestas)
+#   python -m icu.benchmark --replay grabacion/ --latency 0.2 --jitter 0.05
+#   python -m icu.benchmark --replay grabacion/ --baseline bench.json --save-baseline
+#
+# Con --startup mide el arranque en frío de cada opción del menú (un
+# proceso nuevo por panel: importaciones + primer render) y el costo de
+# un rerun ya con todo cargado, además de qué módulos pesados cargó:
+#
+#   python -m icu.benchmark --startup --backend "Local (GeoTIFF)" --baseline arranque.json
+# --------------------------------------------------------------
+
+import argparse
+import datetime as dt
+import importlib
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+import numpy as np
+
+from icu.localities import load_locality_index
+from tablero.panels import PANELS as MENU
+
+MAIN = Path(__file__).resolve().parents[1] / "main.py"
+PANELS = ("Mapas", "Gráficas", "Comparativa", "Descargas")
+# Importaciones caras que el arranque no debería pagar si el panel no las usa
+HEAVY_MODULES = ("ee", "folium", "branca", "streamlit_folium", "altair", "pandas")
+RERUNS = 5
+# Periodo por defecto del tablero
+PERIOD = (dt.date(2024, 4, 1), dt.date(2024, 5, 30))
+# Una corrida es regresión si supera la línea base en más de TOLERANCE (fracción)
+# y además por más de MIN_SECONDS / MIN_MB (para no marcar ruido en renders rápidos)
+TOLERANCE = 0.25
+MIN_SECONDS = 0.25
+MIN_MB = 1.0
+MIN_RERUN_SECONDS = 0.02
+
+
+@dataclass
+class Result:
+    panel: str
+    locality: str
+    elapsed: float
+    round_trips: int
+    gee_bytes: int
+    peak_mb: float      # pico del render sobre lo ya asignado
+    errors: list = field(default_factory=list)
+
+    @property
+    def key(self):
+        return f"{self.panel}|{self.locality}"
+
+
+@dataclass
+class StartupResult:
+    panel: str
+    cold: float         # proceso nuevo: importaciones + primer render
+    rerun: float        # mediana de los reruns siguientes, con todo importado
+    modules: list = field(default_factory=list)
+    errors: list = field(default_factory=list)
+
+    @property
+    def key(self):
+        return f"arranque|{self.panel}"
+
+
+def _last_render(trace_file):
+    lines = trace_file.read_text(encoding="utf-8").splitlines()
+    return json.loads(lines[-1]) if lines else {}
+
+
+def run_locality(name, panels, period, backend, trace_file, timeout=300, other="Villahermosa"):
+    """Renderiza los paneles de una localidad en una misma sesión (como un usuario que cambia de pestaña)."""
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(str(MAIN), default_timeout=timeout)
+    at.session_state["locality"] = name
+    at.session_state["date_range"] = period
+    at.session_state["backend"] = backend
+    at.session_state["compare_cities"] = [name, other if other != name else "Teapa"]
+    # Mapas sin pintado progresivo: el render mide todas las capas, no solo la primera pintura
+    at.session_state["map_progressive"] = False
+    results = []
+    for i, panel in enumerate(PANELS):
+        if panel not in panels and i > 0:
+            continue
+        # Memoria pico del render por encima de lo que ya estaba asignado antes
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        if i == 0:
+            at.run()    # el primer render siempre es Mapas (valor inicial del menú)
+        else:
+            at.sidebar.radio[0].set_value(panel).run()
+        peak = (tracemalloc.get_traced_memory()[1] - before) / 2**20
+        if panel not in panels:
+            continue
+        render = _last_render(trace_file)
+        errors = [str(e.value) for e in at.exception] + [str(e.value) for e in at.error]
+        results.append(Result(panel, name, render.get("elapsed") or 0.0, render.get("round_trips", 0),
+                              render.get("gee_bytes", 0), round(peak, 1), errors))
+    return results
+
+
+def startup_child(panel, backend, reruns, timeout):
+    """Corre en un proceso nuevo: primer render del panel y reruns (streamlit ya importado, como en el servidor)."""
+    from streamlit.testing.v1 import AppTest
+
+    t0 = time.perf_counter()
+    at = AppTest.from_file(str(MAIN), default_timeout=timeout)
+    at.session_state["menu"] = panel
+    at.session_state["backend"] = backend
+    at.session_state["map_progressive"] = False
+    at.run()
+    cold = time.perf_counter() - t0
+    times = []
+    for _ in range(reruns):
+        t0 = time.perf_counter()
+        at.run()
+        times.append(time.perf_counter() - t0)
+    errors = [str(e.value) for e in at.exception] + [str(e.value) for e in at.error]
+    return StartupResult(panel, round(cold, 3), round(statistics.median(times), 4),
+                         [m for m in HEAVY_MODULES if m in sys.modules], errors)
+
+
+def run_startup(panels, backend, reruns=RERUNS, timeout=300):
+    """Arranque en frío y rerun de cada panel, cada uno en su propio proceso y con cachés vacías."""
+    results = []
+    for panel in panels:
+        print(f"[arranque] {panel}", file=sys.stderr)
+        env = {**os.environ, "ICU_CACHE_DIR": tempfile.mkdtemp(prefix="icu-arranque-")}
+        out = subprocess.run(
+            [sys.executable, "-m", "icu.benchmark", "--startup-child", panel, "--backend", backend,
+             "--reruns", str(reruns), "--timeout", str(timeout)],
+            cwd=MAIN.parent, env=env, capture_output=True, text=True, check=True)
+        results.append(StartupResult(**json.loads(out.stdout.strip().splitlines()[-1])))
+    return results
+
+
+def compare_startup(results, baseline, tolerance=TOLERANCE):
+    """Mensajes de regresión del arranque: más tiempo en frío o por rerun, o módulos pesados nuevos."""
+    regressions = []
+    for r in results:
+        base = baseline.get(r.key)
+        if not base:
+            continue
+        if r.cold > base["cold"] * (1 + tolerance) and r.cold - base["cold"] > MIN_SECONDS:
+            regressions.append(f"{r.key}: arranque {base['cold']:.2f} s -> {r.cold:.2f} s")
+        if r.rerun > base["rerun"] * (1 + tolerance) and r.rerun - base["rerun"] > MIN_RERUN_SECONDS:
+            regressions.append(f"{r.key}: rerun {base['rerun'] * 1000:.0f} ms -> {r.rerun * 1000:.0f} ms")
+        new = sorted(set(r.modules) - set(base["modules"]))
+        if new:
+            regressions.append(f"{r.key}: importa {', '.join(new)}")
+        if r.errors and not base.get("errors"):
+            regressions.append(f"{r.key}: errores nuevos: {'; '.join(r.errors)}")
+    return regressions
+
+
+def summarize_startup(results):
+    lines = [f"{'Panel':<12} {'frío s':>7} {'rerun ms':>9}  módulos pesados"]
+    for r in results:
+        lines.append(f"{r.panel:<12} {r.cold:7.2f} {r.rerun * 1000:9.0f}  {', '.join(r.modules) or '—'}"
+                     + (f"  ({len(r.errors)} errores)" if r.errors else ""))
+    return "\n".join(lines)
+
+
+def compare(results, baseline, tolerance=TOLERANCE):
+    """Mensajes de regresión: más consultas a GEE que la línea base, o más tiempo / memoria."""
+    regressions = []
+    for r in results:
+        base = baseline.get(r.key)
+        if not base:
+            continue
+        if r.round_trips > base["round_trips"]:
+            regressions.append(f"{r.key}: consultas a GEE {base['round_trips']} -> {r.round_trips}")
+        if r.elapsed > base["elapsed"] * (1 + tolerance) and r.elapsed - base["elapsed"] > MIN_SECONDS:
+            regressions.append(f"{r.key}: tiempo {base['elapsed']:.2f} s -> {r.elapsed:.2f} s")
+        if r.peak_mb > base["peak_mb"] * (1 + tolerance) and r.peak_mb - base["peak_mb"] > MIN_MB:
+            regressions.append(f"{r.key}: memoria pico {base['peak_mb']:.1f} MB -> {r.peak_mb:.1f} MB")
+        if r.errors and not base.get("errors"):
+            regressions.append(f"{r.key}: errores nuevos: {'; '.join(r.errors)}")
+    return regressions
+
+
+def summarize(results):
+    """Tabla por render y resumen p50/p95 por panel."""
+    lines = [f"{'Panel':<12} {'Localidad':<28} {'s':>7} {'GEE':>5} {'kB':>8} {'MB':>7}  errores"]
+    for r in results:
+        lines.append(f"{r.panel:<12} {r.locality[:28]:<28} {r.elapsed:7.2f} {r.round_trips:5d} "
+                     f"{r.gee_bytes / 1024:8.0f} {r.peak_mb:7.1f}  {len(r.errors) or ''}")
+    lines.append("")
+    for panel in dict.fromkeys(r.panel for r in results):
+        times = [r.elapsed for r in results if r.panel == panel]
+        lines.append(f"{panel:<12} p50 {np.percentile(times, 50):.2f} s · p95 {np.percentile(times, 95):.2f} s "
+                     f"· {sum(r.round_trips for r in results if r.panel == panel)} consultas")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de los paneles del tablero (render sin navegador).")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--replay", type=Path, help="Grabación de la que se responden las consultas")
+    source.add_argument("--record", type=Path, help="Graba las respuestas de GEE real en este directorio")
+    parser.add_argument("--latency", type=float, help="Latencia inyectada por consulta (s); por defecto la grabada")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Variación ± uniforme de la latencia (s)")
+    parser.add_argument("--localities", nargs="+", help="NOMGEO (por defecto todas)")
+    parser.add_argument("--panels", nargs="+", choices=PANELS, default=list(PANELS))
+    parser.add_argument("--start", type=dt.date.fromisoformat, default=PERIOD[0])
+    parser.add_argument("--end", type=dt.date.fromisoformat, default=PERIOD[1])
+    parser.add_argument("--backend", default="Earth Engine", help="Motor del tablero ('Local (GeoTIFF)' usa ICU_LANDSAT_DIR)")
+    parser.add_argument("--timeout", type=float, default=300, help="Segundos por render")
+    parser.add_argument("--baseline", type=Path, help="JSON con la línea base para detectar regresiones")
+    parser.add_argument("--save-baseline", action="store_true", help="Guarda esta corrida como línea base")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    parser.add_argument("--json", type=Path, help="Escribe los resultados en este archivo")
+    parser.add_argument("--startup", action="store_true",
+                        help="Mide arranque en frío y rerun de cada opción del menú (un proceso por panel)")
+    parser.add_argument("--reruns", type=int, default=RERUNS, help="Reruns por panel con --startup")
+    parser.add_argument("--startup-child", choices=list(MENU), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.startup_child:
+        result = startup_child(args.startup_child, args.backend, args.reruns, args.timeout)
+        print(json.dumps(asdict(result), ensure_ascii=False))
+        return 0
+
+    names = args.localities or load_locality_index().names()
+    workdir = Path(tempfile.mkdtemp(prefix="icu-bench-"))
+    trace_file = workdir / "trazas.jsonl"
+    trace_file.touch()
+    # Cachés en frío en cada corrida; las trazas de cada render van a un archivo propio
+    os.environ["ICU_CACHE_DIR"] = str(workdir / "cache")
+    os.environ["ICU_TRACE_FILE"] = str(trace_file)
+    if args.replay:
+        os.environ["ICU_GEE_REPLAY"] = str(args.replay)
+        if args.latency is not None:
+            os.environ["ICU_GEE_LATENCY"] = str(args.latency)
+        os.environ["ICU_GEE_JITTER"] = str(args.jitter)
+    elif args.record:
+        os.environ["ICU_GEE_RECORD"] = str(args.record)
+
+    if args.startup:
+        results = run_startup(list(MENU), args.backend, args.reruns, args.timeout)
+        print(summarize_startup(results))
+        check = compare_startup
+    else:
+        # Los paneles se importan antes de medir: su costo es del arranque (--startup), no del render
+        for module, _ in MENU.values():
+            importlib.import_module(f"tablero.panels.{module}")
+        tracemalloc.start()
+        results = []
+        for i, name in enumerate(names, start=1):
+            print(f"[{i}/{len(names)}] {name}", file=sys.stderr)
+            results += run_locality(name, args.panels, (args.start, args.end), args.backend, trace_file, args.timeout)
+        tracemalloc.stop()
+        print(summarize(results))
+        check = compare
+
+    records = {r.key: {k: v for k, v in asdict(r).items() if k not in ("panel", "locality")} for r in results}
+    if args.json:
+        args.json.write_text(json.dumps(records, ensure_ascii=False, indent=1), encoding="utf-8")
+    status = 0
+    if args.baseline and args.baseline.exists() and not args.save_baseline:
+        regressions = check(results, json.loads(args.baseline.read_text(encoding="utf-8")), args.tolerance)
+        print(f"\n{len(regressions)} regresiones respecto a {args.baseline}")
+        for message in regressions:
+            print(f"  ✘ {message}")
+        status = 1 if regressions else 0
+    if args.baseline and args.save_baseline:
+        args.baseline.write_text(json.dumps(records, ensure_ascii=False, indent=1), encoding="utf-8")
+        print(f"\nLínea base guardada en {args.baseline}")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
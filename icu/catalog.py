@@ -0,0 +1,278 @@
+# --------------------------------------------------------------
+# catalog.py — Catálogo local de metadatos de escenas Landsat
+# Fecha, CLOUD_COVER, path/row WRS-2, LANDSAT_PRODUCT_ID y huella de
+# cada escena que toca Tabasco, en SQLite. Se actualiza por tramos
+# (solo lo posterior a la última actualización, en un viaje a GEE) y
+# responde en memoria, sin red: cuántas escenas limpias hay para una
+# localidad y un periodo, las fechas limpias más cercanas y una huella
+# del conjunto de escenas que sirve como clave de caché. Si el periodo
+# no está cubierto la respuesta es None y se consulta a GEE como antes.
+# --------------------------------------------------------------
+
+import bisect
+import datetime as dt
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+
+# Mismos IDs que icu.landsat (aquí sin importar ee: el catálogo se lee en cada rerun)
+LC08 = "LANDSAT/LC08/C02/T1_L2"
+LC09 = "LANDSAT/LC09/C02/T1_L2"
+FIRST_DATE = {LC08: "2013-03-18", LC09: "2021-10-31"}
+# Las escenas se publican con días de retraso: el catálogo solo se declara completo
+# hasta SETTLE_DAYS antes de su última actualización (y desde ahí se vuelve a pedir)
+SETTLE_DAYS = 14
+MAX_AGE = 12 * 3600
+RETRY_AFTER = 10 * 60
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scenes (
+    product_id TEXT PRIMARY KEY,
+    collection TEXT NOT NULL,
+    date TEXT NOT NULL,
+    path INTEGER,
+    row INTEGER,
+    cloud_cover REAL,
+    footprint TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_scenes_date ON scenes (collection, date);
+CREATE TABLE IF NOT EXISTS meta (
+    collection TEXT PRIMARY KEY,
+    covered_until TEXT NOT NULL,
+    refreshed REAL NOT NULL
+);
+"""
+
+
+def _points_in_ring(points, ring):
+    """Máscara de los puntos (n, 2) dentro del anillo (regla par-impar, vectorizada)."""
+    x, y = points[:, 0:1], points[:, 1:2]
+    x0, y0, x1, y1 = ring[:-1, 0], ring[:-1, 1], ring[1:, 0], ring[1:, 1]
+    crosses = (y0 > y) != (y1 > y)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        x_int = x0 + (y - y0) * (x1 - x0) / (y1 - y0)
+    return np.count_nonzero(crosses & (x < x_int), axis=1) % 2 == 1
+
+
+def footprint_covers(footprint, locality):
+    """True si la huella de la escena toca la localidad (algún vértice de una dentro de la otra).
+
+    Las escenas (185 km) son mucho más grandes que cualquier localidad, así que
+    basta con los vértices; es lo que decide filterBounds en GEE.
+    """
+    min_lon, min_lat, max_lon, max_lat = locality.bbox
+    f_min, f_max = footprint.min(axis=0), footprint.max(axis=0)
+    if f_max[0] < min_lon or f_min[0] > max_lon or f_max[1] < min_lat or f_min[1] > max_lat:
+        return False
+    if _points_in_ring(np.vstack(locality.rings), footprint).any():
+        return True
+    return any(locality.contains(lon, lat) for lon, lat in footprint[:-1])
+
+
+def _ring(geometry):
+    """Anillo exterior (lon, lat) de la huella devuelta por GEE (Polygon o LinearRing)."""
+    coords = geometry["coordinates"]
+    ring = np.asarray(coords[0] if geometry["type"] == "Polygon" else coords, dtype=np.float64)
+    return ring if np.array_equal(ring[0], ring[-1]) else np.vstack([ring, ring[:1]])
+
+
+def fetch_metadata(bbox, windows):
+    """Metadatos de GEE de las ventanas [(colección, inicio, fin)] dentro de bbox, en un solo viaje."""
+    import ee
+
+    from icu.batch import RequestBatch
+
+    region = ee.Geometry.Rectangle(list(bbox))
+    batch = RequestBatch()
+    for i, (collection, start, end) in enumerate(windows):
+        col = ee.ImageCollection(collection).filterBounds(region).filterDate(start, end)
+        batch.add(str(i), col.map(lambda img: ee.Feature(img.geometry(), {
+            "product_id": img.get("LANDSAT_PRODUCT_ID"),
+            "date": img.date().format("YYYY-MM-dd"),
+            "path": img.get("WRS_PATH"),
+            "row": img.get("WRS_ROW"),
+            "cloud_cover": img.get("CLOUD_COVER"),
+        })))
+    result = batch.resolve()
+    return [(collection, feature) for i, (collection, _, _) in enumerate(windows)
+            for feature in result[str(i)]["features"]]
+
+
+class _Scene:
+    __slots__ = ("product_id", "collection", "date", "path", "row", "cloud_cover", "footprint")
+
+    def __init__(self, product_id, collection, date, path, row, cloud_cover, footprint):
+        self.product_id = product_id
+        self.collection = collection
+        self.date = date
+        self.path = path
+        self.row = row
+        self.cloud_cover = cloud_cover
+        self.footprint = np.asarray(json.loads(footprint), dtype=np.float64)
+
+
+class SceneCatalog:
+    """Metadatos de escenas en SQLite; las consultas se responden de una copia en memoria ordenada por fecha."""
+
+    def __init__(self, path, collections=(LC08,)):
+        self.path = Path(path)
+        self.collections = tuple(collections)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.error = None
+        self._lock = threading.Lock()
+        self._refreshing = threading.Lock()
+        self._last_attempt = 0.0
+        self._snapshot = None
+        self._snapshot_version = None
+        self._covers = {}
+        with closing(self._connect()) as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    # --- Copia en memoria ---
+
+    def _version(self):
+        # Sin WAL: cada escritura (de este proceso o de icu.precompute) cambia el archivo principal.
+        # El contador de cambios de la cabecera de SQLite cubre escrituras dentro del mismo
+        # tic de mtime que no cambian el tamaño
+        info = os.stat(self.path)
+        with open(self.path, "rb") as f:
+            header = f.read(28)
+        return info.st_mtime_ns, info.st_size, header[24:28]
+
+    def _load(self):
+        version = self._version()
+        with self._lock:
+            if self._snapshot is not None and self._snapshot_version == version:
+                return self._snapshot
+        with closing(self._connect()) as conn:
+            rows = conn.execute("SELECT product_id, collection, date, path, row, cloud_cover, footprint "
+                                "FROM scenes ORDER BY date, product_id").fetchall()
+            covered = dict(conn.execute("SELECT collection, covered_until FROM meta").fetchall())
+        scenes = [_Scene(*r) for r in rows]
+        snapshot = ([s.date for s in scenes], scenes, covered)
+        with self._lock:
+            self._snapshot, self._snapshot_version = snapshot, version
+        return snapshot
+
+    def _covered(self, collection, start, end):
+        _, _, covered = self._load()
+        until = covered.get(collection)
+        return until is not None and FIRST_DATE[collection] <= str(start) and str(end) <= until
+
+    def _touches(self, scene, locality):
+        key = (locality.name, scene.product_id)
+        hit = self._covers.get(key)
+        if hit is None:
+            hit = self._covers[key] = footprint_covers(scene.footprint, locality)
+        return hit
+
+    # --- Consultas (sin red) ---
+
+    def scenes(self, locality, start, end, max_clouds, collection=LC08):
+        """Escenas con CLOUD_COVER < max_clouds que tocan la localidad en [start, end), o None si no hay cobertura.
+
+        Mismo criterio que build_collection: filterBounds → filterDate → CLOUD_COVER.
+        """
+        if locality is None or not self._covered(collection, start, end):
+            return None
+        dates, scenes, _ = self._load()
+        lo, hi = bisect.bisect_left(dates, str(start)), bisect.bisect_left(dates, str(end))
+        return [s for s in scenes[lo:hi] if s.collection == collection and s.cloud_cover is not None
+                and s.cloud_cover < max_clouds and self._touches(s, locality)]
+
+    def count(self, locality, start, end, max_clouds, collection=LC08):
+        scenes = self.scenes(locality, start, end, max_clouds, collection)
+        return None if scenes is None else len(scenes)
+
+    def scene_key(self, locality, start, end, max_clouds, collection=LC08):
+        """Huella del conjunto de escenas: cambia solo si cambian las escenas (no las fechas pedidas)."""
+        scenes = self.scenes(locality, start, end, max_clouds, collection)
+        if scenes is None:
+            return None
+        ids = "\n".join(sorted(s.product_id for s in scenes))
+        return f"{collection}:{max_clouds}:" + hashlib.sha1(ids.encode("utf-8")).hexdigest()[:16]
+
+    def nearest(self, locality, start, end, max_clouds, collection=LC08):
+        """(fecha anterior, fecha posterior) de las escenas limpias más cercanas fuera de [start, end)."""
+        if locality is None or collection not in self._load()[2]:
+            return None, None
+        dates, scenes, _ = self._load()
+        lo, hi = bisect.bisect_left(dates, str(start)), bisect.bisect_left(dates, str(end))
+
+        def first(candidates):
+            return next((s.date for s in candidates if s.collection == collection and s.cloud_cover is not None
+                         and s.cloud_cover < max_clouds and self._touches(s, locality)), None)
+
+        return first(reversed(scenes[:lo])), first(scenes[hi:])
+
+    # --- Actualización (GEE) ---
+
+    def refresh(self, bbox, today=None, fetch=fetch_metadata):
+        """Pide a GEE lo posterior a la última actualización (por años, en un viaje) y lo guarda. Devuelve escenas nuevas."""
+        today = today or dt.date.today()
+        end = today + dt.timedelta(days=1)
+        with closing(self._connect()) as conn:
+            covered = dict(conn.execute("SELECT collection, covered_until FROM meta").fetchall())
+            known = {r[0] for r in conn.execute("SELECT product_id FROM scenes")}
+        windows = []
+        for collection in self.collections:
+            since = dt.date.fromisoformat(covered.get(collection, FIRST_DATE[collection]))
+            for year in range(since.year, end.year + 1):
+                lo, hi = max(since, dt.date(year, 1, 1)), min(end, dt.date(year + 1, 1, 1))
+                if lo < hi:
+                    windows.append((collection, lo.isoformat(), hi.isoformat()))
+        rows = []
+        for collection, feature in fetch(bbox, windows):
+            p = feature["properties"]
+            rows.append((p["product_id"], collection, p["date"], p.get("path"), p.get("row"), p.get("cloud_cover"),
+                         json.dumps(np.round(_ring(feature["geometry"]), 6).tolist())))
+        settled = (today - dt.timedelta(days=SETTLE_DAYS)).isoformat()
+        with closing(self._connect()) as conn, conn:
+            conn.executemany("INSERT OR REPLACE INTO scenes (product_id, collection, date, path, row, cloud_cover, "
+                             "footprint) VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            conn.executemany("INSERT OR REPLACE INTO meta (collection, covered_until, refreshed) VALUES (?, ?, ?)",
+                             [(c, max(settled, FIRST_DATE[c]), time.time()) for c in self.collections])
+        return len({r[0] for r in rows} - known)
+
+    def refresh_if_stale(self, bbox, max_age=MAX_AGE):
+        """refresh() si la última actualización tiene más de max_age s; un solo hilo a la vez, sin lanzar errores."""
+        with closing(self._connect()) as conn:
+            refreshed = conn.execute("SELECT MIN(refreshed) FROM meta").fetchone()[0]
+        stale = (refreshed is None or time.time() - refreshed > max_age
+                 or len(self._load()[2]) < len(self.collections))
+        if not stale or time.time() - self._last_attempt < RETRY_AFTER:
+            return None
+        if not self._refreshing.acquire(blocking=False):
+            return None
+        try:
+            self._last_attempt = time.time()
+            added = self.refresh(bbox)
+            self.error = None
+            return added
+        except Exception as e:
+            self.error = str(e)
+            return None
+        finally:
+            self._refreshing.release()
+
+    def status(self):
+        dates, scenes, covered = self._load()
+        return {"scenes": len(scenes), "covered_until": covered, "last": dates[-1] if dates else None,
+                "refreshing": self._refreshing.locked(), "error": self.error}
+
+
+@lru_cache(maxsize=None)
+def get_scene_catalog(path, collections=(LC08,)):
+    """Catálogo único por proceso (compartido por todas las sesiones de Streamlit)."""
+    return SceneCatalog(path, collections)
@@ -0,0 +1,242 @@
+# --------------------------------------------------------------
+# composites.py — Caché compartida de compuestos p50 entre paneles
+# Clave: (localidad, fecha inicial, fecha final, MAX_NUBES, bandas).
+# Nivel 1: LRU en memoria del proceso (compartido entre sesiones).
+# Nivel 2 (opcional): JSON en disco con TTL y límite de tamaño.
+# Antes de ambos se consulta el almacén de resultados precalculados
+# (icu.results), si existe.
+# --------------------------------------------------------------
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+
+from icu.batch import RequestBatch, compute_pixels, get_info
+from icu.landsat import build_collection, p50_mosaic
+from icu.results import ResultsStore
+from icu.tracing import record_cache
+
+# Valor de relleno para los píxeles enmascarados al bajar el mosaico como arreglo
+NODATA = -9999.0
+
+
+def composite_key(locality, start, end, max_clouds, bands):
+    return (locality, str(start), str(end), int(max_clouds), tuple(sorted(bands)))
+
+
+class DiskTier:
+    """Valores escalares (conteos, umbrales, estadísticas) serializados a JSON."""
+
+    def __init__(self, directory, ttl=7 * 24 * 3600, max_bytes=64 * 1024 * 1024):
+        self.directory = Path(directory)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+        digest = hashlib.sha1(json.dumps(key, ensure_ascii=False).encode("utf-8")).hexdigest()
+        return self.directory / f"{digest}.json"
+
+    def load(self, key):
+        """Devuelve (creado, valores); una entrada vencida se descarta."""
+        path = self._path(key)
+        try:
+            entry = json.loads(path.read_text(encoding="utf-8"))
+            if time.time() - entry["created"] > self.ttl:
+                path.unlink(missing_ok=True)
+                return time.time(), {}
+            return entry["created"], entry["values"]
+        except (OSError, ValueError, KeyError):
+            return time.time(), {}
+
+    def save(self, key, created, values):
+        path = self._path(key)
+        payload = json.dumps({"key": key, "created": created, "values": values}, ensure_ascii=False)
+        with self._lock:
+            tmp = path.with_suffix(".tmp")
+            tmp.write_text(payload, encoding="utf-8")
+            tmp.replace(path)
+            self._evict()
+
+    def _evict(self):
+        """Borra entradas vencidas y, si se excede max_bytes, las más antiguas primero."""
+        now = time.time()
+        entries = []
+        for path in self.directory.glob("*.json"):
+            try:
+                info = path.stat()
+            except OSError:
+                continue
+            # Los valores se agregan después de crear la entrada, así que mtime >= creado
+            if now - info.st_mtime > self.ttl:
+                path.unlink(missing_ok=True)
+            else:
+                entries.append((info.st_mtime, info.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+
+
+class Composite:
+    """Colección filtrada + mosaico p50 de una clave, con valores de GEE memoizados."""
+
+    def __init__(self, key, roi, cache, cache_key=None):
+        self.key = key
+        # Clave de memoria y disco: la del periodo, o la del conjunto de escenas si el catálogo la conoce
+        self.cache_key = cache_key or key
+        self.roi = roi
+        self._cache = cache
+        self._lock = threading.Lock()
+        self._collection = None
+        self._mosaic = None
+        self._arrays = {}
+        self.created, self.values = cache.disk.load(self.cache_key) if cache.disk else (time.time(), {})
+        if cache.store:
+            # Lo precalculado por lotes sirve para cualquier combinación de bandas
+            self.values = {**cache.store.load(key[:4]), **self.values}
+
+    @property
+    def locality(self):
+        return self.key[0]
+
+    @property
+    def collection(self):
+        if self._collection is None:
+            _, start, end, max_clouds, bands = self.key
+            self._collection = build_collection(self.roi, start, end, max_clouds, bands)
+        return self._collection
+
+    @property
+    def mosaic(self):
+        if self._mosaic is None:
+            self._mosaic = p50_mosaic(self.collection, self.roi)
+        return self._mosaic
+
+    def get(self, name, compute):
+        """Devuelve el valor memoizado `name`; si no existe ejecuta compute() (p. ej. un getInfo)."""
+        with self._lock:
+            if name in self.values:
+                self._cache.record(hit=True)
+                return self.values[name]
+        self._cache.record(hit=False)
+        value = compute()
+        with self._lock:
+            self.values[name] = value
+            snapshot = dict(self.values)
+        if self._cache.disk:
+            self._cache.disk.save(self.cache_key, self.created, snapshot)
+        return value
+
+    def get_many(self, builders):
+        """Resuelve varios valores memoizados; los que faltan se piden en un solo lote.
+
+        `builders` mapea nombre -> función que devuelve el objeto ee (sin evaluar).
+        """
+        with self._lock:
+            missing = [name for name in builders if name not in self.values]
+        for _ in range(len(builders) - len(missing)):
+            self._cache.record(hit=True)
+        if missing:
+            batch = RequestBatch()
+            for name in missing:
+                self._cache.record(hit=False)
+                batch.add(name, builders[name]())
+            result = batch.resolve()
+            with self._lock:
+                for name in missing:
+                    self.values[name] = result.get(name)
+                snapshot = dict(self.values)
+            if self._cache.disk:
+                self._cache.disk.save(self.cache_key, self.created, snapshot)
+        with self._lock:
+            return {name: self.values[name] for name in builders}
+
+    def count(self):
+        return self.get("count", lambda: get_info(self.collection.size()))
+
+    def arrays(self, grid, bands=("LST_p50", "NDVI_p50")):
+        """Bandas del mosaico como arreglos float32 (NaN fuera de la máscara) en `grid`; solo en memoria."""
+        key = (grid, tuple(bands))
+        with self._lock:
+            if key in self._arrays:
+                return self._arrays[key]
+        arrays = self._cache.store.load_arrays(self.key[:4], grid, bands) if self._cache.store else None
+        if arrays is None:
+            arrays = self.fetch_arrays(grid, bands)
+        with self._lock:
+            self._arrays[key] = arrays
+        return arrays
+
+    def fetch_arrays(self, grid, bands=("LST_p50", "NDVI_p50")):
+        """Igual que arrays() pero sin memoizar (p. ej. para recorrer la localidad por bloques)."""
+        image = self.mosaic.select(list(bands)).toFloat().unmask(NODATA)
+        raw = compute_pixels(image, grid.ee_grid())
+        return {b: np.where(raw[b] == NODATA, np.nan, raw[b]).astype(np.float32) for b in bands}
+
+
+class CompositeCache:
+    def __init__(self, max_entries=32, disk=None, store=None):
+        self.max_entries = max_entries
+        self.disk = disk
+        self.store = store
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, locality, start, end, max_clouds, bands, roi_factory, scene_key=None):
+        """Compuesto de la clave; con `scene_key` (icu.catalog) dos periodos con las mismas escenas lo comparten."""
+        key = composite_key(locality, start, end, max_clouds, bands)
+        cache_key = (locality, scene_key, tuple(sorted(bands))) if scene_key else key
+        with self._lock:
+            composite = self._entries.get(cache_key)
+            if composite is not None:
+                self._entries.move_to_end(cache_key)
+                return composite
+        composite = Composite(key, roi_factory(), self, cache_key)
+        with self._lock:
+            composite = self._entries.setdefault(cache_key, composite)
+            self._entries.move_to_end(cache_key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return composite
+
+    def record(self, hit):
+        record_cache("compuestos", hit)
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+@lru_cache(maxsize=None)
+def get_composite_cache(max_entries=32, disk_dir=None, ttl=7 * 24 * 3600, max_bytes=64 * 1024 * 1024,
+                        results_dir=None):
+    """Caché única por proceso (compartida por todas las sesiones de Streamlit)."""
+    disk = DiskTier(disk_dir, ttl=ttl, max_bytes=max_bytes) if disk_dir else None
+    store = ResultsStore(results_dir) if results_dir else None
+    return CompositeCache(max_entries=max_entries, disk=disk, store=store)
@@ -0,0 +1,130 @@
+# --------------------------------------------------------------
+# cube.py — Cubo temporal fuera de memoria (memmap) ordenado por teselas
+# Las escenas se escriben una a una en el cubo y los percentiles por
+# píxel se calculan tesela por tesela con ordenamientos parciales, así
+# una pila de décadas de escenas no tiene que caber en RAM.
+# --------------------------------------------------------------
+
+import math
+import os
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+
+# Tamaños de tesela candidatos (píxeles por lado), de mayor a menor
+BLOCK_SIZES = (256, 128, 64, 32, 16)
+# Copias de la pila de una tesela que existen a la vez al calcular percentiles
+# (lectura del cubo, transpuesta con NaN -> inf, grupo a particionar)
+WORK_COPIES = 3
+ITEMSIZE = np.dtype(np.float32).itemsize
+DEFAULT_MEMORY_LIMIT = 1024 * 2**20
+
+
+def default_workers():
+    return max(1, min(8, os.cpu_count() or 1))
+
+
+def nan_percentiles(stack, percentiles=(50,)):
+    """Percentiles por píxel sobre el eje 0 ignorando NaN. Devuelve {p: arreglo float32}.
+
+    Misma interpolación lineal que np.nanpercentile. Los píxeles se agrupan por
+    número de observaciones válidas: dentro de cada grupo las posiciones pedidas
+    son fijas y basta un np.partition en ellas, sin ordenar la pila completa.
+    """
+    n = stack.shape[0]
+    spatial = stack.shape[1:]
+    pixels = stack.reshape(n, -1).T.copy()            # (píxeles, escenas), contiguo por píxel
+    valid = np.isfinite(pixels)
+    k = valid.sum(axis=1)
+    pixels[~valid] = np.inf                           # los NaN quedan al final de cada partición
+    out = {p: np.full(pixels.shape[0], np.nan, dtype=np.float32) for p in percentiles}
+    for kv in np.unique(k):
+        if kv == 0:
+            continue
+        idx = np.flatnonzero(k == kv)
+        pos = {p: (kv - 1) * (p / 100.0) for p in percentiles}
+        kth = sorted({math.floor(x) for x in pos.values()} | {math.ceil(x) for x in pos.values()})
+        part = np.partition(pixels[idx], kth, axis=1)
+        for p, x in pos.items():
+            lo, hi = math.floor(x), math.ceil(x)
+            v_lo, v_hi = part[:, lo], part[:, hi]
+            out[p][idx] = v_lo + (v_hi - v_lo) * (x - lo)
+    return {p: arr.reshape(spatial) for p, arr in out.items()}
+
+
+@dataclass(frozen=True)
+class CubePlan:
+    block: int
+    workers: int
+    on_disk: bool
+    cube_bytes: int
+    work_bytes: int
+
+
+def plan_cube(grid_shape, n_scenes, n_bands, n_outputs, memory_limit=DEFAULT_MEMORY_LIMIT, workers=None):
+    """Elige tamaño de tesela, hilos y si el cubo va a disco para no rebasar memory_limit (bytes).
+
+    Lo que se mantiene en RAM: los arreglos de salida, la pila de una tesela por
+    hilo (WORK_COPIES veces) y, solo si cabe, el cubo completo.
+    """
+    height, width = grid_shape
+    workers = workers or default_workers()
+    outputs = n_outputs * height * width * ITEMSIZE
+    candidates = [(b, workers) for b in BLOCK_SIZES] + [(BLOCK_SIZES[-1], w) for w in range(workers - 1, 0, -1)]
+    for block, w in candidates:
+        tiles = math.ceil(height / block) * math.ceil(width / block)
+        cube = n_bands * tiles * n_scenes * block * block * ITEMSIZE
+        work = w * n_scenes * block * block * ITEMSIZE * WORK_COPIES
+        if outputs + work > memory_limit:
+            continue
+        on_disk = outputs + work + cube > memory_limit
+        return CubePlan(block, w, on_disk, cube, work)
+    raise MemoryError(
+        f"El límite de memoria ({memory_limit / 2**20:.0f} MB) no alcanza para {n_scenes} escenas "
+        f"en una malla de {height}×{width} píxeles.")
+
+
+class TemporalCube:
+    """Pila de una banda guardada por teselas: forma (tesela, escena, bloque, bloque).
+
+    La pila temporal de cada tesela ocupa un tramo contiguo, así que leerla es una
+    sola lectura secuencial del archivo. Con directory=None el cubo vive en RAM.
+    """
+
+    def __init__(self, n_tiles, n_scenes, block, directory=None):
+        self.block = block
+        shape = (n_tiles, n_scenes, block, block)
+        self.path = None
+        if directory is None:
+            self.data = np.empty(shape, dtype=np.float32)
+        else:
+            Path(directory).mkdir(parents=True, exist_ok=True)
+            fd, path = tempfile.mkstemp(suffix=".cube", dir=directory)
+            os.close(fd)
+            self.path = Path(path)
+            self.data = np.memmap(self.path, dtype=np.float32, mode="w+", shape=shape)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def write(self, tile, scene, array):
+        """Escribe la ventana (alto, ancho) de una escena; el relleno de las teselas de borde queda en NaN."""
+        slot = self.data[tile, scene]
+        h, w = array.shape
+        if h < self.block or w < self.block:
+            slot.fill(np.nan)
+        slot[:h, :w] = array
+
+    def read(self, tile):
+        return np.asarray(self.data[tile])
+
+    def close(self):
+        self.data = None
+        if self.path is not None:
+            self.path.unlink(missing_ok=True)
+            self.path = None
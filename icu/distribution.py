@@ -0,0 +1,109 @@
+# --------------------------------------------------------------
+# distribution.py — Estadísticas exactas LST / NDVI sobre todos los píxeles
+# En lugar de bajar una muestra de puntos, GEE reduce cada píxel de
+# la ROI: correlación de Pearson y ajuste lineal (LST = pendiente ·
+# NDVI + ordenada) y una densidad 2-D NDVI × LST en contenedores
+# fijos (frequencyHistogram sobre un código de contenedor). El
+# histograma de LST sale de la misma densidad. Solo viajan los
+# agregados: el tamaño de la respuesta no depende del de la ciudad.
+# --------------------------------------------------------------
+
+import math
+
+import ee
+import numpy as np
+
+from icu.batch import when_not_empty
+
+# Contenedores fijos (mínimo, máximo, ancho); lo que cae fuera va al contenedor del borde
+LST_BINS = (10.0, 60.0, 1.0)
+NDVI_BINS = (-0.2, 1.0, 0.05)
+DISTRIBUTION_SCALE = 30
+MAX_PIXELS = 1e10
+# Evita que un valor justo en el borde caiga en el contenedor anterior por redondeo
+EPSILON = 1e-6
+
+
+def _nbins(bins):
+    low, high, step = bins
+    return int(round((high - low) / step))
+
+
+def _edge(bins, i):
+    return round(bins[0] + i * bins[2], 6)
+
+
+def _bin_index(image, bins):
+    low, _, step = bins
+    return image.subtract(low).divide(step).add(EPSILON).floor().clamp(0, _nbins(bins) - 1)
+
+
+def bin_codes(pair):
+    """Imagen entera "bin" = índice NDVI · nº de contenedores LST + índice LST (bandas NDVI_p50, LST_p50)."""
+    ndvi_bin = _bin_index(pair.select("NDVI_p50"), NDVI_BINS)
+    lst_bin = _bin_index(pair.select("LST_p50"), LST_BINS)
+    return ndvi_bin.multiply(_nbins(LST_BINS)).add(lst_bin).int().rename("bin")
+
+
+def distribution_builders(comp, scale=DISTRIBUTION_SCALE):
+    """Builders para Composite.get_many: ajuste NDVI→LST y densidad 2-D, un solo viaje a GEE."""
+    size = comp.collection.size()
+    # Mismo conjunto de píxeles para todo: los que tienen LST y NDVI
+    pair = comp.mosaic.select(["NDVI_p50", "LST_p50"])
+    pair = pair.updateMask(pair.mask().reduce(ee.Reducer.min()))
+    region = dict(geometry=comp.roi, scale=scale, maxPixels=MAX_PIXELS, tileScale=4)
+    fit = pair.reduceRegion(
+        reducer=ee.Reducer.pearsonsCorrelation().combine(ee.Reducer.linearFit(), sharedInputs=True), **region)
+    density = bin_codes(pair).reduceRegion(reducer=ee.Reducer.frequencyHistogram(), **region).get("bin")
+    return {
+        "count": lambda: size,
+        "dist_fit": lambda: when_not_empty(size, fit),
+        "dist_density": lambda: when_not_empty(size, density),
+    }
+
+
+def distribution_summary(fit, density):
+    """Resultado de distribution_builders -> {n, correlation, p_value, slope, offset, histogram, density}.
+
+    histogram: [{"lst", "count"}] y density: [{"ndvi", "lst", "count"}], con el
+    borde inferior de cada contenedor.
+    """
+    fit, density = fit or {}, density or {}
+    n_lst = _nbins(LST_BINS)
+    cells, by_lst = [], {}
+    for code, count in density.items():
+        ndvi_i, lst_i = divmod(int(float(code)), n_lst)
+        count = int(count)
+        cells.append({"ndvi": _edge(NDVI_BINS, ndvi_i), "lst": _edge(LST_BINS, lst_i), "count": count})
+        by_lst[lst_i] = by_lst.get(lst_i, 0) + count
+    return {
+        "n": sum(by_lst.values()),
+        "correlation": fit.get("correlation"),
+        "p_value": fit.get("p-value"),
+        "slope": fit.get("scale"),
+        "offset": fit.get("offset"),
+        "histogram": [{"lst": _edge(LST_BINS, i), "count": c} for i, c in sorted(by_lst.items())],
+        "density": sorted(cells, key=lambda c: (c["ndvi"], c["lst"])),
+    }
+
+
+def _codes(values, bins):
+    low, _, step = bins
+    return np.clip(np.floor((values - low) / step + EPSILON), 0, _nbins(bins) - 1).astype(np.int64)
+
+
+def array_distribution(ndvi, lst):
+    """Lo mismo que distribution_builders + distribution_summary, con NumPy sobre los píxeles válidos (motor local)."""
+    valid = np.isfinite(ndvi) & np.isfinite(lst)
+    x, y = ndvi[valid].astype(np.float64), lst[valid].astype(np.float64)
+    n_lst = _nbins(LST_BINS)
+    counts = np.bincount(_codes(x, NDVI_BINS) * n_lst + _codes(y, LST_BINS))
+    fit = {}
+    if x.size > 2 and x.std() > 0 and y.std() > 0:
+        r = float(np.corrcoef(x, y)[0, 1])
+        slope, offset = np.polyfit(x, y, 1)
+        # Prueba t de r = 0; con miles de píxeles la aproximación normal basta
+        t = r * math.sqrt((x.size - 2) / max(1e-12, 1 - r * r))
+        fit = {"correlation": r, "p-value": math.erfc(abs(t) / math.sqrt(2)),
+               "scale": float(slope), "offset": float(offset)}
+    return distribution_summary(fit, {str(code): int(c) for code, c in enumerate(counts) if c})
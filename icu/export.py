@@ -0,0 +1,217 @@
+# --------------------------------------------------------------
+# export.py — Exportación por bloques de todos los píxeles de 30 m
+# La localidad se recorre en ventanas; cada ventana se pide (en
+# paralelo, con reintentos) y se escribe directo a Parquet o CSV,
+# sin armar la tabla completa en memoria. La exportación ráster
+# escribe las ventanas en un memmap del tamaño final y GDAL lo
+# convierte por teselas en un Cloud-Optimized GeoTIFF con vistas
+# generales, así la memoria pico no depende del tamaño de la salida.
+# --------------------------------------------------------------
+
+import contextvars
+import importlib.util
+import math
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+
+import numpy as np
+
+from icu.geo import utm_to_lonlat
+from icu.raster import windows
+
+FORMATS = {"parquet": ".parquet", "csv": ".csv"}
+# Columnas de salida -> banda del compuesto
+COLUMNS = {"LST_C": "LST_p50", "NDVI": "NDVI_p50"}
+
+# Exportación ráster: bandas del COG y lado de sus teselas internas (px).
+# rasterio es opcional (como en el motor local): sin él no se ofrece el COG
+RASTER_FORMATS = {"cog": ".tif"} if importlib.util.find_spec("rasterio") else {}
+RASTER_BANDS = ("LST_p50", "NDVI_p50")
+COG_BLOCK = 512
+# Límites de una solicitud síncrona de computePixels (48 MB y 32768 px por lado), con margen
+MAX_REQUEST_BYTES = 32 * 2**20
+MAX_REQUEST_DIM = 32768
+# Caché de bloques de GDAL al escribir el COG (MB): acota la memoria de la conversión
+GDAL_CACHE_MB = 256
+
+
+def with_retries(fn, retries=3, backoff=1.0):
+    """Ejecuta fn(); ante un error reintenta con espera exponencial (1 s, 2 s, 4 s...)."""
+    for attempt in range(retries + 1):
+        try:
+            return fn()
+        except Exception:
+            if attempt == retries:
+                raise
+            time.sleep(backoff * 2 ** attempt)
+
+
+def _chunk_table(grid, window, roi_mask, arrays):
+    import pyarrow as pa
+
+    row, col, h, w = window
+    valid = roi_mask[row:row + h, col:col + w].copy()
+    for band in COLUMNS.values():
+        valid &= np.isfinite(arrays[band])
+    rows, cols = np.nonzero(valid)
+    xs, ys = grid.pixel_centers(row, col, h, w)
+    lon, lat = utm_to_lonlat(xs[cols], ys[rows], zone=grid.zone)
+    data = {"lon": pa.array(lon, pa.float64()), "lat": pa.array(lat, pa.float64())}
+    for name, band in COLUMNS.items():
+        data[name] = pa.array(arrays[band][rows, cols], pa.float32())
+    return pa.table(data)
+
+
+class _Writer:
+    def __init__(self, path, fmt):
+        import pyarrow as pa
+        self.schema = pa.schema([("lon", pa.float64()), ("lat", pa.float64()),
+                                 *[(name, pa.float32()) for name in COLUMNS]])
+        if fmt == "parquet":
+            import pyarrow.parquet as pq
+            self._writer = pq.ParquetWriter(path, self.schema, compression="zstd")
+        else:
+            import pyarrow.csv as pcsv
+            self._writer = pcsv.CSVWriter(path, self.schema)
+
+    def write(self, table):
+        if table.num_rows:
+            self._writer.write_table(table)
+
+    def close(self):
+        self._writer.close()
+
+
+def _fetch_windows(grid, chunks, fetch, workers, retries):
+    """(ventana, {banda: arreglo}) conforme terminan; a lo sumo 2·workers ventanas en memoria a la vez."""
+    pending = iter(chunks)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        in_flight = {}
+
+        def submit():
+            window = next(pending, None)
+            if window is not None:
+                sub = grid.window(*window)
+                # Copia del contexto: las consultas del hilo cuentan en el render actual
+                task = contextvars.copy_context().run
+                in_flight[pool.submit(task, with_retries, lambda: fetch(window, sub), retries)] = window
+
+        for _ in range(2 * workers):
+            submit()
+        while in_flight:
+            finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in finished:
+                window = in_flight.pop(future)
+                yield window, future.result()
+                submit()
+
+
+def export_pixels(path, grid, roi_mask, fetch, fmt="parquet", block=256, workers=4, retries=3, progress=None):
+    """Escribe lon, lat, LST_C y NDVI de cada píxel válido de la ROI en `path`. Devuelve el número de filas.
+
+    `fetch(window, subgrid)` devuelve {banda: arreglo} de la ventana (p. ej. un computePixels).
+    A lo sumo 2·workers ventanas están en memoria a la vez; el archivo se escribe
+    en un temporal y se mueve al final, así una exportación fallida no deja basura.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".part")
+    chunks = [win for win in windows(grid, block)
+              if roi_mask[win[0]:win[0] + win[2], win[1]:win[1] + win[3]].any()]
+    rows = 0
+    writer = _Writer(tmp, fmt)
+    try:
+        for done, (window, arrays) in enumerate(_fetch_windows(grid, chunks, fetch, workers, retries), start=1):
+            table = _chunk_table(grid, window, roi_mask, arrays)
+            writer.write(table)
+            rows += table.num_rows
+            if progress:
+                progress(done, len(chunks))
+        writer.close()
+        os.replace(tmp, path)
+    except BaseException:
+        writer.close()
+        tmp.unlink(missing_ok=True)
+        raise
+    return rows
+
+
+def request_block(n_bands, itemsize=4, max_bytes=MAX_REQUEST_BYTES):
+    """Lado máximo (múltiplo de COG_BLOCK) de una ventana de n_bands que cabe en una solicitud."""
+    side = min(MAX_REQUEST_DIM, int(math.sqrt(max_bytes / (n_bands * itemsize))))
+    return max(COG_BLOCK, side // COG_BLOCK * COG_BLOCK)
+
+
+def _raw_vrt(raw_name, grid, bands):
+    """VRT que expone el memmap (banda, fila, columna) float32 a GDAL sin copiarlo."""
+    x_res, _, x0, _, y_res, y0 = grid.transform
+    size = grid.width * grid.height * 4
+    xml = [f'<VRTDataset rasterXSize="{grid.width}" rasterYSize="{grid.height}">',
+           f"<SRS>{grid.crs}</SRS>",
+           f"<GeoTransform>{x0!r}, {x_res!r}, 0, {y0!r}, 0, {y_res!r}</GeoTransform>"]
+    for i, band in enumerate(bands):
+        xml.append(
+            f'<VRTRasterBand dataType="Float32" band="{i + 1}" subClass="VRTRawRasterBand">'
+            f"<Description>{band}</Description><NoDataValue>nan</NoDataValue>"
+            f'<SourceFilename relativeToVRT="1">{raw_name}</SourceFilename>'
+            f"<ImageOffset>{i * size}</ImageOffset><PixelOffset>4</PixelOffset>"
+            f"<LineOffset>{grid.width * 4}</LineOffset><ByteOrder>LSB</ByteOrder></VRTRasterBand>")
+    xml.append("</VRTDataset>")
+    return "\n".join(xml)
+
+
+def export_raster(path, grid, roi_mask, fetch, bands=RASTER_BANDS, block=COG_BLOCK, workers=4, retries=3,
+                  progress=None):
+    """Escribe las bandas de la ROI en `path` como Cloud-Optimized GeoTIFF. Devuelve los píxeles con datos.
+
+    `fetch(window, subgrid)` es el mismo que en export_pixels. Las ventanas (no más
+    grandes de lo que admite una solicitud) se escriben en un memmap del tamaño
+    final; luego GDAL lo lee por bloques y escribe el COG (teselas de COG_BLOCK,
+    DEFLATE, vistas generales por promedio). Fuera de la ROI queda NaN (nodata).
+    """
+    try:
+        import rasterio
+        import rasterio.shutil
+    except ImportError as e:
+        raise ImportError("La exportación GeoTIFF requiere rasterio (pip install rasterio).") from e
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".part")
+    raw = path.with_name(path.name + ".raw")
+    vrt = path.with_name(path.name + ".vrt")
+    block = min(block, request_block(len(bands)))
+    chunks, empty = [], []
+    for win in windows(grid, block):
+        (chunks if roi_mask[win[0]:win[0] + win[2], win[1]:win[1] + win[3]].any() else empty).append(win)
+    valid = 0
+    data = np.memmap(raw, dtype=np.float32, mode="w+", shape=(len(bands), *grid.shape))
+    try:
+        for row, col, h, w in empty:
+            data[:, row:row + h, col:col + w] = np.nan
+        for done, (window, arrays) in enumerate(_fetch_windows(grid, chunks, fetch, workers, retries), start=1):
+            row, col, h, w = window
+            inside = roi_mask[row:row + h, col:col + w]
+            for i, band in enumerate(bands):
+                data[i, row:row + h, col:col + w] = np.where(inside, arrays[band], np.nan)
+            valid += int(np.count_nonzero(inside & np.isfinite(arrays[bands[0]])))
+            if progress:
+                progress(done, len(chunks))
+        data.flush()
+        data = None
+        vrt.write_text(_raw_vrt(raw.name, grid, bands), encoding="utf-8")
+        with rasterio.Env(GDAL_CACHEMAX=GDAL_CACHE_MB):
+            rasterio.shutil.copy(str(vrt), str(tmp), driver="COG", COMPRESS="DEFLATE", PREDICTOR="YES",
+                                 BLOCKSIZE=COG_BLOCK, OVERVIEWS="AUTO", RESAMPLING="AVERAGE",
+                                 NUM_THREADS=workers, BIGTIFF="IF_SAFER")
+        os.replace(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    finally:
+        data = None
+        raw.unlink(missing_ok=True)
+        vrt.unlink(missing_ok=True)
+    return valid
@@ -0,0 +1,88 @@
+# --------------------------------------------------------------
+# geo.py — Conversión UTM <-> geográficas (WGS84) sin dependencias
+# Fórmulas de Transversa de Mercator (Snyder, 1987).
+# --------------------------------------------------------------
+
+import math
+
+import numpy as np
+
+# --- CONSTANTES WGS84 / UTM ---
+A = 6378137.0
+F = 1 / 298.257223563
+E2 = F * (2 - F)
+EP2 = E2 / (1 - E2)
+K0 = 0.9996
+FALSE_EASTING = 500000.0
+FALSE_NORTHING_SOUTH = 10000000.0
+
+# Tabasco cae en la zona 15N (EPSG:32615), la misma de localidades_urbanas.prj
+UTM_ZONE = 15
+
+
+def _central_meridian(zone):
+    return math.radians(-183.0 + 6.0 * zone)
+
+
+def utm_to_lonlat(x, y, zone=UTM_ZONE, north=True):
+    """Convierte coordenadas UTM (m) a (lon, lat) en grados. Acepta escalares o arreglos."""
+    x = np.asarray(x, dtype="float64") - FALSE_EASTING
+    y = np.asarray(y, dtype="float64")
+    if not north:
+        y = y - FALSE_NORTHING_SOUTH
+
+    m = y / K0
+    mu = m / (A * (1 - E2 / 4 - 3 * E2**2 / 64 - 5 * E2**3 / 256))
+    e1 = (1 - math.sqrt(1 - E2)) / (1 + math.sqrt(1 - E2))
+    phi1 = (mu
+            + (3 * e1 / 2 - 27 * e1**3 / 32) * np.sin(2 * mu)
+            + (21 * e1**2 / 16 - 55 * e1**4 / 32) * np.sin(4 * mu)
+            + (151 * e1**3 / 96) * np.sin(6 * mu)
+            + (1097 * e1**4 / 512) * np.sin(8 * mu))
+
+    sin1, cos1, tan1 = np.sin(phi1), np.cos(phi1), np.tan(phi1)
+    c1 = EP2 * cos1**2
+    t1 = tan1**2
+    n1 = A / np.sqrt(1 - E2 * sin1**2)
+    r1 = A * (1 - E2) / (1 - E2 * sin1**2) ** 1.5
+    d = x / (n1 * K0)
+
+    lat = phi1 - (n1 * tan1 / r1) * (
+        d**2 / 2
+        - (5 + 3 * t1 + 10 * c1 - 4 * c1**2 - 9 * EP2) * d**4 / 24
+        + (61 + 90 * t1 + 298 * c1 + 45 * t1**2 - 252 * EP2 - 3 * c1**2) * d**6 / 720
+    )
+    lon = _central_meridian(zone) + (
+        d
+        - (1 + 2 * t1 + c1) * d**3 / 6
+        + (5 - 2 * c1 + 28 * t1 - 3 * c1**2 + 8 * EP2 + 24 * t1**2) * d**5 / 120
+    ) / cos1
+    return np.degrees(lon), np.degrees(lat)
+
+
+def lonlat_to_utm(lon, lat, zone=UTM_ZONE):
+    """Convierte (lon, lat) en grados a coordenadas UTM (m) de la zona indicada."""
+    lon = np.radians(np.asarray(lon, dtype="float64"))
+    lat = np.radians(np.asarray(lat, dtype="float64"))
+
+    sin, cos, tan = np.sin(lat), np.cos(lat), np.tan(lat)
+    n = A / np.sqrt(1 - E2 * sin**2)
+    t = tan**2
+    c = EP2 * cos**2
+    a = cos * (lon - _central_meridian(zone))
+    m = A * ((1 - E2 / 4 - 3 * E2**2 / 64 - 5 * E2**3 / 256) * lat
+             - (3 * E2 / 8 + 3 * E2**2 / 32 + 45 * E2**3 / 1024) * np.sin(2 * lat)
+             + (15 * E2**2 / 256 + 45 * E2**3 / 1024) * np.sin(4 * lat)
+             - (35 * E2**3 / 3072) * np.sin(6 * lat))
+
+    x = FALSE_EASTING + K0 * n * (
+        a + (1 - t + c) * a**3 / 6
+        + (5 - 18 * t + t**2 + 72 * c - 58 * EP2) * a**5 / 120
+    )
+    y = K0 * (m + n * tan * (
+        a**2 / 2
+        + (5 - t + 9 * c + 4 * c**2) * a**4 / 24
+        + (61 - 58 * t + t**2 + 600 * c - 330 * EP2) * a**6 / 720
+    ))
+    y = np.where(lat < 0, y + FALSE_NORTHING_SOUTH, y)
+    return x, y
@@ -0,0 +1,329 @@
+# --------------------------------------------------------------
+# hotspots.py — Islas de calor y refugios verdes como vectores
+# Mismo criterio que las capas de GEE del panel de mapas (LST >= p90
+# con cúmulos de al menos 3 píxeles en 8-conectividad; NDVI >= p95),
+# pero sobre un arreglo del compuesto: cada cúmulo se etiqueta y se
+# devuelve como un polígono con área, LST media/máxima y centroide.
+# --------------------------------------------------------------
+
+import io
+import json
+import struct
+
+import numpy as np
+
+from icu.geo import utm_to_lonlat
+
+# connectedPixelCount(100, True).gte(3) en show_map_panel
+HOTSPOT_MIN_PIXELS = 3
+REFUGE_MIN_PIXELS = 1
+KIND_HOTSPOT = "isla_de_calor"
+KIND_REFUGE = "refugio_verde"
+
+
+# --- 1. ETIQUETADO DE COMPONENTES CONECTADAS ---
+
+def _runs(mask):
+    """Tramos horizontales de True: (fila, inicio, fin exclusivo), en orden de filas."""
+    padded = np.zeros((mask.shape[0], mask.shape[1] + 2), dtype=np.int8)
+    padded[:, 1:-1] = mask
+    diff = np.diff(padded, axis=1)
+    rows, starts = np.nonzero(diff == 1)
+    _, ends = np.nonzero(diff == -1)
+    return rows, starts, ends
+
+
+def label_components(mask, connectivity=8):
+    """Etiquetas 1..n de las componentes conectadas de `mask` (0 = fondo). Devuelve (labels, n).
+
+    Trabaja sobre tramos por fila en lugar de píxeles: los tramos de filas
+    vecinas que se tocan se unen con propagación de la etiqueta mínima y
+    saltos de puntero, todo vectorizado.
+    """
+    mask = np.asarray(mask, dtype=bool)
+    labels = np.zeros(mask.shape, dtype=np.int32)
+    rows, starts, ends = _runs(mask)
+    if rows.size == 0:
+        return labels, 0
+
+    # Tramo j de la fila r+1 toca al tramo i de la fila r si se traslapan
+    # (con 8-conectividad basta con que se toquen en diagonal)
+    reach = 1 if connectivity == 8 else 0
+    width = mask.shape[1] + 3
+    key_start = rows * width + starts
+    key_end = rows * width + ends
+    lo = np.searchsorted(key_end, (rows + 1) * width + starts - reach, side="right")
+    hi = np.searchsorted(key_start, (rows + 1) * width + ends + reach, side="left")
+    counts = np.maximum(hi - lo, 0)
+    a = np.repeat(np.arange(rows.size), counts)
+    b = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts) + np.repeat(lo, counts)
+
+    parent = np.arange(rows.size)
+    while True:
+        low = np.minimum(parent[a], parent[b])
+        updated = parent.copy()
+        np.minimum.at(updated, parent[a], low)
+        np.minimum.at(updated, parent[b], low)
+        while True:
+            jumped = updated[updated]
+            if np.array_equal(jumped, updated):
+                break
+            updated = jumped
+        if np.array_equal(updated, parent):
+            break
+        parent = updated
+
+    roots, run_labels = np.unique(parent, return_inverse=True)
+    labels[mask] = np.repeat(run_labels.astype(np.int32) + 1, ends - starts)
+    return labels, roots.size
+
+
+# --- 2. CONTORNOS ---
+
+def _boundary_edges(labels):
+    """Aristas de borde de cada cúmulo en coordenadas de esquina (col, fila), con el interior a la izquierda."""
+    padded = np.pad(labels, 1)
+    inner = padded[1:-1, 1:-1]
+    edges = []
+    # (vecino, desplazamiento de la arista desde la esquina superior izquierda del píxel)
+    sides = (
+        (padded[2:, 1:-1], ((0, 1), (1, 1))),     # abajo:   hacia el este
+        (padded[1:-1, 2:], ((1, 1), (1, 0))),     # derecha: hacia el norte
+        (padded[:-2, 1:-1], ((1, 0), (0, 0))),    # arriba:  hacia el oeste
+        (padded[1:-1, :-2], ((0, 0), (0, 1))),    # izquierda: hacia el sur
+    )
+    for neighbour, ((dc0, dr0), (dc1, dr1)) in sides:
+        r, c = np.nonzero((inner > 0) & (neighbour != inner))
+        edges.append(np.column_stack([c + dc0, r + dr0, c + dc1, r + dr1, inner[r, c]]))
+    return np.vstack(edges)
+
+
+def _trace_rings(edges):
+    """Encadena aristas en anillos cerrados simples. Devuelve lista de (etiqueta, [(col, fila), ...]).
+
+    En un vértice con dos salidas (píxeles que se tocan en diagonal) siempre se
+    gira a la izquierda: los lóbulos unidos en diagonal salen como anillos
+    separados que se tocan en un punto (un MultiPolygon válido) en lugar de un
+    anillo que se cruza a sí mismo.
+    """
+    edge_list = edges.tolist()
+    outgoing = {}
+    for idx, (c0, r0, _, _, _) in enumerate(edge_list):
+        outgoing.setdefault((c0, r0), []).append(idx)
+
+    def successor(idx):
+        c0, r0, c1, r1, _ = edge_list[idx]
+        options = outgoing[(c1, r1)]
+        if len(options) == 1:
+            return options[0]
+        # Producto cruz en el marco con y hacia arriba (la fila crece hacia abajo): > 0 es giro a la izquierda
+        dc, dr = c1 - c0, r1 - r0
+        return max(options, key=lambda j: dr * (edge_list[j][2] - edge_list[j][0])
+                   - dc * (edge_list[j][3] - edge_list[j][1]))
+
+    used = np.zeros(len(edge_list), dtype=bool)
+    rings = []
+    for first in range(len(edge_list)):
+        if used[first]:
+            continue
+        ring = []
+        prev_dir = None
+        idx = first
+        while not used[idx]:
+            used[idx] = True
+            c0, r0, c1, r1, _ = edge_list[idx]
+            direction = (c1 - c0, r1 - r0)
+            if direction != prev_dir:
+                ring.append((c0, r0))
+                prev_dir = direction
+            idx = successor(idx)
+        # El vértice inicial sobra si la última arista sigue la dirección de la primera
+        c0, r0, c1, r1, label = edge_list[first]
+        if len(ring) > 1 and prev_dir == (c1 - c0, r1 - r0):
+            ring = ring[1:]
+        rings.extend((label, part) for part in _split_ring(ring))
+    return rings
+
+
+def _split_ring(ring):
+    """Parte un anillo que pasa dos veces por el mismo vértice en anillos simples (cerrados).
+
+    Ocurre en los huecos con fondo unido en diagonal: los huecos resultantes se
+    tocan en un punto, lo cual sigue siendo válido.
+    """
+    parts, stack, seen = [], [], {}
+    for pt in ring:
+        if pt in seen:
+            i = seen[pt]
+            parts.append(stack[i:] + [pt])
+            for q in stack[i + 1:]:
+                del seen[q]
+            stack = stack[:i + 1]
+        else:
+            seen[pt] = len(stack)
+            stack.append(pt)
+    parts.append(stack + [stack[0]])
+    return parts
+
+
+def _signed_area(ring):
+    xy = np.asarray(ring, dtype=float)
+    return 0.5 * float(np.sum(xy[:-1, 0] * xy[1:, 1] - xy[1:, 0] * xy[:-1, 1]))
+
+
+def _point_in_ring(point, ring):
+    x, y = point
+    xy = np.asarray(ring, dtype=float)
+    x0, y0, x1, y1 = xy[:-1, 0], xy[:-1, 1], xy[1:, 0], xy[1:, 1]
+    crosses = (y0 > y) != (y1 > y)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        xc = x0 + (y - y0) * (x1 - x0) / (y1 - y0)
+    return bool(np.count_nonzero(crosses & (x < xc)) % 2)
+
+
+def _geometry(rings):
+    """Polygon (o MultiPolygon) GeoJSON a partir de anillos lon/lat: exteriores CCW, huecos CW."""
+    exteriors = [r for r in rings if _signed_area(r) > 0]
+    holes = [r for r in rings if _signed_area(r) <= 0]
+    if len(exteriors) == 1:
+        return {"type": "Polygon", "coordinates": [exteriors[0], *holes]}
+    polygons = [[ext] for ext in exteriors]
+    for hole in holes:
+        # El punto medio del primer lado está dentro del exterior dueño (un vértice podría tocarlo)
+        probe = ((hole[0][0] + hole[1][0]) / 2, (hole[0][1] + hole[1][1]) / 2)
+        # Un lóbulo puede estar dentro del hueco de otro: el dueño es el exterior más pequeño que lo contiene
+        owners = [p for p in polygons if _point_in_ring(probe, p[0])] or polygons[:1]
+        min(owners, key=lambda p: abs(_signed_area(p[0]))).append(hole)
+    return {"type": "MultiPolygon", "coordinates": polygons}
+
+
+# --- 3. CÚMULOS ---
+
+def extract_clusters(mask, grid, bands, kind, min_pixels=1, connectivity=8):
+    """Features GeoJSON, una por cúmulo de `mask` con al menos min_pixels píxeles.
+
+    Propiedades: tipo, píxeles, área (m²), centroide y media/máximo de cada banda de `bands`.
+    También devuelve la máscara de los píxeles que sobreviven al filtro de tamaño.
+    """
+    labels, n = label_components(mask, connectivity)
+    if n == 0:
+        return [], np.zeros(mask.shape, dtype=bool)
+    sizes = np.bincount(labels.ravel(), minlength=n + 1)
+    keep = sizes >= min_pixels
+    keep[0] = False
+    labels = np.where(keep[labels], labels, 0)
+    kept = np.flatnonzero(keep)
+    if kept.size == 0:
+        return [], np.zeros(mask.shape, dtype=bool)
+
+    rows, cols = np.nonzero(labels)
+    lab = labels[rows, cols]
+    xs, ys = grid.pixel_centers()
+    count = sizes[kept]
+    cx = np.bincount(lab, weights=xs[cols], minlength=n + 1)[kept] / count
+    cy = np.bincount(lab, weights=ys[rows], minlength=n + 1)[kept] / count
+    lon, lat = utm_to_lonlat(cx, cy, zone=grid.zone)
+
+    stats = {}
+    for name, arr in bands.items():
+        vals = arr[rows, cols].astype(np.float64)
+        ok = np.isfinite(vals)
+        total = np.bincount(lab[ok], weights=vals[ok], minlength=n + 1)[kept]
+        valid = np.bincount(lab[ok], minlength=n + 1)[kept]
+        peak = np.full(n + 1, -np.inf)
+        np.maximum.at(peak, lab[ok], vals[ok])
+        with np.errstate(invalid="ignore", divide="ignore"):
+            stats[f"{name}_mean"] = np.where(valid > 0, total / valid, np.nan)
+        stats[f"{name}_max"] = np.where(valid > 0, peak[kept], np.nan)
+
+    # Contornos: esquinas de píxel (col, fila) -> UTM -> lon/lat en una sola conversión
+    rings = _trace_rings(_boundary_edges(labels))
+    corners = np.array([pt for _, ring in rings for pt in ring], dtype=float)
+    rlon, rlat = utm_to_lonlat(grid.x0 + corners[:, 0] * grid.res, grid.y0 - corners[:, 1] * grid.res, zone=grid.zone)
+    by_label = {}
+    offset = 0
+    for label, ring in rings:
+        coords = [[round(float(x), 7), round(float(y), 7)]
+                  for x, y in zip(rlon[offset:offset + len(ring)], rlat[offset:offset + len(ring)])]
+        offset += len(ring)
+        by_label.setdefault(label, []).append(coords)
+
+    features = []
+    for i, label in enumerate(kept):
+        props = {
+            "id": f"{kind}_{i + 1}",
+            "kind": kind,
+            "pixels": int(count[i]),
+            "area_m2": float(count[i] * grid.pixel_area_m2()),
+            "centroid_lon": round(float(lon[i]), 6),
+            "centroid_lat": round(float(lat[i]), 6),
+        }
+        for name, values in stats.items():
+            props[name] = float(values[i]) if np.isfinite(values[i]) else None
+        features.append({"type": "Feature", "geometry": _geometry(by_label[int(label)]), "properties": props})
+    return features, labels > 0
+
+
+def find_clusters(bands, grid, roi_mask, lst_threshold, ndvi_threshold):
+    """Islas de calor (LST >= p90, cúmulos >= 3 px) y refugios verdes (NDVI >= p95) como FeatureCollection.
+
+    `bands` debe traer LST_p50 y NDVI_p50 en la malla `grid`. Además de las features
+    devuelve las máscaras ya filtradas, para pintar las mismas capas en el mapa.
+    """
+    lst, ndvi = bands["LST_p50"], bands["NDVI_p50"]
+    features, masks = [], {}
+    with np.errstate(invalid="ignore"):
+        hot = roi_mask & (lst >= lst_threshold) if lst_threshold is not None else None
+        veg = roi_mask & (ndvi >= ndvi_threshold) if ndvi_threshold is not None else None
+    if hot is not None:
+        found, masks[KIND_HOTSPOT] = extract_clusters(hot, grid, bands, KIND_HOTSPOT, HOTSPOT_MIN_PIXELS)
+        features += found
+    if veg is not None:
+        found, masks[KIND_REFUGE] = extract_clusters(veg, grid, bands, KIND_REFUGE, REFUGE_MIN_PIXELS)
+        features += found
+    collection = {"type": "FeatureCollection", "features": features,
+                  "properties": {"LST_threshold": lst_threshold, "NDVI_threshold": ndvi_threshold}}
+    return collection, masks
+
+
+# --- 4. EXPORTACIÓN ---
+
+def _wkb(geometry):
+    """WKB (little endian) de un Polygon/MultiPolygon GeoJSON."""
+    def polygon(rings):
+        out = [struct.pack("<BII", 1, 3, len(rings))]
+        for ring in rings:
+            out.append(struct.pack("<I", len(ring)))
+            out.append(np.asarray(ring, dtype="<f8").tobytes())
+        return b"".join(out)
+    if geometry["type"] == "Polygon":
+        return polygon(geometry["coordinates"])
+    parts = [polygon(p) for p in geometry["coordinates"]]
+    return struct.pack("<BII", 1, 6, len(parts)) + b"".join(parts)
+
+
+def to_geojson_bytes(collection):
+    return json.dumps(collection, ensure_ascii=False).encode("utf-8")
+
+
+def to_geoparquet_bytes(collection):
+    """GeoParquet 1.0 (geometría WKB, CRS OGC:CRS84) con una fila por cúmulo."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    features = collection["features"]
+    columns = {}
+    for f in features:
+        for name in f["properties"]:
+            columns.setdefault(name, [])
+    for name in columns:
+        columns[name] = [f["properties"].get(name) for f in features]
+    columns["geometry"] = pa.array([_wkb(f["geometry"]) for f in features], type=pa.binary())
+    table = pa.table(columns)
+    types = sorted({f["geometry"]["type"] for f in features})
+    geo = {"version": "1.0.0", "primary_column": "geometry",
+           "columns": {"geometry": {"encoding": "WKB", "geometry_types": types}}}
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}), b"geo": json.dumps(geo).encode()})
+    buf = io.BytesIO()
+    pq.write_table(table, buf)
+    return buf.getvalue()
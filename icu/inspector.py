@@ -0,0 +1,107 @@
+# --------------------------------------------------------------
+# inspector.py — Consulta de valores por coordenada en memoria
+# El compuesto de la localidad se baja una vez como malla float32
+# georreferenciada; los clics, puntos múltiples y transectos se
+# responden desde ahí sin volver a GEE.
+# --------------------------------------------------------------
+
+import numpy as np
+
+from icu.geo import lonlat_to_utm, utm_to_lonlat
+
+NEAREST = "nearest"
+BILINEAR = "bilinear"
+
+
+class Inspector:
+    """Valores de las bandas (alto, ancho) de `bands` en la malla `grid` para coordenadas lon/lat."""
+
+    def __init__(self, bands, grid):
+        self.bands = bands
+        self.grid = grid
+
+    def sample_xy(self, x, y, method=NEAREST):
+        """{banda: arreglo} en coordenadas UTM; NaN fuera de la malla o donde no hay dato."""
+        rows, cols = self.grid.xy_to_pixel(np.atleast_1d(x), np.atleast_1d(y))
+        if method == BILINEAR:
+            return {name: _bilinear(arr, rows, cols) for name, arr in self.bands.items()}
+        r = np.floor(rows).astype(np.intp)
+        c = np.floor(cols).astype(np.intp)
+        inside = (r >= 0) & (r < self.grid.height) & (c >= 0) & (c < self.grid.width)
+        out = {}
+        for name, arr in self.bands.items():
+            values = np.full(r.shape, np.nan, dtype=np.float32)
+            values[inside] = arr[r[inside], c[inside]]
+            out[name] = values
+        return out
+
+    def sample(self, lon, lat, method=NEAREST):
+        x, y = lonlat_to_utm(np.atleast_1d(lon), np.atleast_1d(lat), zone=self.grid.zone)
+        return self.sample_xy(x, y, method)
+
+    def point(self, lon, lat, method=NEAREST):
+        """Valores en un punto: {banda: float o None}."""
+        return {name: _scalar(values[0]) for name, values in self.sample(lon, lat, method).items()}
+
+    def points(self, coords, method=NEAREST):
+        """Filas Lon/Lat + bandas para una lista de (lon, lat)."""
+        if not coords:
+            return []
+        lon, lat = np.asarray(coords, dtype=float).T
+        values = self.sample(lon, lat, method)
+        return [{"Lon": float(a), "Lat": float(b), **{name: _scalar(v[i]) for name, v in values.items()}}
+                for i, (a, b) in enumerate(zip(lon, lat))]
+
+    def profile(self, coords, step=None, method=BILINEAR):
+        """Perfil a lo largo de una polilínea [(lon, lat), ...], muestreado cada `step` m (por defecto un píxel).
+
+        Filas con distancia acumulada (m), Lon/Lat y el valor de cada banda.
+        """
+        step = step or self.grid.res
+        lon, lat = np.asarray(coords, dtype=float).T
+        vx, vy = lonlat_to_utm(lon, lat, zone=self.grid.zone)
+        seg = np.hypot(np.diff(vx), np.diff(vy))
+        total = float(seg.sum())
+        if total == 0:
+            return []
+        distance = np.append(np.arange(0.0, total, step), total)
+        cum = np.concatenate([[0.0], np.cumsum(seg)])
+        x = np.interp(distance, cum, vx)
+        y = np.interp(distance, cum, vy)
+        values = self.sample_xy(x, y, method)
+        plon, plat = utm_to_lonlat(x, y, zone=self.grid.zone)
+        return [{"distance_m": float(d), "Lon": float(a), "Lat": float(b),
+                 **{name: _scalar(v[i]) for name, v in values.items()}}
+                for i, (d, a, b) in enumerate(zip(distance, plon, plat))]
+
+
+def _scalar(value):
+    return float(value) if np.isfinite(value) else None
+
+
+def _bilinear(arr, rows, cols):
+    """Interpolación bilineal entre centros de píxel; los vecinos sin dato se descartan y se renormaliza."""
+    r = rows - 0.5
+    c = cols - 0.5
+    r0 = np.floor(r).astype(np.intp)
+    c0 = np.floor(c).astype(np.intp)
+    fr = r - r0
+    fc = c - c0
+    height, width = arr.shape
+    total = np.zeros(r.shape)
+    weight = np.zeros(r.shape)
+    for dr, dc, w in ((0, 0, (1 - fr) * (1 - fc)), (0, 1, (1 - fr) * fc),
+                      (1, 0, fr * (1 - fc)), (1, 1, fr * fc)):
+        rr, cc = r0 + dr, c0 + dc
+        ok = (rr >= 0) & (rr < height) & (cc >= 0) & (cc < width)
+        values = np.full(r.shape, np.nan)
+        values[ok] = arr[rr[ok], cc[ok]]
+        ok &= np.isfinite(values)
+        total[ok] += w[ok] * values[ok]
+        weight[ok] += w[ok]
+    # Fuera del píxel más cercano de la malla no se extrapola
+    nearest_r, nearest_c = np.floor(rows), np.floor(cols)
+    outside = (nearest_r < 0) | (nearest_r >= height) | (nearest_c < 0) | (nearest_c >= width)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        out = np.where((weight > 0) & ~outside, total / weight, np.nan)
+    return out.astype(np.float32)
@@ -0,0 +1,44 @@
+# --------------------------------------------------------------
+# landsat.py — Cadena de procesamiento Landsat 8 (C2 L2) en GEE
+# --------------------------------------------------------------
+
+import ee
+
+COLLECTION_ID = "LANDSAT/LC08/C02/T1_L2"
+
+
+def cloudMaskFunction(image):
+    qa = image.select("QA_PIXEL")
+    mask = qa.bitwiseAnd(1 << 3).eq(0).And(qa.bitwiseAnd(1 << 5).eq(0))
+    return image.updateMask(mask)
+
+def maskThermalNoData(image):
+    st_band = image.select("ST_B10")
+    return image.updateMask(st_band.gt(0).And(st_band.lt(65535)))
+
+def addNDVI(image):
+    ndvi = image.normalizedDifference(['SR_B5', 'SR_B4']).rename('NDVI')
+    return image.addBands(ndvi)
+
+def addLST(image):
+    lst = (image.select("ST_B10")
+           .multiply(0.00341802).add(149.0).subtract(273.15).rename("LST"))
+    return image.addBands(lst)
+
+
+BAND_FUNCTIONS = {"LST": addLST, "NDVI": addNDVI}
+
+
+def build_collection(roi, start, end, max_clouds, bands=("LST", "NDVI")):
+    """filterBounds → filterDate → CLOUD_COVER → máscaras → bandas derivadas."""
+    col = (ee.ImageCollection(COLLECTION_ID)
+           .filterBounds(roi).filterDate(start, end)
+           .filter(ee.Filter.lt("CLOUD_COVER", max_clouds))
+           .map(cloudMaskFunction).map(maskThermalNoData))
+    for band in bands:
+        col = col.map(BAND_FUNCTIONS[band])
+    return col
+
+
+def p50_mosaic(col, roi):
+    return col.reduce(ee.Reducer.percentile([50])).clip(roi)
@@ -0,0 +1,366 @@
+# --------------------------------------------------------------
+# local.py — Motor local (NumPy) equivalente a la cadena de GEE
+# Reproduce cloudMaskFunction, maskThermalNoData, addLST, addNDVI y el
+# compuesto percentil por píxel sobre escenas Landsat C2 L2 en disco,
+# con un cubo temporal por teselas para que la memoria quede acotada.
+# --------------------------------------------------------------
+
+import datetime as dt
+import re
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+
+from icu.cube import DEFAULT_MEMORY_LIMIT, TemporalCube, nan_percentiles, plan_cube
+from icu.raster import Grid, locality_mask, windows
+from icu.tracing import record_cache, span
+
+BANDS = ("QA_PIXEL", "ST_B10", "SR_B4", "SR_B5")
+# Valor de relleno de cada banda fuera de la huella de la escena
+FILL = {"QA_PIXEL": 1, "ST_B10": 0, "SR_B4": 0, "SR_B5": 0}
+
+# LC08_L2SP_021047_20240405_20240412_02_T1_ST_B10.TIF
+PRODUCT_RE = re.compile(
+    r"^(?P<pid>L[CO]0[89]_L2SP_(?P<pathrow>\d{6})_(?P<date>\d{8})_\d{8}_\d{2}_T[12RT])_(?P<band>[A-Z0-9_]+)\.TIF$",
+    re.IGNORECASE,
+)
+CLOUD_RE = re.compile(r'^\s*CLOUD_COVER\s*=\s*"?([-\d.]+)"?', re.MULTILINE)
+
+
+# --- 1. FUNCIONES DE PROCESAMIENTO (mismas reglas que en icu.landsat) ---
+
+def cloud_mask(qa):
+    """QA_PIXEL: bit 3 (nube) y bit 5 (nieve) en cero."""
+    qa = qa.astype(np.uint16, copy=False)
+    return ((qa & (1 << 3)) == 0) & ((qa & (1 << 5)) == 0)
+
+def thermal_mask(st_b10):
+    return (st_b10 > 0) & (st_b10 < 65535)
+
+def lst_celsius(st_b10):
+    return (st_b10.astype(np.float32) * np.float32(0.00341802) + np.float32(149.0) - np.float32(273.15))
+
+def ndvi(sr_b5, sr_b4):
+    """normalizedDifference(['SR_B5', 'SR_B4']) sobre los valores digitales, como en GEE."""
+    b5 = sr_b5.astype(np.float32)
+    b4 = sr_b4.astype(np.float32)
+    den = b5 + b4
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(den != 0, (b5 - b4) / den, np.nan).astype(np.float32)
+
+def process_scene(qa, st_b10, sr_b4, sr_b5):
+    """(LST °C, NDVI) con NaN donde la máscara de nubes o de no-dato elimina el píxel."""
+    valid = cloud_mask(qa) & thermal_mask(st_b10)
+    lst = np.where(valid, lst_celsius(st_b10), np.nan).astype(np.float32)
+    nd = np.where(valid, ndvi(sr_b5, sr_b4), np.nan).astype(np.float32)
+    return lst, nd
+
+
+# --- 2. FUENTES DE ESCENAS ---
+
+@dataclass
+class SceneSource:
+    """Escena C2 L2 en disco: un GeoTIFF por banda."""
+    product_id: str
+    date: dt.date
+    cloud_cover: float | None
+    paths: dict
+
+    def open(self, grid):
+        return GeoTiffReader(self.paths, grid)
+
+
+@dataclass
+class ArraySource:
+    """Escena en memoria, ya en la malla de destino (para pruebas con rásteres sintéticos)."""
+    product_id: str
+    date: dt.date
+    cloud_cover: float | None
+    arrays: dict
+
+    def open(self, grid):
+        return ArrayReader(self.arrays)
+
+
+class ArrayReader:
+    def __init__(self, arrays):
+        self.arrays = arrays
+
+    def read(self, band, row, col, height, width):
+        return self.arrays[band][row:row + height, col:col + width]
+
+    def close(self):
+        pass
+
+
+class GeoTiffReader:
+    """Lee ventanas de cada banda reproyectadas a la malla de destino (WarpedVRT, vecino más cercano)."""
+
+    def __init__(self, paths, grid):
+        try:
+            import rasterio
+            from rasterio.enums import Resampling
+            from rasterio.transform import Affine
+            from rasterio.vrt import WarpedVRT
+        except ImportError as e:
+            raise ImportError("El motor local requiere rasterio (pip install rasterio).") from e
+        self._datasets = []
+        self._vrts = {}
+        a, b, c, d, e, f = grid.transform
+        for band in BANDS:
+            src = rasterio.open(paths[band])
+            self._datasets.append(src)
+            self._vrts[band] = WarpedVRT(
+                src, crs=grid.crs, transform=Affine(a, b, c, d, e, f),
+                width=grid.width, height=grid.height,
+                resampling=Resampling.nearest, nodata=FILL[band],
+            )
+
+    def read(self, band, row, col, height, width):
+        from rasterio.windows import Window
+        return self._vrts[band].read(1, window=Window(col, row, width, height))
+
+    def close(self):
+        for vrt in self._vrts.values():
+            vrt.close()
+        for src in self._datasets:
+            src.close()
+
+
+def _cloud_cover(mtl_path):
+    try:
+        match = CLOUD_RE.search(Path(mtl_path).read_text(errors="ignore"))
+        return float(match.group(1)) if match else None
+    except OSError:
+        return None
+
+
+def find_scenes(directory):
+    """Agrupa los GeoTIFF de un directorio (recursivo) por LANDSAT_PRODUCT_ID."""
+    groups = {}
+    for path in Path(directory).rglob("*"):
+        match = PRODUCT_RE.match(path.name)
+        if match and match.group("band").upper() in BANDS:
+            groups.setdefault(match.group("pid"), {})[match.group("band").upper()] = path
+    scenes = []
+    for pid, paths in groups.items():
+        if not all(band in paths for band in BANDS):
+            continue
+        mtl = next(paths["ST_B10"].parent.glob(f"{pid}_MTL.txt"), None)
+        date = dt.datetime.strptime(PRODUCT_RE.match(paths["ST_B10"].name).group("date"), "%Y%m%d").date()
+        scenes.append(SceneSource(pid, date, _cloud_cover(mtl) if mtl else None, paths))
+    return sorted(scenes, key=lambda s: s.date)
+
+
+def select_scenes(scenes, start, end, max_clouds):
+    """filterDate(start, end) (fin exclusivo, como en GEE) y CLOUD_COVER < max_clouds."""
+    start = dt.date.fromisoformat(str(start))
+    end = dt.date.fromisoformat(str(end))
+    return [s for s in scenes
+            if start <= s.date < end and (s.cloud_cover is None or s.cloud_cover < max_clouds)]
+
+
+# --- 3. COMPUESTO LOCAL ---
+
+@dataclass
+class LocalComposite:
+    grid: Grid
+    mask: np.ndarray
+    bands: dict = field(default_factory=dict)     # "LST_p50" -> arreglo (alto, ancho) float32
+    scenes: list = field(default_factory=list)    # filas por escena, mismas claves que SceneStore.rows
+    values: dict = field(default_factory=dict)    # productos derivados memoizados (p. ej. cúmulos)
+
+    @property
+    def count(self):
+        return len(self.scenes)
+
+    def get(self, name, compute):
+        """Valor derivado memoizado junto al compuesto (vive lo mismo que su entrada en el LRU)."""
+        if name not in self.values:
+            self.values[name] = compute()
+        return self.values[name]
+
+    def band(self, name):
+        return self.bands[name]
+
+    def percentile(self, name, q):
+        values = self.bands[name][self.mask]
+        values = values[np.isfinite(values)]
+        return float(np.percentile(values, q)) if values.size else None
+
+    def sample(self, n=1000, seed=0):
+        """Muestra aleatoria de píxeles válidos: lista de dicts con Lon, Lat y los valores de cada banda."""
+        from icu.geo import utm_to_lonlat
+        valid = self.mask.copy()
+        for arr in self.bands.values():
+            valid &= np.isfinite(arr)
+        rows, cols = np.nonzero(valid)
+        if rows.size > n:
+            pick = np.random.default_rng(seed).choice(rows.size, n, replace=False)
+            rows, cols = rows[pick], cols[pick]
+        xs, ys = self.grid.pixel_centers()
+        lon, lat = utm_to_lonlat(xs[cols], ys[rows], zone=self.grid.zone)
+        out = [{"Lon": float(a), "Lat": float(b)} for a, b in zip(lon, lat)]
+        for name, arr in self.bands.items():
+            for rec, v in zip(out, arr[rows, cols]):
+                rec[name] = float(v)
+        return out
+
+
+def _scene_row(source, lst_stats, ndvi_stats, total_pixels):
+    lst_sum, count, lst_max, lst_min = lst_stats
+    ndvi_sum, ndvi_count = ndvi_stats
+    return {
+        "product_id": source.product_id,
+        "date": source.date.isoformat(),
+        "LST_mean": float(lst_sum / count) if count else None,
+        "LST_max": lst_max if count else None,
+        "LST_min": lst_min if count else None,
+        "LST_count": count,
+        "NDVI_mean": float(ndvi_sum / ndvi_count) if ndvi_count else None,
+        "valid_fraction": count / total_pixels if total_pixels else None,
+    }
+
+
+def build_local_composite(sources, grid, roi_mask=None, percentiles=(50,),
+                          memory_limit=DEFAULT_MEMORY_LIMIT, workers=None, scratch_dir=None):
+    """Compuesto percentil por píxel (LST y NDVI) + estadísticas por escena, con memoria acotada.
+
+    1. Cada escena se lee una sola vez, tesela por tesela, y se escribe en un cubo
+       temporal ordenado por teselas (en disco si no cabe en memory_limit).
+    2. Los percentiles se calculan por tesela, en paralelo, con ordenamientos parciales.
+    Las escenas se leen en paralelo también; cada hilo tiene un solo lector abierto.
+    """
+    roi_mask = np.ones(grid.shape, dtype=bool) if roi_mask is None else roi_mask
+    bands = {f"{b}_p{p}": np.full(grid.shape, np.nan, dtype=np.float32)
+             for b in ("LST", "NDVI") for p in percentiles}
+    total_pixels = int(roi_mask.sum())
+    n = len(sources)
+    plan = plan_cube(grid.shape, n, 2, len(bands) + 1, memory_limit, workers)
+    tiles = [win for win in windows(grid, plan.block)
+             if roi_mask[win[0]:win[0] + win[2], win[1]:win[1] + win[3]].any()]
+    if not n or not tiles:
+        return LocalComposite(grid=grid, mask=roi_mask, bands=bands,
+                              scenes=[_scene_row(s, (0, 0, None, None), (0, 0), total_pixels) for s in sources])
+
+    directory = (scratch_dir or tempfile.gettempdir()) if plan.on_disk else None
+    with TemporalCube(len(tiles), n, plan.block, directory) as lst_cube, \
+            TemporalCube(len(tiles), n, plan.block, directory) as ndvi_cube:
+
+        def ingest(i):
+            lst_stats = [0.0, 0, -np.inf, np.inf]
+            ndvi_stats = [0.0, 0]
+            reader = sources[i].open(grid)
+            try:
+                for t, (row, col, h, w) in enumerate(tiles):
+                    win_mask = roi_mask[row:row + h, col:col + w]
+                    lst, nd = process_scene(*(reader.read(b, row, col, h, w) for b in BANDS))
+                    lst[~win_mask] = np.nan
+                    nd[~win_mask] = np.nan
+                    lst_cube.write(t, i, lst)
+                    ndvi_cube.write(t, i, nd)
+
+                    vals = lst[np.isfinite(lst)]
+                    if vals.size:
+                        lst_stats[0] += vals.sum(dtype=np.float64)
+                        lst_stats[1] += vals.size
+                        lst_stats[2] = max(lst_stats[2], float(vals.max()))
+                        lst_stats[3] = min(lst_stats[3], float(vals.min()))
+                    vals = nd[np.isfinite(nd)]
+                    ndvi_stats[0] += vals.sum(dtype=np.float64)
+                    ndvi_stats[1] += vals.size
+            finally:
+                reader.close()
+            return _scene_row(sources[i], lst_stats, ndvi_stats, total_pixels)
+
+        def reduce_tile(t):
+            row, col, h, w = tiles[t]
+            for name, cube in (("LST", lst_cube), ("NDVI", ndvi_cube)):
+                for p, arr in nan_percentiles(cube.read(t), percentiles).items():
+                    bands[f"{name}_p{p}"][row:row + h, col:col + w] = arr[:h, :w]
+
+        with ThreadPoolExecutor(max_workers=plan.workers) as pool:
+            scenes = list(pool.map(ingest, range(n)))
+            list(pool.map(reduce_tile, range(len(tiles))))
+
+    return LocalComposite(grid=grid, mask=roi_mask, bands=bands, scenes=scenes)
+
+
+class LocalBackend:
+    """Catálogo de escenas en disco + compuestos locales memoizados (LRU) por localidad y periodo.
+
+    memory_limit (bytes) acota cada compuesto; los cubos que no caben van a scratch_dir.
+    """
+
+    def __init__(self, directory, max_entries=8, percentiles=(50, 75, 90),
+                 memory_limit=DEFAULT_MEMORY_LIMIT, workers=None, scratch_dir=None):
+        self.directory = Path(directory)
+        self.max_entries = max_entries
+        self.percentiles = tuple(percentiles)
+        self.memory_limit = memory_limit
+        self.workers = workers
+        self.scratch_dir = scratch_dir
+        self._scenes = None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def scenes(self):
+        if self._scenes is None:
+            self._scenes = find_scenes(self.directory)
+        return self._scenes
+
+    def composite(self, locality, start, end, max_clouds):
+        key = (locality.name, str(start), str(end), int(max_clouds))
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                record_cache("compuestos_locales", True)
+                return self._entries[key]
+        record_cache("compuestos_locales", False)
+        grid = Grid.for_locality(locality)
+        sources = select_scenes(self.scenes, start, end, max_clouds)
+        with span("build_local_composite"):
+            result = build_local_composite(
+                sources, grid, locality_mask(locality, grid), percentiles=self.percentiles,
+                memory_limit=self.memory_limit, workers=self.workers, scratch_dir=self.scratch_dir)
+        with self._lock:
+            self._entries[key] = result
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return result
+
+    def trend(self, locality, first_year, last_year, max_clouds, months=None):
+        """Tendencia de LST por píxel de los años pedidos (icu.trend), memoizada en el mismo LRU que los compuestos."""
+        from icu.trend import build_local_trend
+        key = ("tendencia", locality.name, int(first_year), int(last_year), int(max_clouds), tuple(months or ()))
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                record_cache("compuestos_locales", True)
+                return self._entries[key]
+        record_cache("compuestos_locales", False)
+        grid = Grid.for_locality(locality)
+        sources = select_scenes(self.scenes, f"{first_year}-01-01", f"{last_year + 1}-01-01", max_clouds)
+        with span("build_local_trend"):
+            result = build_local_trend(
+                sources, grid, locality_mask(locality, grid), months=months,
+                memory_limit=self.memory_limit, workers=self.workers, scratch_dir=self.scratch_dir)
+        with self._lock:
+            self._entries[key] = result
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return result
+
+
+@lru_cache(maxsize=None)
+def get_local_backend(directory, max_entries=8, memory_limit=DEFAULT_MEMORY_LIMIT, workers=None, scratch_dir=None):
+    """Motor local único por proceso (compartido por todas las sesiones)."""
+    return LocalBackend(directory, max_entries=max_entries, memory_limit=memory_limit,
+                        workers=workers, scratch_dir=scratch_dir)
@@ -0,0 +1,163 @@
+# --------------------------------------------------------------
+# localities.py — Índice local de localidades urbanas de Tabasco
+# Se carga una sola vez por proceso desde el shapefile incluido en
+# localidades_urbanas/, para no consultar el asset de GEE en cada rerun.
+# --------------------------------------------------------------
+
+import unicodedata
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+import shapefile
+
+from icu.geo import UTM_ZONE, utm_to_lonlat
+
+SHAPEFILE = Path(__file__).resolve().parent.parent / "localidades_urbanas" / "localidades_urbanas.shp"
+
+
+def _signed_area(ring):
+    """Área con signo (fórmula del polígono). Negativa = sentido horario."""
+    x, y = ring[:, 0], ring[:, 1]
+    return 0.5 * float(np.dot(x[:-1], y[1:]) - np.dot(x[1:], y[:-1]))
+
+
+def _ring_centroid(ring, area):
+    x, y = ring[:, 0], ring[:, 1]
+    cross = x[:-1] * y[1:] - x[1:] * y[:-1]
+    cx = float(np.sum((x[:-1] + x[1:]) * cross)) / (6 * area)
+    cy = float(np.sum((y[:-1] + y[1:]) * cross)) / (6 * area)
+    return cx, cy
+
+
+def _point_in_ring(x, y, ring):
+    """Prueba par-impar (ray casting) vectorizada sobre los segmentos del anillo."""
+    x0, y0 = ring[:-1, 0], ring[:-1, 1]
+    x1, y1 = ring[1:, 0], ring[1:, 1]
+    crosses = (y0 > y) != (y1 > y)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        x_int = x0 + (y - y0) * (x1 - x0) / (y1 - y0)
+    return bool(np.count_nonzero(crosses & (x < x_int)) % 2)
+
+
+def rings_to_polygons(rings):
+    """Agrupa los anillos en polígonos GeoJSON (exterior antihorario + huecos horarios)."""
+    polys = []
+    for ring in rings:
+        coords = ring.tolist()
+        if _signed_area(ring) < 0 or not polys:
+            polys.append([coords[::-1]])
+        else:
+            polys[-1].append(coords[::-1])
+    return polys
+
+
+@dataclass(frozen=True)
+class Locality:
+    name: str
+    cvegeo: str
+    rings: tuple          # anillos (lon, lat) en orden del shapefile: exteriores horarios, huecos antihorarios
+    bbox: tuple           # (min_lon, min_lat, max_lon, max_lat)
+    centroid: tuple       # (lon, lat)
+    area_km2: float
+
+    def contains(self, lon, lat):
+        min_lon, min_lat, max_lon, max_lat = self.bbox
+        if not (min_lon <= lon <= max_lon and min_lat <= lat <= max_lat):
+            return False
+        # Regla par-impar sobre todos los anillos: un hueco cancela a su exterior
+        inside = False
+        for ring in self.rings:
+            if _point_in_ring(lon, lat, ring):
+                inside = not inside
+        return inside
+
+    def polygons(self):
+        return rings_to_polygons(self.rings)
+
+    def geojson(self):
+        return {"type": "MultiPolygon", "coordinates": self.polygons()}
+
+    def ee_geometry(self):
+        """Geometría lista para GEE, construida en el cliente sin consultar el asset."""
+        import ee
+        return ee.Geometry(self.geojson(), None, False)
+
+
+class LocalityIndex:
+    """Localidades indexadas por NOMGEO con consultas de nombre y de punto en memoria."""
+
+    def __init__(self, localities):
+        self._by_name = {loc.name: loc for loc in localities}
+
+    def __len__(self):
+        return len(self._by_name)
+
+    def __iter__(self):
+        return iter(self._by_name.values())
+
+    def __contains__(self, name):
+        return name in self._by_name
+
+    def get(self, name):
+        return self._by_name.get(name)
+
+    def names(self):
+        """Nombres ordenados alfabéticamente ignorando acentos (para los selectores)."""
+        def key(name):
+            return unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode().lower()
+        return sorted(self._by_name, key=key)
+
+    def bbox(self):
+        """(min_lon, min_lat, max_lon, max_lat) que abarca todas las localidades."""
+        boxes = np.array([loc.bbox for loc in self._by_name.values()])
+        return (float(boxes[:, 0].min()), float(boxes[:, 1].min()),
+                float(boxes[:, 2].max()), float(boxes[:, 3].max()))
+
+    def locate(self, lon, lat):
+        """Localidad que contiene el punto (lon, lat), o None si cae fuera de todas."""
+        for loc in self._by_name.values():
+            if loc.contains(lon, lat):
+                return loc
+        return None
+
+
+def _build_locality(record, shape, zone):
+    parts = list(shape.parts) + [len(shape.points)]
+    points = np.asarray(shape.points, dtype="float64")
+
+    rings_utm = [points[parts[i]:parts[i + 1]] for i in range(len(parts) - 1)]
+    # En el shapefile los exteriores van en sentido horario: su área con signo es negativa
+    areas = [-_signed_area(ring) for ring in rings_utm]
+    total = sum(areas)
+    cx = sum(_ring_centroid(r, -a)[0] * a for r, a in zip(rings_utm, areas)) / total
+    cy = sum(_ring_centroid(r, -a)[1] * a for r, a in zip(rings_utm, areas)) / total
+
+    rings = []
+    for ring in rings_utm:
+        lon, lat = utm_to_lonlat(ring[:, 0], ring[:, 1], zone=zone)
+        rings.append(np.column_stack([lon, lat]))
+    all_pts = np.vstack(rings)
+    c_lon, c_lat = utm_to_lonlat(cx, cy, zone=zone)
+
+    return Locality(
+        name=record["NOMGEO"],
+        cvegeo=record["CVEGEO"],
+        rings=tuple(rings),
+        bbox=(float(all_pts[:, 0].min()), float(all_pts[:, 1].min()),
+              float(all_pts[:, 0].max()), float(all_pts[:, 1].max())),
+        centroid=(float(c_lon), float(c_lat)),
+        area_km2=total / 1e6,
+    )
+
+
+@lru_cache(maxsize=None)
+def load_locality_index(path=SHAPEFILE, zone=UTM_ZONE):
+    """Lee el shapefile una sola vez por proceso (resultado memoizado)."""
+    with shapefile.Reader(str(path), encoding="utf-8") as reader:
+        localities = [
+            _build_locality(sr.record.as_dict(), sr.shape, zone)
+            for sr in reader.iterShapeRecords()
+        ]
+    return LocalityIndex(localities)
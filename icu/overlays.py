@@ -0,0 +1,195 @@
+# --------------------------------------------------------------
+# overlays.py — Contornos vectoriales simplificados para el navegador
+# Los límites de las localidades viajan como GeoJSON dentro del HTML
+# del mapa (st_folium lo reenvía en cada rerun). Aquí se simplifican
+# con Douglas-Peucker a una tolerancia ligada al zoom (≈ medio píxel
+# de pantalla) sin romper la topología: si un anillo se cruza consigo
+# mismo o con otro, se reintenta con la mitad de tolerancia. Las
+# coordenadas se redondean a la precisión que ese zoom puede mostrar y
+# el resultado queda en caché por (localidad, tolerancia).
+# --------------------------------------------------------------
+
+import math
+import threading
+from functools import lru_cache
+
+import numpy as np
+
+from icu.localities import rings_to_polygons
+from icu.tracing import record_cache
+
+# Metros por píxel en el ecuador a zoom 0 (teselas Web Mercator de 256 px)
+EQUATOR_M_PER_PX = 156543.03392
+METERS_PER_DEGREE = 111320.0
+# Tolerancia en píxeles de pantalla y máximo de intentos (cada uno a la mitad)
+TOLERANCE_PX = 0.5
+MAX_ATTEMPTS = 4
+MAX_DIGITS = 6
+
+
+def meters_per_pixel(zoom, lat):
+    return EQUATOR_M_PER_PX * math.cos(math.radians(lat)) / 2 ** zoom
+
+
+def tolerance_for_zoom(zoom, lat, pixels=TOLERANCE_PX):
+    """Tolerancia (m) para el zoom, redondeada a 2 cifras para que la caché reutilice entradas."""
+    tol = meters_per_pixel(zoom, lat) * pixels
+    return float(f"{tol:.2g}")
+
+
+def digits_for_tolerance(tolerance_m):
+    """Decimales de grado que bastan para una décima de la tolerancia."""
+    step = tolerance_m / 10 / METERS_PER_DEGREE
+    return max(0, min(MAX_DIGITS, math.ceil(-math.log10(step))))
+
+
+def zoom_for_bounds(bbox, width=800, height=500):
+    """Zoom entero con el que fit_bounds mostraría bbox (min_lon, min_lat, max_lon, max_lat) completo."""
+    min_lon, min_lat, max_lon, max_lat = bbox
+    lat = (min_lat + max_lat) / 2
+    span_m = max((max_lon - min_lon) * math.cos(math.radians(lat)) * METERS_PER_DEGREE / width,
+                 (max_lat - min_lat) * METERS_PER_DEGREE / height, 1e-9)
+    return max(0, min(18, int(math.log2(EQUATOR_M_PER_PX * math.cos(math.radians(lat)) / span_m))))
+
+
+def _area(ring):
+    x, y = ring[:, 0], ring[:, 1]
+    return 0.5 * abs(float(np.dot(x[:-1], y[1:]) - np.dot(x[1:], y[:-1])))
+
+
+def douglas_peucker(points, tolerance):
+    """Índices de los vértices que se conservan (iterativo, sin recursión)."""
+    keep = np.zeros(len(points), dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        a, b = points[first], points[last]
+        seg = points[first + 1:last] - a
+        ab = b - a
+        norm = math.hypot(*ab)
+        if norm == 0:
+            dist = np.hypot(seg[:, 0], seg[:, 1])
+        else:
+            dist = np.abs(ab[0] * seg[:, 1] - ab[1] * seg[:, 0]) / norm
+        i = int(np.argmax(dist))
+        if dist[i] > tolerance:
+            split = first + 1 + i
+            keep[split] = True
+            stack += [(first, split), (split, last)]
+    return keep
+
+
+def _simplify_ring(ring, tolerance):
+    """Anillo cerrado simplificado; el punto más lejano al inicio también se fija para no colapsarlo."""
+    far = int(np.argmax(np.hypot(*(ring - ring[0]).T)))
+    keep = np.concatenate([douglas_peucker(ring[:far + 1], tolerance)[:-1],
+                           douglas_peucker(ring[far:], tolerance)])
+    return ring[keep]
+
+
+def _segments(rings):
+    """Segmentos de todos los anillos: (inicios, finales, anillo, posición)."""
+    starts = np.vstack([r[:-1] for r in rings])
+    ends = np.vstack([r[1:] for r in rings])
+    ring_id = np.concatenate([np.full(len(r) - 1, i) for i, r in enumerate(rings)])
+    pos = np.concatenate([np.arange(len(r) - 1) for r in rings])
+    return starts, ends, ring_id, pos
+
+
+def rings_cross(rings):
+    """True si algún par de segmentos no contiguos se cruza (vectorizado, O(n²) sobre pocos vértices)."""
+    p, q, ring_id, pos = _segments(rings)
+
+    def orient(a, b, c):
+        return np.sign((b[..., 0] - a[..., 0]) * (c[..., 1] - a[..., 1])
+                       - (b[..., 1] - a[..., 1]) * (c[..., 0] - a[..., 0]))
+
+    P, Q = p[:, None, :], q[:, None, :]
+    R, S = p[None, :, :], q[None, :, :]
+    crosses = (orient(P, Q, R) * orient(P, Q, S) < 0) & (orient(R, S, P) * orient(R, S, Q) < 0)
+    # Segmentos contiguos del mismo anillo comparten un vértice: no cuentan
+    same = ring_id[:, None] == ring_id[None, :]
+    sizes = np.bincount(ring_id)[ring_id]
+    gap = np.abs(pos[:, None] - pos[None, :])
+    adjacent = same & ((gap <= 1) | (gap == sizes[:, None] - 1))
+    return bool(np.any(crosses & ~adjacent))
+
+
+def simplify_rings(rings, tolerance_deg):
+    """Anillos (lon, lat) simplificados sin cruces; los que colapsan a menos de un triángulo se descartan."""
+    lat0 = float(np.mean(np.vstack(rings)[:, 1]))
+    scale = np.array([math.cos(math.radians(lat0)), 1.0])
+    tol = tolerance_deg
+    for _ in range(MAX_ATTEMPTS):
+        out = []
+        for ring in rings:
+            simple = _simplify_ring(ring * scale, tol) / scale
+            if len(simple) >= 4 and _area(simple * scale) > tol * tol:
+                out.append(simple)
+            elif _area(ring * scale) > 4 * tol * tol:
+                out.append(ring)    # anillo grande que se degeneró: se deja completo
+        if out and not rings_cross(out):
+            return out
+        tol /= 2
+    return list(rings)
+
+
+def _round_coords(coords, digits):
+    if coords and isinstance(coords[0], (int, float)):
+        return [round(c, digits) for c in coords]
+    return [_round_coords(c, digits) for c in coords]
+
+
+def quantize_geojson(obj, digits):
+    """Copia de un objeto GeoJSON (geometría, Feature o FeatureCollection) con coordenadas redondeadas."""
+    if isinstance(obj, list):
+        return [quantize_geojson(o, digits) for o in obj]
+    if not isinstance(obj, dict):
+        return obj
+    return {k: _round_coords(v, digits) if k == "coordinates" else quantize_geojson(v, digits)
+            for k, v in obj.items()}
+
+
+class OverlayCache:
+    """GeoJSON simplificado y cuantizado por (capa, tolerancia); compartido por todas las sesiones."""
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, tolerance, compute):
+        """compute(tolerancia_m, decimales) -> GeoJSON, memoizado por (key, tolerancia)."""
+        key = (key, tolerance)
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self.hits += 1
+        record_cache("contornos", value is not None)
+        if value is not None:
+            return value
+        value = compute(tolerance, digits_for_tolerance(tolerance))
+        with self._lock:
+            self._entries[key] = value
+            self.misses += 1
+        return value
+
+    def locality(self, locality, zoom):
+        """Contorno de una localidad (del shapefile) simplificado para el zoom."""
+        def compute(tolerance, digits):
+            rings = [np.round(r, digits) for r in simplify_rings(locality.rings, tolerance / METERS_PER_DEGREE)]
+            return {"type": "MultiPolygon", "coordinates": rings_to_polygons(rings)}
+        return self.get(locality.name, tolerance_for_zoom(zoom, locality.centroid[1]), compute)
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
+
+
+@lru_cache(maxsize=None)
+def get_overlay_cache():
+    return OverlayCache()
@@ -0,0 +1,144 @@
+# --------------------------------------------------------------
+# parallel.py — Ejecución concurrente acotada de consultas a GEE
+# Las consultas de GEE son E/S bloqueante: un pool de hilos basta.
+# Los resultados se entregan conforme terminan (resultados parciales).
+# JobGroup deja trabajos con nombre corriendo en un pool del proceso
+# entre reruns, para pintar cada capa en cuanto esté lista; sus
+# consultas se miden en una traza propia que se suma al render que
+# consume los resultados.
+# --------------------------------------------------------------
+
+import contextvars
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any
+
+from icu.tracing import Trace, context_with, current_trace
+
+
+@dataclass
+class TaskResult:
+    item: Any
+    value: Any = None
+    error: str | None = None
+    elapsed: float = 0.0
+    timed_out: bool = False
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
+def _timed(fn, item, started):
+    started[item] = time.monotonic()
+    return fn(item)
+
+
+def run_parallel(items, fn, max_workers=6, timeout=120.0, poll=0.25):
+    """Ejecuta fn(item) para cada item en un pool acotado y produce TaskResult al terminar cada uno.
+
+    El timeout es por tarea y cuenta desde que la tarea empieza a ejecutarse
+    (no desde que entra a la cola). Una tarea vencida se reporta como error y
+    deja de esperarse; el hilo no puede interrumpirse, pero el render continúa.
+    """
+    items = list(items)
+    if not items:
+        return
+    started = {}
+    executor = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(items))))
+    try:
+        # Cada tarea recibe su propia copia del contexto (contadores de consultas, etc.)
+        pending = {
+            executor.submit(contextvars.copy_context().run, _timed, fn, item, started): item
+            for item in items
+        }
+        while pending:
+            done, _ = wait(pending, timeout=poll, return_when=FIRST_COMPLETED)
+            now = time.monotonic()
+            for future in done:
+                item = pending.pop(future)
+                elapsed = now - started.get(item, now)
+                try:
+                    yield TaskResult(item, value=future.result(), elapsed=elapsed)
+                except Exception as e:
+                    yield TaskResult(item, error=str(e), elapsed=elapsed)
+            for future, item in list(pending.items()):
+                if item in started and now - started[item] > timeout:
+                    del pending[future]
+                    future.cancel()
+                    yield TaskResult(item, error=f"Tiempo agotado ({timeout:.0f} s)",
+                                     elapsed=now - started[item], timed_out=True)
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+@lru_cache(maxsize=None)
+def get_shared_pool(max_workers=8):
+    """Pool de hilos único por proceso para trabajos que sobreviven al rerun que los lanzó."""
+    return ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="icu-jobs")
+
+
+class JobGroup:
+    """Trabajos con nombre en un pool compartido; `then` encadena uno al resultado de otro sin ocupar un hilo esperando."""
+
+    def __init__(self, executor):
+        self.executor = executor
+        self.futures = {}
+        # Los trabajos pueden terminar después de que se cerró la traza del render que los lanzó
+        self.trace = Trace()
+
+    def submit(self, name, fn, *args):
+        self.futures[name] = self.executor.submit(context_with(self.trace).run, fn, *args)
+        return self.futures[name]
+
+    def then(self, name, after, fn):
+        """fn(resultado de `after`) en cuanto `after` termina; si `after` falla, este falla igual."""
+        out = Future()
+        ctx = context_with(self.trace)
+
+        def relay(inner):
+            if inner.exception() is not None:
+                out.set_exception(inner.exception())
+            else:
+                out.set_result(inner.result())
+
+        def start(dep):
+            if dep.exception() is not None:
+                out.set_exception(dep.exception())
+                return
+            self.executor.submit(ctx.run, fn, dep.result()).add_done_callback(relay)
+
+        self.futures[after].add_done_callback(start)
+        self.futures[name] = out
+        return out
+
+    def done(self, name):
+        future = self.futures.get(name)
+        return future is not None and future.done() and future.exception() is None
+
+    def result(self, name, default=None):
+        return self.futures[name].result() if self.done(name) else default
+
+    def errors(self):
+        return {name: str(f.exception()) for name, f in self.futures.items()
+                if f.done() and f.exception() is not None}
+
+    def pending(self):
+        return [name for name, f in self.futures.items() if not f.done()]
+
+    def collect(self):
+        """Pasa a la traza del render actual lo que midieron los trabajos desde la última vez."""
+        trace = current_trace()
+        if trace is not None:
+            trace.absorb(self.trace)
+
+    def wait(self, timeout=None):
+        """Espera a todos (los encadenados aparecen al terminar su dependencia)."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.pending():
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                break
+            wait([self.futures[n] for n in self.pending()], timeout=remaining)
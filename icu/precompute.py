@@ -0,0 +1,173 @@
+# --------------------------------------------------------------
+# precompute.py — Precálculo por lotes, sin Streamlit
+# Para cada localidad de la capa (NOMGEO) y cada temporada (seca /
+# lluvias) de los años pedidos calcula conteo, umbrales, resumen,
+# serie por escena, arreglos del mosaico y cúmulos, y los guarda en
+# el almacén de resultados que el tablero consulta primero.
+# Es reanudable: los trabajos terminados se saltan. Antes se pone al
+# día el catálogo de escenas; los periodos sin escenas limpias se
+# guardan con conteo 0 sin consultar a GEE.
+#
+#   python -m icu.precompute --years 2020 2024 --workers 4
+#   python -m icu.precompute --season seca:03-01:05-31 --localities Teapa Villahermosa
+# --------------------------------------------------------------
+
+import argparse
+import datetime as dt
+import os
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+
+import ee
+
+from icu.catalog import SceneCatalog
+from icu.composites import get_composite_cache
+from icu.distribution import distribution_builders
+from icu.localities import load_locality_index
+from icu.parallel import run_parallel
+from icu.products import SCENE_STATS, composite_clusters, summary_builders, threshold_builders
+from icu.raster import Grid
+from icu.results import STATUS_DONE, STATUS_FAILED, period_key
+from icu.scenestore import SceneStore
+from icu.session import get_gee_session
+
+# Temporadas del paso 7 del script original (mes-día inicial, mes-día final)
+SEASONS = {"seca": ("03-01", "05-31"), "lluvias": ("07-01", "09-30")}
+MAX_NUBES = 30
+# Mismo directorio que el tablero (tablero.config): ICU_CACHE_DIR o .cache en la raíz
+CACHE_DIR = Path(os.environ.get("ICU_CACHE_DIR") or Path(__file__).resolve().parents[1] / ".cache")
+# Valores del compuesto que se copian al almacén de resultados
+STORED_VALUES = ("count", "lst_p90", "ndvi_p95", "lst_mean_max_100", "product_ids", "clusters",
+                 "dist_fit", "dist_density")
+
+
+@dataclass(frozen=True)
+class Task:
+    locality: str
+    label: str
+    start: str
+    end: str
+    max_clouds: int
+
+    @property
+    def key(self):
+        return period_key(self.locality, self.start, self.end, self.max_clouds)
+
+
+def parse_season(text):
+    """'seca:03-01:05-31' -> ('seca', ('03-01', '05-31'))."""
+    try:
+        name, start, end = text.split(":")
+        dt.date.fromisoformat(f"2000-{start}")
+        dt.date.fromisoformat(f"2000-{end}")
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Temporada inválida: {text} (use nombre:MM-DD:MM-DD)")
+    return name, (start, end)
+
+
+def season_periods(seasons, years):
+    """[(etiqueta, inicio, fin)] por año y temporada; una temporada que cruza el año termina en el siguiente."""
+    periods = []
+    for year in years:
+        for name, (start, end) in seasons.items():
+            end_year = year + 1 if end < start else year
+            periods.append((f"{name} {year}", f"{year}-{start}", f"{end_year}-{end}"))
+    return periods
+
+
+def initialize_ee():
+    """Misma autenticación que el tablero: cuenta de servicio (variables de entorno o .env) o credenciales locales."""
+    try:
+        from dotenv import load_dotenv
+        load_dotenv()
+    except ImportError:
+        pass
+    account, key = os.environ.get("GEE_SERVICE_ACCOUNT"), os.environ.get("GEE_PRIVATE_KEY")
+    if account and key:
+        ee.Initialize(ee.ServiceAccountCredentials(account, key_data=key.strip().replace("\\n", "\n")))
+    else:
+        ee.Initialize()
+
+
+class Precompute:
+    def __init__(self, cache_dir=CACHE_DIR, arrays=True, workers=4):
+        self.index = load_locality_index()
+        self.cache = get_composite_cache(max_entries=2 * workers, disk_dir=cache_dir / "composites",
+                                         results_dir=cache_dir / "results")
+        self.store = self.cache.store
+        self.scenes = SceneStore(cache_dir / "scenes.sqlite", SCENE_STATS)
+        self.catalog = SceneCatalog(cache_dir / "catalog.sqlite")
+        self.arrays = arrays
+
+    def run_task(self, task):
+        locality = self.index.get(task.locality)
+        if self.catalog.count(locality, task.start, task.end, task.max_clouds) == 0:
+            self.store.save(task.key, {"count": 0})
+            return 0
+        comp = self.cache.get(task.locality, task.start, task.end, task.max_clouds, ("LST", "NDVI"),
+                              roi_factory=locality.ee_geometry,
+                              scene_key=self.catalog.scene_key(locality, task.start, task.end, task.max_clouds))
+        values = comp.get_many({**threshold_builders(comp), **summary_builders(comp), **distribution_builders(comp)})
+        if values["count"]:
+            self.scenes.series(task.locality, comp.roi, values["product_ids"])
+            if self.arrays:
+                grid = Grid.for_locality(locality)
+                self.store.save_arrays(task.key, grid, comp.arrays(grid))
+            composite_clusters(comp, locality)
+        self.store.save(task.key, {name: comp.values[name] for name in STORED_VALUES if name in comp.values})
+        return values["count"]
+
+    def run(self, tasks, workers=4, timeout=1800):
+        """Ejecuta los trabajos en un pool; cada uno queda marcado (terminado / fallido) al acabar."""
+        failures = 0
+        for i, res in enumerate(run_parallel(tasks, self.run_task, max_workers=workers, timeout=timeout), start=1):
+            task = res.item
+            if res.ok:
+                self.store.mark(task.key, STATUS_DONE, label=task.label, elapsed=res.elapsed)
+                print(f"[{i}/{len(tasks)}] ✔ {task.locality} · {task.label}: {res.value} escenas ({res.elapsed:.1f} s)")
+            else:
+                failures += 1
+                self.store.mark(task.key, STATUS_FAILED, label=task.label, error=res.error, elapsed=res.elapsed)
+                print(f"[{i}/{len(tasks)}] ✘ {task.locality} · {task.label}: {res.error}", file=sys.stderr)
+        return failures
+
+
+def main(argv=None):
+    today = dt.date.today()
+    parser = argparse.ArgumentParser(description="Precálculo por lotes de islas de calor (localidades × temporadas).")
+    parser.add_argument("--years", nargs="+", type=int, default=[today.year - 1],
+                        help="Años, o un rango 'inicio fin' (por defecto el año pasado)")
+    parser.add_argument("--season", action="append", type=parse_season, dest="seasons",
+                        help="Temporada nombre:MM-DD:MM-DD (repetible; por defecto seca y lluvias)")
+    parser.add_argument("--localities", nargs="+", help="NOMGEO a procesar (por defecto todas)")
+    parser.add_argument("--max-clouds", type=int, default=MAX_NUBES)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--timeout", type=float, default=1800, help="Segundos por trabajo")
+    parser.add_argument("--cache-dir", type=Path, default=CACHE_DIR)
+    parser.add_argument("--no-arrays", action="store_true", help="No guardar los arreglos del mosaico")
+    parser.add_argument("--force", action="store_true", help="Recalcular también los trabajos terminados")
+    args = parser.parse_args(argv)
+
+    years = range(args.years[0], args.years[1] + 1) if len(args.years) == 2 else args.years
+    seasons = dict(args.seasons) if args.seasons else SEASONS
+    # Misma sesión que el tablero: cupo de consultas = trabajadores, reintentos y cortacircuitos
+    get_gee_session(max_concurrent=max(1, args.workers)).initialize(initialize_ee)
+    job = Precompute(args.cache_dir, arrays=not args.no_arrays, workers=args.workers)
+
+    names = args.localities or job.index.names()
+    unknown = [n for n in names if n not in job.index]
+    if unknown:
+        parser.error(f"Localidades desconocidas: {', '.join(unknown)}")
+    done = set() if args.force else job.store.done()
+    tasks = [Task(name, label, start, end, args.max_clouds)
+             for label, start, end in season_periods(seasons, years) for name in names]
+    pending = [t for t in tasks if t.key not in done]
+    added = job.catalog.refresh(job.index.bbox())
+    print(f"Catálogo de escenas al día ({added} nuevas).")
+    print(f"{len(pending)} trabajos pendientes ({len(tasks) - len(pending)} ya terminados).")
+    return 1 if job.run(pending, workers=args.workers, timeout=args.timeout) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
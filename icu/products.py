@@ -0,0 +1,74 @@
+# --------------------------------------------------------------
+# products.py — Productos derivados de un compuesto
+# Valores que piden los paneles (conteos, umbrales, resúmenes,
+# cúmulos) definidos en un solo lugar, para que el tablero y el
+# precálculo por lotes (icu.precompute) usen los mismos nombres y
+# las mismas expresiones de GEE.
+# --------------------------------------------------------------
+
+import ee
+
+from icu.batch import when_not_empty
+from icu.hotspots import find_clusters
+from icu.raster import Grid, locality_mask
+from icu.scenestats import SceneStatsConfig
+
+# Estadísticas por escena del tablero; todas con un solo reductor combinado por escena
+SCENE_STATS = SceneStatsConfig(
+    stats=("mean", "max", "min", "stdDev", "p10", "p50", "p90", "count"),
+    bands=("LST", "NDVI"), scale=100, best_effort=True, tile_scale=2,
+)
+
+
+def scene_builders(comp):
+    """Conteo de escenas e IDs (para la serie por escena)."""
+    col = comp.collection
+    return {
+        "count": lambda: col.size(),
+        "product_ids": lambda: col.aggregate_array("LANDSAT_PRODUCT_ID"),
+    }
+
+
+def threshold_builders(comp):
+    """Conteo y umbrales p90 (LST) / p95 (NDVI) del panel de mapas."""
+    roi, size = comp.roi, comp.collection.size()
+    mosaic = comp.mosaic
+    return {
+        "count": lambda: size,
+        "lst_p90": lambda: when_not_empty(size, mosaic.select("LST_p50").reduceRegion(
+            ee.Reducer.percentile([90]), roi, 30).get("LST_p50")),
+        "ndvi_p95": lambda: when_not_empty(size, mosaic.select("NDVI_p50").reduceRegion(
+            ee.Reducer.percentile([95]), roi, 30).get("NDVI_p50")),
+    }
+
+
+def summary_builders(comp):
+    """Conteo, LST media/máxima a 100 m e IDs de escena (panel de comparativa)."""
+    roi, col = comp.roi, comp.collection
+    lst = comp.mosaic.select("LST_p50")
+    size = col.size()
+    return {
+        "count": lambda: size,
+        "lst_mean_max_100": lambda: when_not_empty(size, lst.reduceRegion(
+            reducer=ee.Reducer.mean().combine(reducer2=ee.Reducer.max(), sharedInputs=True),
+            geometry=roi, scale=100, bestEffort=True
+        )),
+        "product_ids": lambda: col.aggregate_array("LANDSAT_PRODUCT_ID"),
+    }
+
+
+def composite_clusters(comp, locality):
+    """Islas de calor y refugios (GeoJSON) del compuesto, memoizados en él; None si no hay escenas.
+
+    El mosaico se baja una vez como arreglo (computePixels) en la malla de la localidad.
+    """
+    scalars = comp.get_many(threshold_builders(comp))
+    if not scalars["count"]:
+        return None
+
+    def compute():
+        grid = Grid.for_locality(locality)
+        collection, _ = find_clusters(comp.arrays(grid), grid, locality_mask(locality, grid),
+                                      scalars["lst_p90"], scalars["ndvi_p95"])
+        return collection
+    return comp.get("clusters", compute)
@@ -0,0 +1,86 @@
+# --------------------------------------------------------------
+# ranking.py — Ranking de islas de calor de todas las localidades
+# Un solo compuesto p50 sobre la unión de las localidades (más su
+# franja rural) y un reduceRegions sobre la capa completa de áreas
+# urbanas: todas las localidades salen de un mismo viaje a GEE.
+# Intensidad de la isla de calor = LST urbana media − LST media de
+# una franja rural alrededor de cada localidad.
+# --------------------------------------------------------------
+
+import ee
+
+from icu.batch import when_not_empty
+
+# Ancho de la franja rural (m) y escala de las reducciones
+RURAL_BUFFER_M = 2000
+RANKING_SCALE = 30
+# Error máximo (m) al bufferear / recortar geometrías; no cambia el resultado a 30 m
+MAX_ERROR = 30
+NAME_PROPERTY = "NOMGEO"
+
+
+def ranking_region(urban, buffer_m=RURAL_BUFFER_M):
+    """Región del compuesto: unión de las localidades con su franja rural."""
+    return urban.geometry(MAX_ERROR).buffer(buffer_m, MAX_ERROR)
+
+
+def rural_rings(urban, buffer_m=RURAL_BUFFER_M):
+    """Franja alrededor de cada localidad, sin ninguna área urbana (tampoco la de otras localidades)."""
+    urban_geom = urban.geometry(MAX_ERROR)
+    return urban.map(lambda f: f.setGeometry(
+        f.geometry().buffer(buffer_m, MAX_ERROR).difference(urban_geom, MAX_ERROR)))
+
+
+def ranking_builders(comp, urban, buffer_m=RURAL_BUFFER_M, scale=RANKING_SCALE):
+    """Builders para Composite.get_many (el compuesto debe cubrir ranking_region).
+
+    - ranking_threshold: p90 de LST en todas las áreas urbanas (umbral común de isla de calor)
+    - ranking_urban: por localidad, LST media/máx/p90, NDVI medio y fracción sobre el umbral
+    - ranking_rural: por localidad, LST media de su franja rural
+    """
+    size = comp.collection.size()
+    lst = comp.mosaic.select("LST_p50")
+    ndvi = comp.mosaic.select("NDVI_p50")
+    threshold = lst.reduceRegion(ee.Reducer.percentile([90]), urban.geometry(MAX_ERROR), scale,
+                                 bestEffort=True, tileScale=4).get("LST_p50")
+    # Con escenas limpias pero sin píxeles válidos en las áreas urbanas el p90 es nulo:
+    # entonces "hot" queda enmascarada y la reducción no falla en el servidor
+    hot = ee.Image(ee.Algorithms.If(threshold, lst.gt(ee.Number(threshold)),
+                                    ee.Image.constant(0).selfMask())).rename("hot")
+    reducer = (ee.Reducer.mean()
+               .combine(ee.Reducer.max(), sharedInputs=True)
+               .combine(ee.Reducer.percentile([90]), sharedInputs=True))
+    urban_stats = ee.Image.cat(lst, ndvi, hot).reduceRegions(
+        collection=urban, reducer=reducer, scale=scale, tileScale=4,
+    ).select([NAME_PROPERTY, "LST_p50_mean", "LST_p50_max", "LST_p50_p90", "NDVI_p50_mean", "hot_mean"])
+    rural_stats = lst.reduceRegions(
+        collection=rural_rings(urban, buffer_m), reducer=ee.Reducer.mean(), scale=scale, tileScale=4,
+    ).select([NAME_PROPERTY, "mean"])
+    return {
+        "count": lambda: size,
+        "ranking_threshold": lambda: when_not_empty(size, threshold),
+        "ranking_urban": lambda: when_not_empty(size, urban_stats),
+        "ranking_rural": lambda: when_not_empty(size, rural_stats),
+    }
+
+
+def ranking_rows(values):
+    """Resultado de ranking_builders -> una fila por localidad, de mayor a menor intensidad."""
+    rural = {f["properties"][NAME_PROPERTY]: f["properties"].get("mean")
+             for f in (values.get("ranking_rural") or {}).get("features", [])}
+    rows = []
+    for feature in (values.get("ranking_urban") or {}).get("features", []):
+        props = feature["properties"]
+        name = props[NAME_PROPERTY]
+        lst_mean, lst_rural = props.get("LST_p50_mean"), rural.get(name)
+        rows.append({
+            "name": name,
+            "lst_mean": lst_mean,
+            "lst_max": props.get("LST_p50_max"),
+            "lst_p90": props.get("LST_p50_p90"),
+            "ndvi_mean": props.get("NDVI_p50_mean"),
+            "hotspot_fraction": props.get("hot_mean"),
+            "lst_rural": lst_rural,
+            "uhi_intensity": lst_mean - lst_rural if lst_mean is not None and lst_rural is not None else None,
+        })
+    return sorted(rows, key=lambda r: (r["uhi_intensity"] is None, -(r["uhi_intensity"] or 0)))
@@ -0,0 +1,174 @@
+# --------------------------------------------------------------
+# raster.py — Malla de píxeles, ventanas, rasterizado y color
+# Utilidades compartidas por el motor local (sin GEE).
+# --------------------------------------------------------------
+
+import io
+from dataclasses import dataclass
+
+import numpy as np
+
+from icu.geo import UTM_ZONE, lonlat_to_utm, utm_to_lonlat
+
+# Los bordes de píxel de Landsat C2 caen en múltiplos de 30 m + 15 m:
+# alinear la malla así evita remuestrear las escenas de la zona 15N.
+LANDSAT_RES = 30.0
+LANDSAT_OFFSET = 15.0
+
+
+@dataclass(frozen=True)
+class Grid:
+    """Malla regular norte-arriba en UTM (EPSG:326zz)."""
+    x0: float           # borde oeste
+    y0: float           # borde norte
+    res: float
+    width: int
+    height: int
+    zone: int = UTM_ZONE
+
+    @classmethod
+    def from_bounds(cls, xmin, ymin, xmax, ymax, res=LANDSAT_RES, offset=LANDSAT_OFFSET, zone=UTM_ZONE):
+        x0 = np.floor((xmin - offset) / res) * res + offset
+        y0 = np.ceil((ymax - offset) / res) * res + offset
+        width = int(np.ceil((xmax - x0) / res))
+        height = int(np.ceil((y0 - ymin) / res))
+        return cls(float(x0), float(y0), float(res), width, height, zone)
+
+    @classmethod
+    def for_locality(cls, locality, res=LANDSAT_RES, zone=UTM_ZONE):
+        xs, ys = lonlat_to_utm(np.vstack(locality.rings)[:, 0], np.vstack(locality.rings)[:, 1], zone=zone)
+        return cls.from_bounds(xs.min(), ys.min(), xs.max(), ys.max(), res=res, zone=zone)
+
+    @property
+    def crs(self):
+        return f"EPSG:{32600 + self.zone}"
+
+    @property
+    def shape(self):
+        return (self.height, self.width)
+
+    @property
+    def transform(self):
+        """Coeficientes afines (a, b, c, d, e, f) al estilo GDAL/rasterio."""
+        return (self.res, 0.0, self.x0, 0.0, -self.res, self.y0)
+
+    @property
+    def bounds(self):
+        return (self.x0, self.y0 - self.height * self.res, self.x0 + self.width * self.res, self.y0)
+
+    def window(self, row, col, height, width):
+        """Submalla (alto, ancho) cuya esquina superior izquierda es el píxel (fila, columna)."""
+        return Grid(self.x0 + col * self.res, self.y0 - row * self.res, self.res, width, height, self.zone)
+
+    def ee_grid(self):
+        """Malla en el formato de ee.data.computePixels (PixelGrid)."""
+        return {
+            "dimensions": {"width": self.width, "height": self.height},
+            "affineTransform": {"scaleX": self.res, "shearX": 0, "translateX": self.x0,
+                                "shearY": 0, "scaleY": -self.res, "translateY": self.y0},
+            "crsCode": self.crs,
+        }
+
+    def latlon_bounds(self):
+        """[[lat_sur, lon_oeste], [lat_norte, lon_este]] para folium.ImageOverlay."""
+        xmin, ymin, xmax, ymax = self.bounds
+        lon, lat = utm_to_lonlat([xmin, xmax, xmin, xmax], [ymin, ymin, ymax, ymax], zone=self.zone)
+        return [[float(lat.min()), float(lon.min())], [float(lat.max()), float(lon.max())]]
+
+    def xy_to_pixel(self, x, y):
+        """(fila, columna) continuas; el centro del píxel (0, 0) es (0.5, 0.5)."""
+        return (self.y0 - np.asarray(y)) / self.res, (np.asarray(x) - self.x0) / self.res
+
+    def lonlat_to_pixel(self, lon, lat):
+        x, y = lonlat_to_utm(lon, lat, zone=self.zone)
+        return self.xy_to_pixel(x, y)
+
+    def pixel_centers(self, row0=0, col0=0, height=None, width=None):
+        height = self.height if height is None else height
+        width = self.width if width is None else width
+        xs = self.x0 + (np.arange(col0, col0 + width) + 0.5) * self.res
+        ys = self.y0 - (np.arange(row0, row0 + height) + 0.5) * self.res
+        return xs, ys
+
+    def pixel_area_m2(self):
+        return self.res * self.res
+
+
+def windows(grid, block=512):
+    """Ventanas (fila, columna, alto, ancho) que recorren la malla por bloques."""
+    for row in range(0, grid.height, block):
+        for col in range(0, grid.width, block):
+            yield row, col, min(block, grid.height - row), min(block, grid.width - col)
+
+
+def rasterize(rings_xy, grid):
+    """Máscara booleana (alto, ancho) de los píxeles cuyo centro cae dentro de los anillos (regla par-impar).
+
+    Barrido por filas: por cada fila se calculan los cruces con las aristas y se rellenan por pares.
+    """
+    mask = np.zeros(grid.shape, dtype=bool)
+    edges = []
+    for ring in rings_xy:
+        edges.append(np.column_stack([ring[:-1], ring[1:]]))
+    edges = np.vstack(edges)                      # (n, 4): x0, y0, x1, y1
+    x0, y0, x1, y1 = edges.T
+    xs, ys = grid.pixel_centers()
+    for row, y in enumerate(ys):
+        active = (y0 > y) != (y1 > y)
+        if not active.any():
+            continue
+        xc = np.sort(x0[active] + (y - y0[active]) * (x1[active] - x0[active]) / (y1[active] - y0[active]))
+        cols = np.searchsorted(xs, xc)
+        for start, stop in zip(cols[0::2], cols[1::2]):
+            mask[row, start:stop] = True
+    return mask
+
+
+def locality_mask(locality, grid):
+    rings = []
+    for ring in locality.rings:
+        x, y = lonlat_to_utm(ring[:, 0], ring[:, 1], zone=grid.zone)
+        rings.append(np.column_stack([x, y]))
+    return rasterize(rings, grid)
+
+
+def palette_lut(palette, n=256):
+    """Tabla (n, 3) uint8 interpolando linealmente los colores de la paleta (nombres CSS o hex)."""
+    from branca.colormap import LinearColormap
+    if isinstance(palette, str):
+        palette = palette.split(",")
+    colors = [_css_color(c) for c in palette]
+    if len(colors) == 1:
+        colors = colors * 2
+    cmap = LinearColormap(colors, vmin=0, vmax=n - 1)
+    return np.array([cmap.rgb_bytes_tuple(i) for i in range(n)], dtype=np.uint8)
+
+
+def _css_color(color):
+    color = color.strip()
+    if color.startswith("#") or color.startswith("rgb"):
+        return color
+    if all(ch in "0123456789abcdefABCDEF" for ch in color) and len(color) in (3, 6):
+        return f"#{color}"
+    return color
+
+
+def colorize(array, vis_params, lut=None):
+    """Imagen RGBA uint8 (alto, ancho, 4) con la paleta de vis_params; NaN -> transparente."""
+    palette = vis_params.get("palette", ["black", "white"])
+    vmin, vmax = vis_params.get("min", 0), vis_params.get("max", 1)
+    lut = palette_lut(palette) if lut is None else lut
+    valid = np.isfinite(array)
+    scaled = np.clip((np.nan_to_num(array, nan=vmin) - vmin) / ((vmax - vmin) or 1), 0, 1)
+    idx = (scaled * (len(lut) - 1)).astype(np.intp)
+    rgba = np.zeros(array.shape + (4,), dtype=np.uint8)
+    rgba[..., :3] = lut[idx]
+    rgba[..., 3] = np.where(valid, 255, 0)
+    return rgba
+
+
+def to_png(rgba):
+    from PIL import Image
+    buf = io.BytesIO()
+    Image.fromarray(rgba).save(buf, format="PNG", optimize=False)
+    return buf.getvalue()
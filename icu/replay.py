@@ -0,0 +1,228 @@
+# --------------------------------------------------------------
+# replay.py — Grabación y reproducción de las consultas a GEE
+# Grabar: cada getInfo / getMapId / computePixels real se guarda con
+# su latencia, indexado por la expresión serializada (que ya incluye
+# geometría y fechas) y etiquetado con la localidad y el periodo del
+# render. Reproducir: las mismas consultas se responden desde disco,
+# sin red ni credenciales, con latencia inyectada (fija + jitter, o la
+# grabada). Sirve para pruebas de regresión y para icu.benchmark.
+#
+#   ICU_GEE_RECORD=grabacion/ streamlit run main.py
+#   ICU_GEE_REPLAY=grabacion/ ICU_GEE_LATENCY=0.2 ICU_GEE_JITTER=0.05 streamlit run main.py
+# --------------------------------------------------------------
+
+import gzip
+import hashlib
+import io
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from functools import lru_cache
+from pathlib import Path
+from types import SimpleNamespace
+
+import ee
+import numpy as np
+
+from icu.batch import LiveGee, set_gee
+from icu.tracing import current_trace
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    locality TEXT,
+    start TEXT,
+    end TEXT,
+    panel TEXT,
+    latency REAL NOT NULL,
+    size INTEGER NOT NULL,
+    payload BLOB NOT NULL,
+    created REAL NOT NULL
+);
+"""
+
+GET_INFO = "getInfo"
+GET_MAP_ID = "getMapId"
+COMPUTE_PIXELS = "computePixels"
+
+
+class ReplayMiss(KeyError):
+    """La consulta no está en la grabación (el código cambió o falta grabar ese escenario)."""
+
+
+def request_key(kind, expression, params=None):
+    raw = kind + "\n" + expression.serialize() + "\n" + json.dumps(params or {}, sort_keys=True, default=str)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def _encode(kind, value):
+    if kind == COMPUTE_PIXELS:
+        buf = io.BytesIO()
+        np.save(buf, value, allow_pickle=False)
+        return buf.getvalue()
+    if kind == GET_MAP_ID:
+        value = {"mapid": value.get("mapid"), "token": value.get("token"),
+                 "url_format": value["tile_fetcher"].url_format}
+    return json.dumps(value, ensure_ascii=False).encode("utf-8")
+
+
+def _decode(kind, payload):
+    if kind == COMPUTE_PIXELS:
+        return np.load(io.BytesIO(payload), allow_pickle=False)
+    value = json.loads(payload)
+    if kind == GET_MAP_ID:
+        value["tile_fetcher"] = SimpleNamespace(url_format=value.pop("url_format"))
+    return value
+
+
+class Recording:
+    """Directorio de una grabación: responses.sqlite + algorithms.json.gz (firmas de la API de ee)."""
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.path = self.directory / "responses.sqlite"
+        self.algorithms_path = self.directory / "algorithms.json.gz"
+        self._write_lock = threading.Lock()
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def put(self, key, kind, value, latency):
+        labels = current_trace().labels if current_trace() else {}
+        payload = _encode(kind, value)
+        with self._write_lock, closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses "
+                "(key, kind, locality, start, end, panel, latency, size, payload, created) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, kind, labels.get("locality"), labels.get("start"), labels.get("end"),
+                 labels.get("panel"), latency, len(payload), payload, time.time()))
+
+    def get(self, key, kind=None):
+        """(valor, latencia grabada) o ReplayMiss."""
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT kind, latency, payload FROM responses WHERE key=?", (key,)).fetchone()
+        if row is None:
+            raise ReplayMiss(f"{kind or 'Consulta'} sin grabar en {self.directory} ({key[:12]})")
+        kind, latency, payload = row
+        return _decode(kind, payload), latency
+
+    def scenarios(self):
+        """[(localidad, inicio, fin, consultas, bytes)] grabados."""
+        with closing(self._connect()) as conn:
+            return conn.execute(
+                "SELECT locality, start, end, COUNT(*), SUM(size) FROM responses "
+                "GROUP BY locality, start, end ORDER BY locality, start").fetchall()
+
+    def save_algorithms(self):
+        if not self.algorithms_path.exists():
+            with gzip.open(self.algorithms_path, "wt", encoding="utf-8") as f:
+                json.dump(ee.data.getAlgorithms(), f)
+
+    def load_algorithms(self):
+        with gzip.open(self.algorithms_path, "rt", encoding="utf-8") as f:
+            return json.load(f)
+
+
+class Recorder(LiveGee):
+    """Consulta GEE real y guarda cada respuesta con su latencia."""
+
+    def __init__(self, recording):
+        self.recording = recording
+        self._saved_algorithms = False
+
+    def _record(self, kind, key, call):
+        if not self._saved_algorithms:
+            # Las firmas solo existen tras ee.Initialize; se guardan con la primera consulta
+            self.recording.save_algorithms()
+            self._saved_algorithms = True
+        t0 = time.perf_counter()
+        value = call()
+        self.recording.put(key, kind, value, time.perf_counter() - t0)
+        return value
+
+    def get_info(self, ee_object):
+        return self._record(GET_INFO, request_key(GET_INFO, ee_object),
+                            lambda: super(Recorder, self).get_info(ee_object))
+
+    def get_map_id(self, image, vis_params):
+        return self._record(GET_MAP_ID, request_key(GET_MAP_ID, image, vis_params),
+                            lambda: super(Recorder, self).get_map_id(image, vis_params))
+
+    def compute_pixels(self, params):
+        key = request_key(COMPUTE_PIXELS, params["expression"],
+                          {k: v for k, v in params.items() if k != "expression"})
+        return self._record(COMPUTE_PIXELS, key, lambda: super(Recorder, self).compute_pixels(params))
+
+
+class Replayer:
+    """Responde desde una grabación. latency=None usa la latencia grabada; jitter es ± uniforme (s)."""
+
+    def __init__(self, recording, latency=None, jitter=0.0, seed=None):
+        self.recording = recording
+        self.latency = latency
+        self.jitter = jitter
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._initialized = False
+
+    def initialize(self):
+        """ee.Initialize sin red ni credenciales, con las firmas grabadas (como ee.apitestcase)."""
+        if self._initialized:
+            return
+        algorithms = self.recording.load_algorithms()
+        ee.Reset()
+        ee.data._install_cloud_api_resource = lambda: None
+        ee.data.getAlgorithms = lambda: algorithms
+        ee.deprecation._FetchDataCatalogStac = lambda: {}
+        ee.Initialize(None, project="icu-replay")
+        self._initialized = True
+
+    def _replay(self, kind, key):
+        value, recorded = self.recording.get(key, kind)
+        with self._lock:
+            delay = (recorded if self.latency is None else self.latency) + self._random.uniform(-self.jitter, self.jitter)
+        if delay > 0:
+            time.sleep(delay)
+        return value
+
+    def get_info(self, ee_object):
+        return self._replay(GET_INFO, request_key(GET_INFO, ee_object))
+
+    def get_map_id(self, image, vis_params):
+        return self._replay(GET_MAP_ID, request_key(GET_MAP_ID, image, vis_params))
+
+    def compute_pixels(self, params):
+        return self._replay(COMPUTE_PIXELS, request_key(COMPUTE_PIXELS, params["expression"],
+                                                        {k: v for k, v in params.items() if k != "expression"}))
+
+
+@lru_cache(maxsize=None)
+def get_gee_standin(record_dir=None, replay_dir=None, latency=None, jitter=0.0, seed=None):
+    """Grabador o reproductor único por proceso, ya instalado en icu.batch; None si no se pidió ninguno."""
+    if replay_dir:
+        standin = Replayer(Recording(replay_dir), latency=latency, jitter=jitter, seed=seed)
+    elif record_dir:
+        standin = Recorder(Recording(record_dir))
+    else:
+        return None
+    set_gee(standin)
+    return standin
+
+
+def gee_standin_from_env():
+    """ICU_GEE_RECORD=dir graba; ICU_GEE_REPLAY=dir reproduce (ICU_GEE_LATENCY, ICU_GEE_JITTER en segundos)."""
+    latency = os.environ.get("ICU_GEE_LATENCY")
+    return get_gee_standin(
+        record_dir=os.environ.get("ICU_GEE_RECORD"), replay_dir=os.environ.get("ICU_GEE_REPLAY"),
+        latency=float(latency) if latency else None, jitter=float(os.environ.get("ICU_GEE_JITTER", 0)),
+    )
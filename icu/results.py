@@ -0,0 +1,129 @@
+# --------------------------------------------------------------
+# results.py — Almacén local de resultados precalculados (SQLite)
+# Lo llena el precálculo por lotes (python -m icu.precompute) y lo
+# lee el tablero antes de consultar a GEE. Clave: (localidad, fecha
+# inicial, fecha final, MAX_NUBES); los valores usan los mismos
+# nombres que la caché de compuestos ("count", "lst_p90", ...).
+# --------------------------------------------------------------
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from pathlib import Path
+
+import numpy as np
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    locality TEXT NOT NULL,
+    start TEXT NOT NULL,
+    end TEXT NOT NULL,
+    max_clouds INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    value TEXT,
+    created REAL NOT NULL,
+    PRIMARY KEY (locality, start, end, max_clouds, name)
+);
+CREATE TABLE IF NOT EXISTS jobs (
+    locality TEXT NOT NULL,
+    start TEXT NOT NULL,
+    end TEXT NOT NULL,
+    max_clouds INTEGER NOT NULL,
+    label TEXT,
+    status TEXT NOT NULL,
+    error TEXT,
+    elapsed REAL,
+    updated REAL NOT NULL,
+    PRIMARY KEY (locality, start, end, max_clouds)
+);
+"""
+
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+
+def period_key(locality, start, end, max_clouds):
+    return (locality, str(start), str(end), int(max_clouds))
+
+
+class ResultsStore:
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self.path = self.directory / "results.sqlite"
+        self.arrays_dir = self.directory / "arrays"
+        self.arrays_dir.mkdir(parents=True, exist_ok=True)
+        self._write_lock = threading.Lock()
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    # --- Valores ---
+
+    def load(self, key):
+        """{nombre: valor} guardados para la clave (vacío si no hay nada)."""
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT name, value FROM results WHERE locality=? AND start=? AND end=? AND max_clouds=?",
+                key).fetchall()
+        return {name: json.loads(value) for name, value in rows}
+
+    def save(self, key, values):
+        now = time.time()
+        rows = [(*key, name, json.dumps(value, ensure_ascii=False), now) for name, value in values.items()]
+        with self._write_lock, closing(self._connect()) as conn, conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO results (locality, start, end, max_clouds, name, value, created) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+
+    # --- Arreglos del mosaico (npz) ---
+
+    def _arrays_path(self, key, grid):
+        raw = json.dumps([key, grid.transform, grid.shape, grid.zone], ensure_ascii=False)
+        return self.arrays_dir / f"{hashlib.sha1(raw.encode('utf-8')).hexdigest()}.npz"
+
+    def load_arrays(self, key, grid, bands):
+        path = self._arrays_path(key, grid)
+        if not path.exists():
+            return None
+        with np.load(path) as data:
+            if not all(b in data for b in bands):
+                return None
+            return {b: data[b] for b in bands}
+
+    def save_arrays(self, key, grid, arrays):
+        path = self._arrays_path(key, grid)
+        tmp = path.with_name(path.stem + ".tmp.npz")
+        np.savez_compressed(tmp, **arrays)
+        tmp.replace(path)
+
+    # --- Estado de los trabajos (para reanudar) ---
+
+    def mark(self, key, status, label=None, error=None, elapsed=None):
+        with self._write_lock, closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO jobs (locality, start, end, max_clouds, label, status, error, elapsed, updated) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", (*key, label, status, error, elapsed, time.time()))
+
+    def done(self):
+        """Claves de los trabajos terminados."""
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT locality, start, end, max_clouds FROM jobs WHERE status=?", (STATUS_DONE,)).fetchall()
+        return {tuple(r) for r in rows}
+
+    def periods(self, max_clouds=None):
+        """Periodos precalculados: [(etiqueta, inicio, fin, localidades terminadas)], del más reciente al más antiguo."""
+        query = "SELECT label, start, end, COUNT(*) FROM jobs WHERE status=?"
+        params = [STATUS_DONE]
+        if max_clouds is not None:
+            query += " AND max_clouds=?"
+            params.append(int(max_clouds))
+        query += " GROUP BY start, end ORDER BY start DESC"
+        with closing(self._connect()) as conn:
+            return [tuple(r) for r in conn.execute(query, params).fetchall()]
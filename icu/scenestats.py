@@ -0,0 +1,84 @@
+# --------------------------------------------------------------
+# scenestats.py — Estadísticas por escena con un solo reductor combinado
+# En lugar de un reduceRegion por estadística (mean, luego max, ...),
+# todas las estadísticas pedidas se calculan en una sola pasada.
+# --------------------------------------------------------------
+
+import hashlib
+import json
+from dataclasses import asdict, dataclass
+
+import ee
+
+# Nombres de ee.Reducer (los métodos de ee.Reducer solo existen tras ee.Initialize)
+BASIC_REDUCERS = ("mean", "max", "min", "stdDev", "count")
+
+
+def _percentile(stat):
+    """'p90' -> 90; None si no es un percentil."""
+    if stat.startswith("p") and stat[1:].isdigit():
+        return int(stat[1:])
+    return None
+
+
+@dataclass(frozen=True)
+class SceneStatsConfig:
+    stats: tuple = ("mean", "max", "min", "stdDev", "p10", "p50", "p90", "count")
+    bands: tuple = ("LST", "NDVI")
+    scale: int = 100
+    best_effort: bool = True
+    tile_scale: int = 1
+
+    def __post_init__(self):
+        for stat in self.stats:
+            if stat not in BASIC_REDUCERS and _percentile(stat) is None:
+                raise ValueError(f"Estadística no soportada: {stat}")
+
+    @property
+    def key(self):
+        """Identificador estable de la configuración (para guardar resultados por configuración)."""
+        raw = json.dumps(asdict(self), sort_keys=True)
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:12]
+
+    def output_names(self):
+        return [f"{band}_{stat}" for band in self.bands for stat in self.stats]
+
+    def reducer(self):
+        """Un solo ee.Reducer con todas las estadísticas (sharedInputs=True)."""
+        reducers = [getattr(ee.Reducer, s)() for s in self.stats if s in BASIC_REDUCERS]
+        percentiles = [p for p in map(_percentile, self.stats) if p is not None]
+        if percentiles:
+            reducers.append(ee.Reducer.percentile(percentiles))
+        combined = reducers[0]
+        for r in reducers[1:]:
+            combined = combined.combine(r, sharedInputs=True)
+        return combined
+
+    def reduce_region(self, image, roi):
+        return image.select(list(self.bands)).reduceRegion(
+            reducer=self.reducer(), geometry=roi, scale=self.scale,
+            bestEffort=self.best_effort, tileScale=self.tile_scale,
+        )
+
+    def per_scene(self, roi):
+        """Función para ImageCollection.map: una Feature con fecha, ID y estadísticas por escena."""
+        names = self.output_names()
+        total = None
+        if "count" in self.stats:
+            total = ee.Image.constant(1).rename("total").reduceRegion(
+                ee.Reducer.count(), roi, self.scale,
+                bestEffort=self.best_effort, tileScale=self.tile_scale).get("total")
+
+        # Con una sola salida por banda GEE nombra el resultado solo con la banda
+        ee_keys = list(self.bands) if len(self.stats) == 1 else names
+
+        def fn(img):
+            values = ee.Dictionary(self.reduce_region(img, roi))
+            props = {name: values.get(key) for name, key in zip(names, ee_keys)}
+            props.update({
+                "product_id": img.get("LANDSAT_PRODUCT_ID"),
+                "date": img.date().format("YYYY-MM-dd"),
+                "total_pixels": total,
+            })
+            return ee.Feature(None, props)
+        return fn
@@ -0,0 +1,113 @@
+# --------------------------------------------------------------
+# scenestore.py — Almacén local (SQLite) de estadísticas por escena
+# Clave: (localidad, LANDSAT_PRODUCT_ID, configuración de estadísticas).
+# Al ampliar el rango de fechas solo se piden a GEE las escenas que aún
+# no están guardadas.
+# --------------------------------------------------------------
+
+import json
+import sqlite3
+import threading
+from contextlib import closing
+from pathlib import Path
+
+import ee
+
+from icu.batch import get_info
+from icu.landsat import COLLECTION_ID, addLST, addNDVI, cloudMaskFunction, maskThermalNoData
+from icu.scenestats import SceneStatsConfig
+from icu.tracing import record_cache
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scene_records (
+    locality TEXT NOT NULL,
+    product_id TEXT NOT NULL,
+    config TEXT NOT NULL,
+    date TEXT NOT NULL,
+    valid_fraction REAL,
+    stats TEXT NOT NULL,
+    PRIMARY KEY (locality, product_id, config)
+);
+CREATE INDEX IF NOT EXISTS idx_scene_records_date ON scene_records (locality, config, date);
+"""
+
+
+def scene_stats_collection(roi, product_ids, config):
+    """FeatureCollection con una fila de estadísticas por escena (un reductor combinado por imagen)."""
+    col = (ee.ImageCollection(COLLECTION_ID)
+           .filterBounds(roi)
+           .filter(ee.Filter.inList("LANDSAT_PRODUCT_ID", list(product_ids)))
+           .map(cloudMaskFunction).map(maskThermalNoData).map(addLST).map(addNDVI))
+    return col.map(config.per_scene(roi))
+
+
+class SceneStore:
+    def __init__(self, path, config=SceneStatsConfig()):
+        self.path = Path(path)
+        self.config = config
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._write_lock = threading.Lock()
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        # Una conexión por operación: los paneles y el pool de hilos comparten el archivo
+        return sqlite3.connect(self.path, timeout=30)
+
+    def _select(self, columns, locality, config, product_ids):
+        ids = list(product_ids)
+        with closing(self._connect()) as conn:
+            for i in range(0, len(ids), 500):
+                chunk = ids[i:i + 500]
+                marks = ",".join("?" * len(chunk))
+                yield from conn.execute(
+                    f"SELECT {columns} FROM scene_records "
+                    f"WHERE locality=? AND config=? AND product_id IN ({marks})",
+                    [locality, config.key, *chunk])
+
+    def known(self, locality, product_ids, config=None):
+        config = config or self.config
+        return {r[0] for r in self._select("product_id", locality, config, product_ids)}
+
+    def insert(self, locality, records, config=None):
+        config = config or self.config
+        valid_key = f"{config.bands[0]}_count"
+        rows = []
+        for rec in records:
+            stats = {name: rec.get(name) for name in config.output_names()}
+            valid, total = stats.get(valid_key), rec.get("total_pixels")
+            fraction = (valid / total) if valid is not None and total else None
+            rows.append((locality, rec["product_id"], config.key, rec["date"], fraction, json.dumps(stats)))
+        with self._write_lock, closing(self._connect()) as conn, conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO scene_records "
+                "(locality, product_id, config, date, valid_fraction, stats) VALUES (?, ?, ?, ?, ?, ?)",
+                rows)
+
+    def rows(self, locality, product_ids, config=None):
+        """Filas planas: product_id, date, valid_fraction y una columna por estadística (p. ej. LST_mean)."""
+        config = config or self.config
+        out = [
+            {"product_id": pid, "date": date, "valid_fraction": fraction, **json.loads(stats)}
+            for pid, date, fraction, stats in self._select(
+                "product_id, date, valid_fraction, stats", locality, config, product_ids)
+        ]
+        return sorted(out, key=lambda r: r["date"])
+
+    def series(self, locality, roi, product_ids, config=None):
+        """Estadísticas de las escenas pedidas; solo las faltantes se calculan en GEE.
+
+        Las escenas totalmente nubladas también se guardan (con nulos) para no volver a pedirlas.
+        """
+        config = config or self.config
+        product_ids = list(product_ids)
+        known = self.known(locality, product_ids, config)
+        missing = [pid for pid in product_ids if pid not in known]
+        record_cache("escenas", True, len(product_ids) - len(missing))
+        record_cache("escenas", False, len(missing))
+        if missing:
+            fc = scene_stats_collection(roi, missing, config)
+            records = [f["properties"] for f in get_info(fc)["features"]]
+            self.insert(locality, records, config)
+        return self.rows(locality, product_ids, config)
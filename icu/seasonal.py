@@ -0,0 +1,112 @@
+# --------------------------------------------------------------
+# seasonal.py — Estadísticas por temporada / mes / año en una consulta
+# Cada escena de un periodo de varios años se etiqueta con año, mes
+# y temporada (seca / lluvias) y se reduce a su media en la ROI; un
+# reductor agrupado resume después todas las escenas de cada grupo.
+# Todas las agrupaciones van en un mismo lote: un solo viaje a GEE
+# sin importar cuántos años o temporadas se comparen.
+# --------------------------------------------------------------
+
+import datetime as dt
+
+import ee
+
+from icu.scenestats import SceneStatsConfig
+
+# Meses de cada temporada (paso 7 del script original); el resto queda como "otra"
+SEASON_MONTHS = {"seca": (3, 4, 5), "lluvias": (7, 8, 9)}
+OTHER_SEASON = "otra"
+BANDS = ("LST", "NDVI")
+# Agrupaciones: nivel -> propiedades que forman la clave del grupo
+LEVELS = {"temporada": ("year", "season"), "mes": ("year", "month")}
+STATS = ("mean", "min", "max", "stdDev", "count")
+COLUMNS = ("band", "level", "year", "season", "month", *STATS)
+
+# Media por escena (una sola estadística por banda)
+SCENE_MEANS = SceneStatsConfig(stats=("mean",), bands=BANDS, scale=100, best_effort=True, tile_scale=2)
+
+
+def season_of(month):
+    for season, months in SEASON_MONTHS.items():
+        if month in months:
+            return season
+    return OTHER_SEASON
+
+
+def tagged_scenes(collection, roi, config=SCENE_MEANS):
+    """Una Feature por escena con <banda>_mean y las etiquetas year, month y season."""
+    per_scene = config.per_scene(roi)
+    seasons = ee.Dictionary({str(m): s for s, months in SEASON_MONTHS.items() for m in months})
+
+    def fn(img):
+        month = ee.Number(img.date().get("month"))
+        return per_scene(img).set({
+            "year": ee.Number(img.date().get("year")).format("%d"),
+            "month": month.format("%02d"),
+            "season": seasons.get(month.format("%d"), OTHER_SEASON),
+        })
+    return collection.map(fn)
+
+
+def _group_reducer():
+    reducer = ee.Reducer.mean()
+    for stat in STATS[1:]:
+        reducer = reducer.combine(getattr(ee.Reducer, stat)(), sharedInputs=True)
+    return reducer.group(groupField=1, groupName="group")
+
+
+def seasonal_builders(comp, config=SCENE_MEANS):
+    """Builders para Composite.get_many: una reducción agrupada por banda y nivel, sin evaluar."""
+    scenes = tagged_scenes(comp.collection, comp.roi, config)
+
+    def build(band, fields):
+        column = f"{band}_mean"
+        keyed = scenes.filter(ee.Filter.notNull([column])).map(
+            lambda f: f.set("group", ee.List([f.get(p) for p in fields]).join("|")))
+        return keyed.reduceColumns(_group_reducer(), [column, "group"]).get("groups")
+
+    return {f"seasonal_{band}_{level}": (lambda band=band, fields=fields: build(band, fields))
+            for band in config.bands for level, fields in LEVELS.items()}
+
+
+def tidy_groups(values):
+    """Resultado de seasonal_builders -> filas (band, level, year, season, month, mean, ...)."""
+    rows = []
+    for name, groups in values.items():
+        _, band, level = name.split("_", 2)
+        for group in groups or []:
+            parts = dict(zip(LEVELS[level], group["group"].split("|")))
+            month = int(parts["month"]) if "month" in parts else None
+            rows.append({
+                "band": band, "level": level, "year": int(parts["year"]),
+                "season": parts.get("season") or season_of(month), "month": month,
+                **{stat: group.get(stat) for stat in STATS},
+            })
+    return sorted(rows, key=lambda r: (r["band"], r["level"], r["year"], r["month"] or 0, r["season"]))
+
+
+def group_scene_rows(scenes, bands=BANDS):
+    """Mismas filas que tidy_groups, agrupando en Python filas por escena (p. ej. del motor local)."""
+    groups = {}
+    for row in scenes:
+        date = dt.date.fromisoformat(row["date"])
+        tags = {"year": date.year, "season": season_of(date.month), "month": date.month}
+        for band in bands:
+            value = row.get(f"{band}_mean")
+            if value is None:
+                continue
+            for level, fields in LEVELS.items():
+                key = (band, level, tags["year"], tags["season"] if "season" in fields else None,
+                       tags["month"] if "month" in fields else None)
+                groups.setdefault(key, []).append(value)
+    rows = []
+    for (band, level, year, season, month), values in groups.items():
+        n = len(values)
+        mean = sum(values) / n
+        rows.append({
+            "band": band, "level": level, "year": year, "season": season or season_of(month), "month": month,
+            # Desviación estándar poblacional, como ee.Reducer.stdDev
+            "mean": mean, "min": min(values), "max": max(values),
+            "stdDev": (sum((v - mean) ** 2 for v in values) / n) ** 0.5, "count": n,
+        })
+    return sorted(rows, key=lambda r: (r["band"], r["level"], r["year"], r["month"] or 0, r["season"]))
@@ -0,0 +1,255 @@
+# --------------------------------------------------------------
+# session.py — Sesión de Earth Engine única por proceso
+# ee.Initialize corre una sola vez por proceso (no por sesión del
+# navegador), con un pool HTTP compartido. Cada consulta bloqueante
+# (icu.batch) pasa por aquí: un semáforo acota las consultas
+# simultáneas, los errores transitorios (429, 5xx, cortes de red) se
+# reintentan con espera exponencial y jitter, y un cortacircuitos deja
+# de insistir mientras GEE está degradado y responde con la última
+# respuesta buena de la misma consulta, si la hay.
+# --------------------------------------------------------------
+
+import random
+import re
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+
+import ee
+
+from icu.batch import get_gee, set_gee
+from icu.replay import request_key
+from icu.tracing import payload_size, record_cache
+
+# Mensajes de error de GEE / HTTP que vale la pena reintentar
+TRANSIENT = re.compile(
+    r"\b(429|500|502|503|504)\b|too many requests|rate ?limit|service unavailable|backend error|"
+    r"internal error|deadline|timed? ?out|connection (reset|aborted|refused|error)|temporarily",
+    re.IGNORECASE,
+)
+CLOSED, OPEN, HALF_OPEN = "cerrado", "abierto", "medio abierto"
+
+
+class GeeUnavailable(RuntimeError):
+    """GEE no responde (cortacircuitos abierto o reintentos agotados) y no hay respuesta en caché."""
+
+
+def is_transient(exc):
+    status = getattr(getattr(exc, "resp", None), "status", None) or getattr(exc, "status_code", None)
+    if status is not None:
+        return int(status) == 429 or int(status) >= 500
+    return bool(TRANSIENT.search(str(exc))) or isinstance(exc, (ConnectionError, TimeoutError))
+
+
+class _StaleCache:
+    """Últimas respuestas buenas por consulta, acotadas en bytes (LRU)."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, key, value):
+        size = payload_size(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self.bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (value, size)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                self.bytes -= self._entries.popitem(last=False)[1][1]
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+
+class ResilientGee:
+    """Envuelve el destino de las consultas de icu.batch (GEE real, grabador o reproductor)."""
+
+    def __init__(self, inner, session):
+        self.inner = inner
+        self.session = session
+
+    def get_info(self, ee_object):
+        return self.session.call("getInfo", lambda: request_key("getInfo", ee_object),
+                                 lambda: self.inner.get_info(ee_object))
+
+    def get_map_id(self, image, vis_params):
+        return self.session.call("getMapId", lambda: request_key("getMapId", image, vis_params),
+                                 lambda: self.inner.get_map_id(image, vis_params))
+
+    def compute_pixels(self, params):
+        key = lambda: request_key("computePixels", params["expression"],
+                                  {k: v for k, v in params.items() if k != "expression"})
+        return self.session.call("computePixels", key, lambda: self.inner.compute_pixels(params))
+
+
+class GeeSession:
+    def __init__(self, max_concurrent=8, retries=4, backoff=0.5, max_backoff=8.0,
+                 failure_threshold=5, cooldown=30.0, stale_bytes=64 * 1024 * 1024):
+        self.max_concurrent = max_concurrent
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.initialized = False
+        self.initialized_at = None
+        self.state = CLOSED
+        self.failures = 0           # fallos transitorios seguidos (ya sin reintentos)
+        self.opened_at = None
+        self._probe_in_flight = False     # en medio abierto solo pasa una consulta a la vez
+        self.retried = 0
+        self.stale_served = 0
+        self.in_flight = 0
+        self._stale = _StaleCache(stale_bytes)
+        self._slots = threading.BoundedSemaphore(max_concurrent)
+        self._init_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._random = random.Random()
+
+    # --- Inicialización (una vez por proceso) ---
+
+    def initialize(self, init):
+        """Ejecuta init() (p. ej. ee.Initialize con credenciales) solo la primera vez; los hilos concurrentes esperan."""
+        if self.initialized:
+            return
+        with self._init_lock:
+            if self.initialized:
+                return
+            self._install_pool()
+            init()
+            if hasattr(ee.data, "setMaxRetries"):
+                ee.data.setMaxRetries(0)    # los reintentos (con jitter y cortacircuitos) son los de aquí
+            set_gee(ResilientGee(get_gee(), self))
+            self.initialized_at = time.time()
+            self.initialized = True
+
+    def _install_pool(self):
+        """Sesión HTTP compartida con tantas conexiones como consultas simultáneas."""
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        get_state = getattr(ee.data, "_get_state", None)
+        if get_state is None:
+            return
+        http = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.max_concurrent)
+        http.mount("https://", adapter)
+        http.mount("http://", adapter)
+        get_state().requests_session = http
+
+    # --- Consultas ---
+
+    def call(self, kind, key, fn):
+        """fn() con cupo, reintentos y cortacircuitos; `key()` identifica la consulta para la respuesta en caché."""
+        key = key()
+        allowed, probe = self._allow()
+        if not allowed:
+            return self._fallback(key, GeeUnavailable(f"Earth Engine no disponible (reintento en "
+                                                      f"{self._remaining():.0f} s)"))
+        try:
+            return self._attempts(kind, key, fn)
+        finally:
+            if probe:
+                with self._lock:
+                    self._probe_in_flight = False
+
+    def _attempts(self, kind, key, fn):
+        for attempt in range(self.retries + 1):
+            try:
+                with self._slots:
+                    with self._lock:
+                        self.in_flight += 1
+                    try:
+                        value = fn()
+                    finally:
+                        with self._lock:
+                            self.in_flight -= 1
+            except Exception as e:
+                if not is_transient(e):
+                    self._success()     # GEE respondió: el error es de la consulta, no del servicio
+                    raise
+                if attempt == self.retries:
+                    self._failure()
+                    return self._fallback(key, GeeUnavailable(f"{kind}: {e}"))
+                with self._lock:
+                    self.retried += 1
+                delay = min(self.max_backoff, self.backoff * 2 ** attempt)
+                time.sleep(self._random.uniform(delay / 2, delay))
+                continue
+            self._success()
+            self._stale.put(key, value)
+            return value
+
+    def _fallback(self, key, error):
+        entry = self._stale.get(key)
+        record_cache("gee_degradado", entry is not None)
+        if entry is None:
+            raise error
+        with self._lock:
+            self.stale_served += 1
+        return entry[0]
+
+    # --- Cortacircuitos ---
+
+    def _remaining(self):
+        return max(0.0, self.opened_at + self.cooldown - time.monotonic()) if self.opened_at else 0.0
+
+    def _allow(self):
+        """(se permite, es la consulta de prueba); en medio abierto las demás esperan a que la prueba termine."""
+        with self._lock:
+            if self.state == CLOSED:
+                return True, False
+            if self.state == OPEN and self._remaining() == 0:
+                self.state = HALF_OPEN
+            if self.state == HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True    # se deja pasar una sola consulta de prueba
+                return True, True
+            return False, False
+
+    def _success(self):
+        with self._lock:
+            self.failures = 0
+            self.state = CLOSED
+            self.opened_at = None
+
+    def _failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+
+    def reset_breaker(self):
+        self._success()
+
+    def status(self):
+        with self._lock:
+            return {
+                "initialized": self.initialized,
+                "state": self.state,
+                "failures": self.failures,
+                "retry_in": self._remaining() if self.state == OPEN else 0.0,
+                "probing": self._probe_in_flight,
+                "retried": self.retried,
+                "stale_served": self.stale_served,
+                "in_flight": self.in_flight,
+                "max_concurrent": self.max_concurrent,
+            }
+
+
+@lru_cache(maxsize=None)
+def get_gee_session(max_concurrent=8, retries=4, failure_threshold=5, cooldown=30.0):
+    """Sesión única por proceso (compartida por todas las sesiones de Streamlit)."""
+    return GeeSession(max_concurrent=max_concurrent, retries=retries,
+                      failure_threshold=failure_threshold, cooldown=cooldown)
@@ -0,0 +1,199 @@
+# --------------------------------------------------------------
+# tiles.py — Caché de map IDs de GEE y servidor local de teselas XYZ
+# getMapId es un viaje bloqueante por capa y por render; aquí se
+# memoiza por (expresión de la imagen, vis_params) mientras el token
+# siga vigente. Para el motor local, un servidor HTTP opcional pinta
+# teselas PNG de los compuestos NumPy con un LRU acotado.
+# --------------------------------------------------------------
+
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from icu.batch import get_map_id
+from icu.geo import lonlat_to_utm
+from icu.raster import colorize, palette_lut, to_png
+from icu.tracing import record_cache
+
+# Los tokens de mapa de GEE caducan a las pocas horas: se renuevan antes
+MAP_ID_TTL = 3 * 3600
+TILE_SIZE = 256
+TILE_RE = re.compile(r"^/(?P<layer>[0-9a-f]+)/(?P<z>\d+)/(?P<x>\d+)/(?P<y>\d+)\.png$")
+
+
+class MapIdCache:
+    """URLs de teselas de GEE por hash de (imagen serializada, vis_params), con TTL."""
+
+    def __init__(self, max_entries=256, ttl=MAP_ID_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(image, vis_params):
+        # serialize() es local: describe el grafo de la expresión sin consultar a GEE
+        raw = image.serialize() + json.dumps(vis_params, sort_keys=True, default=str)
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def url(self, image, vis_params):
+        key = self.key(image, vis_params)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and now - entry[1] < self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                record_cache("capas_gee", True)
+                return entry[0]
+            self.misses += 1
+        record_cache("capas_gee", False)
+        url = get_map_id(image, vis_params)["tile_fetcher"].url_format
+        with self._lock:
+            self._entries[key] = (url, now)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return url
+
+    def stats(self):
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+@lru_cache(maxsize=None)
+def get_map_id_cache(max_entries=256, ttl=MAP_ID_TTL):
+    """Caché única por proceso (los map IDs sirven a cualquier sesión)."""
+    return MapIdCache(max_entries=max_entries, ttl=ttl)
+
+
+# --- SERVIDOR LOCAL DE TESELAS ---
+
+def tile_lonlat(z, x, y, size=TILE_SIZE):
+    """Lon/lat de los centros de píxel de una tesela XYZ (Web Mercator): (lon[size], lat[size])."""
+    n = 2 ** z
+    frac = (np.arange(size) + 0.5) / size
+    lon = (x + frac) / n * 360.0 - 180.0
+    lat = np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * (y + frac) / n))))
+    return lon, lat
+
+
+class _Layer:
+    def __init__(self, array, grid, vis_params):
+        self.array = array
+        self.grid = grid
+        self.vis_params = vis_params
+        self.lut = palette_lut(vis_params.get("palette", ["black", "white"]))
+        (self.south, self.west), (self.north, self.east) = grid.latlon_bounds()
+
+
+class TileServer:
+    """Servidor XYZ en un hilo demonio: /<capa>/<z>/<x>/<y>.png a partir de arreglos registrados."""
+
+    def __init__(self, host="127.0.0.1", port=8600, public_url=None, max_bytes=128 * 1024 * 1024, max_layers=64):
+        self.host = host
+        self.port = port
+        self.public_url = (public_url or f"http://{host}:{port}").rstrip("/")
+        self.max_bytes = max_bytes
+        self.max_layers = max_layers
+        self.hits = 0
+        self.misses = 0
+        self._layers = OrderedDict()
+        self._tiles = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._empty = to_png(np.zeros((TILE_SIZE, TILE_SIZE, 4), dtype=np.uint8))
+        self._httpd = None
+
+    def start(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                match = TILE_RE.match(self.path.split("?")[0])
+                body = server.tile(match["layer"], int(match["z"]), int(match["x"]), int(match["y"])) if match else None
+                if body is None:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "image/png")
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("Cache-Control", "public, max-age=3600")
+                self.send_header("Access-Control-Allow-Origin", "*")
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._httpd.daemon_threads = True
+        threading.Thread(target=self._httpd.serve_forever, name="icu-tiles", daemon=True).start()
+        return self
+
+    def register(self, array, grid, vis_params):
+        """Registra una capa y devuelve su plantilla de URL XYZ. La misma capa da la misma URL."""
+        digest = hashlib.sha1(np.ascontiguousarray(array).tobytes())
+        digest.update(json.dumps([grid.transform, grid.shape, vis_params], sort_keys=True, default=str).encode())
+        layer_id = digest.hexdigest()[:16]
+        with self._lock:
+            if layer_id not in self._layers:
+                self._layers[layer_id] = _Layer(array, grid, vis_params)
+            self._layers.move_to_end(layer_id)
+            while len(self._layers) > self.max_layers:
+                old, _ = self._layers.popitem(last=False)
+                for key in [k for k in self._tiles if k[0] == old]:
+                    self._bytes -= len(self._tiles.pop(key))
+        return f"{self.public_url}/{layer_id}/{{z}}/{{x}}/{{y}}.png"
+
+    def tile(self, layer_id, z, x, y):
+        key = (layer_id, z, x, y)
+        with self._lock:
+            layer = self._layers.get(layer_id)
+            if layer is None:
+                return None
+            if key in self._tiles:
+                self._tiles.move_to_end(key)
+                self.hits += 1
+                return self._tiles[key]
+            self.misses += 1
+        body = self.render(layer, z, x, y)
+        with self._lock:
+            if key not in self._tiles:
+                self._tiles[key] = body
+                self._bytes += len(body)
+            while self._bytes > self.max_bytes and self._tiles:
+                _, old = self._tiles.popitem(last=False)
+                self._bytes -= len(old)
+        return body
+
+    def render(self, layer, z, x, y):
+        lon, lat = tile_lonlat(z, x, y)
+        if lon[-1] < layer.west or lon[0] > layer.east or lat[0] < layer.south or lat[-1] > layer.north:
+            return self._empty
+        lon2d, lat2d = np.meshgrid(lon, lat)
+        xs, ys = lonlat_to_utm(lon2d.ravel(), lat2d.ravel(), zone=layer.grid.zone)
+        rows, cols = layer.grid.xy_to_pixel(xs, ys)
+        rows, cols = np.floor(rows).astype(np.intp), np.floor(cols).astype(np.intp)
+        inside = (rows >= 0) & (rows < layer.grid.height) & (cols >= 0) & (cols < layer.grid.width)
+        values = np.full(rows.shape, np.nan, dtype=np.float32)
+        values[inside] = layer.array[rows[inside], cols[inside]]
+        return to_png(colorize(values.reshape(TILE_SIZE, TILE_SIZE), layer.vis_params, layer.lut))
+
+    def stats(self):
+        return {"layers": len(self._layers), "tiles": len(self._tiles), "bytes": self._bytes,
+                "hits": self.hits, "misses": self.misses}
+
+
+@lru_cache(maxsize=None)
+def get_tile_server(port=8600, host="127.0.0.1", public_url=None):
+    """Servidor de teselas único por proceso, arrancado la primera vez que se pide."""
+    return TileServer(host=host, port=port, public_url=public_url).start()
@@ -0,0 +1,267 @@
+# --------------------------------------------------------------
+# tracing.py — Trazas por render: tiempos, consultas a GEE, bytes y cachés
+# Cada rerun abre una traza (ContextVar: los hilos que copian el
+# contexto escriben en la misma). Las consultas a GEE (icu.batch), los
+# paneles y los pasos de dibujo (Altair, st_folium, GeoJSON) registran
+# su tiempo de pared; las cachés, sus aciertos y fallos. Al cerrar el
+# render la traza pasa a un historial del proceso con p50/p95 por
+# panel y localidad, exportable como líneas JSON o texto de Prometheus.
+# --------------------------------------------------------------
+
+import contextvars
+import functools
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+
+KIND_GEE = "gee"
+KIND_PANEL = "panel"
+KIND_STEP = "paso"
+# Cuantiles del resumen de Prometheus
+QUANTILES = {"p50": "0.5", "p95": "0.95"}
+
+_current = contextvars.ContextVar("trace", default=None)
+
+
+class SpanInfo:
+    """Lo que el código medido puede agregar a su tramo (p. ej. bytes de la respuesta)."""
+    __slots__ = ("bytes",)
+
+    def __init__(self):
+        self.bytes = 0
+
+
+class Trace:
+    def __init__(self, **labels):
+        self.labels = labels
+        self.started = time.time()
+        self.elapsed = None
+        self.spans = {}     # (tipo, nombre) -> [llamadas, segundos, bytes]
+        self.cache = {}     # caché -> [aciertos, fallos]
+        self._t0 = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def add(self, kind, name, seconds, nbytes=0):
+        with self._lock:
+            entry = self.spans.setdefault((kind, name), [0, 0.0, 0])
+            entry[0] += 1
+            entry[1] += seconds
+            entry[2] += nbytes
+
+    def record_cache(self, name, hit, count=1):
+        with self._lock:
+            self.cache.setdefault(name, [0, 0])[0 if hit else 1] += count
+
+    def absorb(self, other):
+        """Suma a esta traza los tramos y cachés de `other` y la deja vacía (cada tramo se cuenta una vez)."""
+        with other._lock:
+            spans, other.spans = other.spans, {}
+            cache, other.cache = other.cache, {}
+        with self._lock:
+            for key, (calls, seconds, nbytes) in spans.items():
+                entry = self.spans.setdefault(key, [0, 0.0, 0])
+                entry[0] += calls
+                entry[1] += seconds
+                entry[2] += nbytes
+            for name, (hits, misses) in cache.items():
+                entry = self.cache.setdefault(name, [0, 0])
+                entry[0] += hits
+                entry[1] += misses
+
+    def _total(self, kind, column):
+        with self._lock:
+            return sum(v[column] for (k, _), v in self.spans.items() if k == kind)
+
+    @property
+    def round_trips(self):
+        return self._total(KIND_GEE, 0)
+
+    @property
+    def gee_seconds(self):
+        return self._total(KIND_GEE, 1)
+
+    @property
+    def gee_bytes(self):
+        return self._total(KIND_GEE, 2)
+
+    def finish(self):
+        self.elapsed = time.perf_counter() - self._t0
+        return self
+
+    def to_dict(self):
+        with self._lock:
+            spans = [{"kind": k, "name": n, "count": c, "seconds": round(s, 4), "bytes": b}
+                     for (k, n), (c, s, b) in sorted(self.spans.items(), key=lambda kv: -kv[1][1])]
+            cache = {name: {"hits": h, "misses": m} for name, (h, m) in self.cache.items()}
+        return {
+            "time": round(self.started, 3),
+            **self.labels,
+            "elapsed": round(self.elapsed, 4) if self.elapsed is not None else None,
+            "round_trips": sum(s["count"] for s in spans if s["kind"] == KIND_GEE),
+            "gee_bytes": sum(s["bytes"] for s in spans if s["kind"] == KIND_GEE),
+            "spans": spans,
+            "cache": cache,
+        }
+
+
+def start_trace(**labels):
+    """Abre la traza del render actual (reemplaza a la anterior en este contexto)."""
+    trace = Trace(**labels)
+    _current.set(trace)
+    return trace
+
+
+def current_trace():
+    return _current.get()
+
+
+def context_with(trace):
+    """Copia del contexto actual con `trace` como traza abierta (para trabajos que sobreviven al render)."""
+    ctx = contextvars.copy_context()
+    ctx.run(_current.set, trace)
+    return ctx
+
+
+@contextmanager
+def span(name, kind=KIND_STEP):
+    """Mide el bloque en la traza actual; sin traza abierta no registra nada."""
+    info = SpanInfo()
+    trace = _current.get()
+    t0 = time.perf_counter()
+    try:
+        yield info
+    finally:
+        if trace is not None:
+            trace.add(kind, name, time.perf_counter() - t0, info.bytes)
+
+
+def traced(name=None, kind=KIND_PANEL):
+    """Decorador: cada llamada a la función es un tramo de la traza."""
+    def decorator(fn):
+        label = name or fn.__name__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(label, kind):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def record_cache(name, hit, count=1):
+    trace = _current.get()
+    if trace is not None and count:
+        trace.record_cache(name, hit, count)
+
+
+def payload_size(value):
+    """Bytes aproximados de una respuesta: nbytes de un arreglo, o el largo de su JSON."""
+    if hasattr(value, "nbytes"):
+        return int(value.nbytes)
+    try:
+        return len(json.dumps(value, default=str, separators=(",", ":")))
+    except (TypeError, ValueError):
+        return 0
+
+
+# --- HISTORIAL DEL PROCESO ---
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels):
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+class TraceLog:
+    """Últimos renders en memoria + totales acumulados; opcionalmente líneas JSON y texto de Prometheus en disco.
+
+    jsonl_path recibe una línea por render; metrics_path se reescribe tras cada
+    render (formato del textfile collector de node_exporter).
+    """
+
+    def __init__(self, max_renders=1000, jsonl_path=None, metrics_path=None):
+        self.renders = deque(maxlen=max_renders)
+        self.jsonl_path = Path(jsonl_path) if jsonl_path else None
+        self.metrics_path = Path(metrics_path) if metrics_path else None
+        self._calls = {}    # (tipo, nombre) -> [llamadas, segundos, bytes], desde que arrancó el proceso
+        self._cache = {}    # caché -> [aciertos, fallos]
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+
+    def add(self, trace):
+        record = trace.to_dict()
+        with self._lock:
+            self.renders.append(record)
+            for s in record["spans"]:
+                entry = self._calls.setdefault((s["kind"], s["name"]), [0, 0.0, 0])
+                entry[0] += s["count"]
+                entry[1] += s["seconds"]
+                entry[2] += s["bytes"]
+            for name, c in record["cache"].items():
+                entry = self._cache.setdefault(name, [0, 0])
+                entry[0] += c["hits"]
+                entry[1] += c["misses"]
+            if self.jsonl_path:
+                with self.jsonl_path.open("a", encoding="utf-8") as f:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        if self.metrics_path:
+            text = self.prometheus()
+            with self._write_lock:
+                tmp = self.metrics_path.with_name(self.metrics_path.name + ".tmp")
+                tmp.write_text(text, encoding="utf-8")
+                tmp.replace(self.metrics_path)
+        return record
+
+    def latency(self, by=("panel", "locality")):
+        """{(valores de `by`): {"count", "p50", "p95", "mean"}} del tiempo de render, en segundos."""
+        groups = {}
+        with self._lock:
+            for r in self.renders:
+                if r["elapsed"] is not None:
+                    groups.setdefault(tuple(r.get(k) for k in by), []).append(r["elapsed"])
+        return {key: {"count": len(v), "p50": float(np.percentile(v, 50)),
+                      "p95": float(np.percentile(v, 95)), "mean": float(np.mean(v))}
+                for key, v in sorted(groups.items(), key=lambda kv: str(kv[0]))}
+
+    def jsonl(self):
+        with self._lock:
+            return "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in self.renders)
+
+    def prometheus(self):
+        lines = [
+            "# HELP icu_render_seconds Tiempo de pared por render (ventana de los últimos renders).",
+            "# TYPE icu_render_seconds summary",
+        ]
+        for (panel, locality), s in self.latency().items():
+            for q, quantile in QUANTILES.items():
+                lines.append(f"icu_render_seconds{_labels(panel=panel, locality=locality, quantile=quantile)} {s[q]:.6f}")
+            lines.append(f"icu_render_seconds_sum{_labels(panel=panel, locality=locality)} {s['mean'] * s['count']:.6f}")
+            lines.append(f"icu_render_seconds_count{_labels(panel=panel, locality=locality)} {s['count']}")
+        with self._lock:
+            calls = sorted(self._calls.items())
+            cache = sorted(self._cache.items())
+        metrics = (("calls_total", 0, "Llamadas medidas"), ("seconds_total", 1, "Tiempo de pared acumulado"),
+                   ("bytes_total", 2, "Bytes de respuesta acumulados"))
+        for suffix, column, help_text in metrics:
+            lines += [f"# HELP icu_span_{suffix} {help_text} por tipo y nombre.", f"# TYPE icu_span_{suffix} counter"]
+            lines += [f"icu_span_{suffix}{_labels(kind=k, name=n)} {v[column]:g}" for (k, n), v in calls]
+        lines += ["# HELP icu_cache_requests_total Consultas a las cachés por resultado.",
+                  "# TYPE icu_cache_requests_total counter"]
+        for name, (hits, misses) in cache:
+            lines.append(f"icu_cache_requests_total{_labels(cache=name, result='hit')} {hits}")
+            lines.append(f"icu_cache_requests_total{_labels(cache=name, result='miss')} {misses}")
+        return "\n".join(lines) + "\n"
+
+
+@lru_cache(maxsize=None)
+def get_trace_log(max_renders=1000, jsonl_path=None, metrics_path=None):
+    """Historial único por proceso (compartido por todas las sesiones)."""
+    return TraceLog(max_renders=max_renders, jsonl_path=jsonl_path, metrics_path=metrics_path)
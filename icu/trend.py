@@ -0,0 +1,247 @@
+# --------------------------------------------------------------
+# trend.py — Tendencia de LST por píxel (°C/año) sobre varios años
+# Se arma una pila de compuestos anuales (o de una temporada) de LST
+# y se ajusta una recta por píxel con su significancia. En GEE la
+# pila, el ajuste (linearFit + pearsonsCorrelation) y el resumen de
+# las zonas que se calientan salen de una sola reducción, sin recorrer
+# los años desde el cliente. El motor local lee cada escena una vez a
+# un cubo temporal y ajusta por tesela con mínimos cuadrados en NumPy.
+# --------------------------------------------------------------
+
+import math
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+import ee
+import numpy as np
+
+from icu.batch import when_not_empty
+from icu.cube import DEFAULT_MEMORY_LIMIT, TemporalCube, nan_percentiles, plan_cube
+from icu.local import cloud_mask, lst_celsius, thermal_mask
+from icu.raster import windows
+from icu.seasonal import SEASON_MONTHS
+
+# Compuesto de cada año: todas las escenas o solo las de una temporada
+TREND_SEASONS = {"anual": None, **SEASON_MONTHS}
+# Años con dato que necesita un píxel para estimar su tendencia
+MIN_YEARS = 3
+ALPHA = 0.05
+TREND_SCALE = 30
+MAX_PIXELS = 1e10
+# Estadísticas del resumen por banda (slope, warming, cooling)
+TREND_STATS = ("mean", "max", "count", "p50", "p90")
+
+
+# --- GEE ---
+
+def annual_stack(collection, months=None):
+    """(Colección de compuestos p50 por año con bandas "t" (año) y "LST", lista de años); sin evaluar."""
+    if months:
+        collection = collection.filter(ee.Filter.calendarRange(min(months), max(months), "month"))
+    col = collection.select("LST").map(lambda img: img.set("year", img.date().get("year")))
+    # Solo los años que tienen escenas: ningún compuesto vacío entra a la reducción
+    years = col.aggregate_array("year").distinct().sort()
+
+    def composite(year):
+        lst = col.filter(ee.Filter.eq("year", year)).median()
+        t = ee.Image.constant(year).toFloat().rename("t").updateMask(lst.mask())
+        return t.addBands(lst).set("year", year)
+
+    return ee.ImageCollection.fromImages(years.map(composite)), years
+
+
+def trend_image(collection, roi, months=None):
+    """Imagen slope (°C/año), p_value y years por píxel; enmascarada donde hay menos de MIN_YEARS años."""
+    stack, _ = annual_stack(collection, months)
+    fit = stack.select(["t", "LST"]).reduce(
+        ee.Reducer.linearFit().combine(ee.Reducer.pearsonsCorrelation(), sharedInputs=True))
+    years = stack.select("LST").count().rename("years")
+    image = fit.select(["scale", "p-value"], ["slope", "p_value"]).addBands(years)
+    return image.updateMask(years.gte(MIN_YEARS)).clip(roi)
+
+
+def warming_image(image):
+    """Píxeles con tendencia positiva significativa (p < ALPHA), como máscara de unos."""
+    return image.select("slope").gt(0).And(image.select("p_value").lt(ALPHA)).selfMask().rename("warming")
+
+
+def trend_builders(comp, season="anual", scale=TREND_SCALE):
+    """Builders para Composite.get_many: años de la pila y resumen de la tendencia, en un solo viaje."""
+    size = comp.collection.size()
+    months = TREND_SEASONS[season]
+    _, years = annual_stack(comp.collection, months)
+    image = trend_image(comp.collection, comp.roi, months)
+    slope = image.select("slope")
+    significant = image.select("p_value").lt(ALPHA)
+    bands = slope.addBands([slope.updateMask(significant.And(slope.gt(0))).rename("warming"),
+                            slope.updateMask(significant.And(slope.lt(0))).rename("cooling")])
+    reducer = ee.Reducer.mean().combine(ee.Reducer.max(), sharedInputs=True) \
+        .combine(ee.Reducer.count(), sharedInputs=True).combine(ee.Reducer.percentile([50, 90]), sharedInputs=True)
+    stats = bands.reduceRegion(reducer=reducer, geometry=comp.roi, scale=scale, maxPixels=MAX_PIXELS, tileScale=4)
+    return {
+        f"trend_{season}_years": lambda: years,
+        f"trend_{season}_stats": lambda: when_not_empty(size, stats),
+    }
+
+
+def trend_summary(stats, years, pixel_area_m2=TREND_SCALE * TREND_SCALE):
+    """Resultado de trend_builders (o array_trend_stats) -> {years, n, mean, p50, p90, max, warming, cooling}.
+
+    warming / cooling: píxeles con tendencia significativa positiva / negativa,
+    con su fracción del total, área (km²), media y máximo.
+    """
+    stats = stats or {}
+    n = int(stats.get("slope_count") or 0)
+
+    def zone(band):
+        count = int(stats.get(f"{band}_count") or 0)
+        return {"n": count, "fraction": count / n if n else None, "area_km2": count * pixel_area_m2 / 1e6,
+                "mean": stats.get(f"{band}_mean"), "max": stats.get(f"{band}_max")}
+
+    return {
+        "years": [int(y) for y in years or []],
+        "n": n,
+        "mean": stats.get("slope_mean"),
+        "p50": stats.get("slope_p50"),
+        "p90": stats.get("slope_p90"),
+        "max": stats.get("slope_max"),
+        "warming": zone("warming"),
+        "cooling": zone("cooling"),
+    }
+
+
+# --- Motor local (NumPy) ---
+
+def t_pvalue(t, df):
+    """p bilateral de la t de Student con grados de libertad enteros (serie cerrada, Abramowitz y Stegun 26.7)."""
+    t = np.abs(np.asarray(t, dtype=np.float64))
+    df = np.asarray(df)
+    out = np.full(t.shape, np.nan)
+    ok = np.isfinite(t) & (df >= 1)
+    for v in np.unique(df[ok]).astype(int):
+        idx = ok & (df == v)
+        theta = np.arctan(t[idx] / math.sqrt(v))
+        c2 = np.cos(theta) ** 2
+        term = total = np.ones_like(theta)
+        if v % 2:
+            for k in range(1, (v - 3) // 2 + 1):
+                term = term * c2 * (2 * k) / (2 * k + 1)
+                total = total + term
+            inside = 2 / math.pi * (theta + (np.sin(theta) * np.cos(theta) * total if v > 1 else 0))
+        else:
+            for k in range(1, (v - 2) // 2 + 1):
+                term = term * c2 * (2 * k - 1) / (2 * k)
+                total = total + term
+            inside = np.sin(theta) * total
+        out[idx] = np.clip(1 - inside, 0, 1)
+    return out
+
+
+def array_trend(years, stack):
+    """Mínimos cuadrados por píxel sobre el eje 0 de `stack` (un compuesto por año), ignorando NaN.
+
+    Devuelve (pendiente °C/año, p bilateral de la pendiente, años con dato); NaN donde
+    hay menos de MIN_YEARS años. Mismo resultado que linearFit + pearsonsCorrelation.
+    """
+    y = stack.astype(np.float64)
+    valid = np.isfinite(y)
+    x = np.asarray(years, dtype=np.float64).reshape((-1,) + (1,) * (y.ndim - 1))
+    n = valid.sum(axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        dx = np.where(valid, x - np.where(valid, x, 0).sum(axis=0) / n, 0)
+        dy = np.where(valid, y - np.where(valid, y, 0).sum(axis=0) / n, 0)
+        sxx, sxy, syy = (dx * dx).sum(axis=0), (dx * dy).sum(axis=0), (dy * dy).sum(axis=0)
+        slope = sxy / sxx
+        r = np.clip(sxy / np.sqrt(sxx * syy), -1, 1)
+        t = r * np.sqrt((n - 2) / np.maximum(1e-12, 1 - r * r))
+    p_value = t_pvalue(t, n - 2)
+    fitted = (n >= MIN_YEARS) & (sxx > 0)
+    slope[~fitted] = np.nan
+    p_value[~fitted] = np.nan
+    return slope.astype(np.float32), p_value.astype(np.float32), n
+
+
+def warming_pixels(slope, p_value):
+    with np.errstate(invalid="ignore"):
+        return (slope > 0) & (p_value < ALPHA)
+
+
+def array_trend_stats(slope, p_value, mask):
+    """Lo mismo que la reducción de trend_builders sobre los arreglos locales (claves <banda>_<estadística>)."""
+    with np.errstate(invalid="ignore"):
+        significant = p_value < ALPHA
+        zones = {"slope": np.isfinite(slope), "warming": significant & (slope > 0),
+                 "cooling": significant & (slope < 0)}
+    stats = {}
+    for band, selected in zones.items():
+        values = slope[selected & mask].astype(np.float64)
+        stats[f"{band}_count"] = int(values.size)
+        if values.size:
+            p50, p90 = np.percentile(values, [50, 90])
+            stats.update({f"{band}_mean": float(values.mean()), f"{band}_max": float(values.max()),
+                          f"{band}_p50": float(p50), f"{band}_p90": float(p90)})
+    return stats
+
+
+@dataclass
+class LocalTrend:
+    grid: object
+    mask: np.ndarray
+    years: list
+    slope: np.ndarray       # °C/año, float32 con NaN
+    p_value: np.ndarray
+    n_years: np.ndarray
+
+
+def build_local_trend(sources, grid, roi_mask=None, months=None,
+                      memory_limit=DEFAULT_MEMORY_LIMIT, workers=None, scratch_dir=None):
+    """Tendencia por píxel leyendo cada escena una sola vez, con memoria acotada.
+
+    1. La LST de cada escena va, tesela por tesela, a un cubo temporal (memmap si no cabe).
+    2. Por tesela: mediana por año sobre las escenas de ese año y array_trend sobre los años.
+    """
+    if months:
+        sources = [s for s in sources if s.date.month in months]
+    roi_mask = np.ones(grid.shape, dtype=bool) if roi_mask is None else roi_mask
+    years = sorted({s.date.year for s in sources})
+    result = LocalTrend(grid=grid, mask=roi_mask, years=years,
+                        slope=np.full(grid.shape, np.nan, dtype=np.float32),
+                        p_value=np.full(grid.shape, np.nan, dtype=np.float32),
+                        n_years=np.zeros(grid.shape, dtype=np.int16))
+    n = len(sources)
+    plan = plan_cube(grid.shape, n, 1, 3, memory_limit, workers)
+    tiles = [win for win in windows(grid, plan.block)
+             if roi_mask[win[0]:win[0] + win[2], win[1]:win[1] + win[3]].any()]
+    if len(years) < MIN_YEARS or not tiles:
+        return result
+    groups = [np.array([i for i, s in enumerate(sources) if s.date.year == year]) for year in years]
+
+    directory = (scratch_dir or tempfile.gettempdir()) if plan.on_disk else None
+    with TemporalCube(len(tiles), n, plan.block, directory) as cube:
+
+        def ingest(i):
+            reader = sources[i].open(grid)
+            try:
+                for t, (row, col, h, w) in enumerate(tiles):
+                    # Solo QA_PIXEL y ST_B10: la tendencia no necesita las bandas de reflectancia
+                    qa, st_b10 = reader.read("QA_PIXEL", row, col, h, w), reader.read("ST_B10", row, col, h, w)
+                    valid = cloud_mask(qa) & thermal_mask(st_b10) & roi_mask[row:row + h, col:col + w]
+                    cube.write(t, i, np.where(valid, lst_celsius(st_b10), np.nan).astype(np.float32))
+            finally:
+                reader.close()
+
+        def reduce_tile(t):
+            row, col, h, w = tiles[t]
+            stack = cube.read(t)
+            annual = np.stack([nan_percentiles(stack[g], (50,))[50] for g in groups])
+            slope, p_value, count = array_trend(years, annual)
+            result.slope[row:row + h, col:col + w] = slope[:h, :w]
+            result.p_value[row:row + h, col:col + w] = p_value[:h, :w]
+            result.n_years[row:row + h, col:col + w] = count[:h, :w]
+
+        with ThreadPoolExecutor(max_workers=plan.workers) as pool:
+            list(pool.map(ingest, range(n)))
+            list(pool.map(reduce_tile, range(len(tiles))))
+
+    return result
@@ -0,0 +1,6 @@
+# --------------------------------------------------------------
+# tablero — Paneles y utilidades del dashboard de main.py
+# config es ligero (lo usa cada rerun); engine (ee), mapping (folium)
+# y cada módulo de tablero.panels se importan al abrir el panel que
+# los necesita y quedan cargados para el resto del proceso.
+# --------------------------------------------------------------
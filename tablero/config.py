@@ -0,0 +1,90 @@
+# --------------------------------------------------------------
+# config.py — Constantes y estado ligero del tablero
+# Lo que necesitan la barra lateral y el router en cada rerun, sin
+# importar ee, folium, pandas ni altair: así abrir "Info" (o cambiar
+# una fecha) no paga esas importaciones. Lo que sí depende de GEE vive
+# en tablero.engine y lo de folium en tablero.mapping.
+# --------------------------------------------------------------
+
+import datetime as dt
+import os
+from pathlib import Path
+
+import streamlit as st
+
+from icu.catalog import get_scene_catalog
+from icu.localities import load_locality_index
+from icu.results import ResultsStore
+from icu.tracing import KIND_STEP, get_trace_log, traced
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# --- CONSTANTES ---
+ASSET_ID = "projects/ee-cando/assets/areas_urbanas_Tab"
+MAX_NUBES = 30
+LANDSAT8_FIRST_YEAR = 2013
+
+# Índice local de localidades (shapefile localidades_urbanas/), una vez por proceso
+LOCALIDADES = load_locality_index()
+
+# Cachés en disco compartidas por todas las sesiones (compuestos, escenas, exportaciones).
+# Lo precalculado por lotes (python -m icu.precompute) se lee sin tocar GEE.
+CACHE_DIR = Path(os.environ.get("ICU_CACHE_DIR") or ROOT / ".cache")
+RESULTS = ResultsStore(CACHE_DIR / "results")
+# Catálogo local de escenas (fecha, nubes, path/row): conteos y fechas limpias sin consultar a GEE
+CATALOG = get_scene_catalog(str(CACHE_DIR / "catalog.sqlite"))
+
+# Motor local (NumPy sobre GeoTIFF Landsat C2 L2 en disco), alternativo a GEE
+BACKEND_GEE = "Earth Engine"
+BACKEND_LOCAL = "Local (GeoTIFF)"
+LANDSAT_DIR = Path(os.environ.get("ICU_LANDSAT_DIR", ROOT / "data" / "landsat"))
+# Tope de memoria por compuesto local; las pilas más grandes se procesan desde disco
+LOCAL_MEMORY_LIMIT = int(os.environ.get("ICU_MEMORY_LIMIT_MB", 1024)) * 2**20
+
+MAP_ZOOM = 12
+
+# Trazas por render (tiempos, consultas a GEE, bytes, cachés). Para monitoreo:
+# ICU_TRACE_FILE agrega una línea JSON por render; ICU_METRICS_FILE se reescribe
+# con texto de Prometheus (textfile collector de node_exporter)
+TRACE_LOG = get_trace_log(jsonl_path=os.environ.get("ICU_TRACE_FILE"),
+                          metrics_path=os.environ.get("ICU_METRICS_FILE"))
+
+# --- PALETAS ---
+VIZ_LST = {"min": 25, "max": 55, "palette": ['blue', 'cyan', 'yellow', 'orange', 'red', 'maroon']}
+VIZ_NDVI = {"min": 0, "max": 0.6, "palette": ['brown', 'white', 'green']}
+# Tendencia de LST por píxel (°C/año) y píxeles que se calientan de forma significativa
+VIZ_TREND = {"min": -0.5, "max": 0.5, "palette": ['#2166ac', '#67a9cf', '#f7f7f7', '#ef8a62', '#b2182b']}
+VIZ_WARMING = {"palette": ['#000000']}
+# Variables de la comparación por temporada -> título del eje
+SEASONAL_BANDS = {"LST": "LST media (°C)", "NDVI": "NDVI medio"}
+
+
+def get_period():
+    start = st.session_state.date_range[0].strftime("%Y-%m-%d")
+    end = st.session_state.date_range[1].strftime("%Y-%m-%d")
+    return start, end
+
+def clean_scene_count(locality_name, period=None):
+    """Escenas limpias según el catálogo local, o None si el catálogo aún no cubre el periodo."""
+    start, end = period or get_period()
+    return CATALOG.count(LOCALIDADES.get(locality_name), start, end, MAX_NUBES)
+
+def nearest_clean_dates(locality_name, period=None):
+    """Texto con las fechas limpias más cercanas antes y después del periodo ("" si no hay)."""
+    start, end = period or get_period()
+    dates = [dt.date.fromisoformat(d).strftime("%d/%m/%Y")
+             for d in CATALOG.nearest(LOCALIDADES.get(locality_name), start, end, MAX_NUBES) if d]
+    return " y ".join(dates)
+
+def warn_no_clean_scenes(locality_name, period=None):
+    """Aviso de periodo sin escenas limpias con las fechas más cercanas que sí tienen."""
+    nearest = nearest_clean_dates(locality_name, period)
+    st.warning("Sin imágenes limpias en este periodo."
+               + (f" Fechas limpias más cercanas: {nearest}." if nearest else ""))
+
+def use_local():
+    return st.session_state.backend == BACKEND_LOCAL
+
+@traced("altair_chart", KIND_STEP)
+def show_chart(chart, slot=st):
+    slot.altair_chart(chart, use_container_width=True)
@@ -0,0 +1,205 @@
+# --------------------------------------------------------------
+# engine.py — Motores de cálculo del tablero (Earth Engine y local)
+# Sesión de GEE, cachés compartidas por proceso (compuestos, escenas,
+# capas de GEE, teselas locales) y las consultas que usan los paneles
+# de datos. Importar este módulo importa ee: lo hacen los paneles que
+# lo necesitan, no la barra lateral ni "Info".
+# --------------------------------------------------------------
+
+import functools
+import os
+
+import ee
+import numpy as np
+import streamlit as st
+
+from icu.composites import get_composite_cache
+from icu.hotspots import find_clusters
+from icu.inspector import Inspector
+from icu.local import get_local_backend
+from icu.parallel import get_shared_pool
+from icu.products import SCENE_STATS, composite_clusters, threshold_builders
+from icu.raster import Grid
+from icu.replay import Replayer, gee_standin_from_env
+from icu.scenestore import SceneStore
+from icu.seasonal import group_scene_rows, seasonal_builders, tidy_groups
+from icu.session import CLOSED as GEE_CLOSED, GeeUnavailable, get_gee_session
+from icu.tiles import get_map_id_cache, get_tile_server
+from icu.trend import (TREND_SCALE, TREND_SEASONS, array_trend_stats, trend_builders, trend_image, trend_summary,
+                       warming_image, warming_pixels)
+from tablero.config import (CACHE_DIR, CATALOG, LANDSAT_DIR, LOCAL_MEMORY_LIMIT, LOCALIDADES, MAX_NUBES, VIZ_TREND,
+                            VIZ_WARMING, get_period, use_local)
+
+# Caché de compuestos compartida por todas las sesiones (memoria + disco con TTL).
+# Antes se consulta lo precalculado por lotes (python -m icu.precompute).
+COMPOSITES = get_composite_cache(max_entries=32, disk_dir=CACHE_DIR / "composites",
+                                 results_dir=CACHE_DIR / "results")
+
+# Estadísticas por escena persistentes: ampliar el periodo solo pide escenas nuevas
+SCENES = SceneStore(CACHE_DIR / "scenes.sqlite", SCENE_STATS)
+
+# URLs de teselas de GEE memoizadas por (imagen, vis_params) mientras el token siga vigente
+MAP_IDS = get_map_id_cache()
+# Servidor XYZ local (opcional) para las capas del motor local: ICU_TILE_PORT lo activa y
+# ICU_TILE_URL indica la dirección pública si el navegador no ve 127.0.0.1
+TILE_PORT = os.environ.get("ICU_TILE_PORT")
+TILES = get_tile_server(int(TILE_PORT), public_url=os.environ.get("ICU_TILE_URL")) if TILE_PORT else None
+
+# Grabación / reproducción de las consultas a GEE (pruebas sin red y python -m icu.benchmark)
+GEE_STANDIN = gee_standin_from_env()
+# Sesión de GEE del proceso: credenciales y pool HTTP compartidos, cupo de consultas
+# simultáneas, reintentos con espera exponencial y cortacircuitos (ICU_GEE_MAX_CONCURRENT)
+GEE_SESSION = get_gee_session(max_concurrent=int(os.environ.get("ICU_GEE_MAX_CONCURRENT", 8)))
+
+def _initialize_gee():
+    if isinstance(GEE_STANDIN, Replayer):
+        GEE_STANDIN.initialize()
+    elif 'GEE_SERVICE_ACCOUNT' in st.secrets and 'GEE_PRIVATE_KEY' in st.secrets:
+        service_account = st.secrets["GEE_SERVICE_ACCOUNT"]
+        raw_key = st.secrets["GEE_PRIVATE_KEY"]
+        private_key = raw_key.strip().replace('\\n', '\n')
+        credentials = ee.ServiceAccountCredentials(service_account, key_data=private_key)
+        ee.Initialize(credentials)
+    else:
+        ee.Initialize()
+
+def connect_with_gee():
+    """Inicializa Earth Engine una sola vez por proceso (compartido por todas las sesiones)."""
+    try:
+        GEE_SESSION.initialize(_initialize_gee)
+        refresh_catalog()
+        return True
+    except Exception as e:
+        st.error(f"Error GEE: {e}")
+        return False
+
+def refresh_catalog():
+    """Pone al día el catálogo de escenas en segundo plano si está viejo (no al reproducir una grabación)."""
+    if not isinstance(GEE_STANDIN, Replayer):
+        get_shared_pool().submit(CATALOG.refresh_if_stale, LOCALIDADES.bbox())
+
+def gee_panel(panel):
+    """Panel que, si GEE no responde y no hay respuesta en caché, avisa en lugar de fallar."""
+    @functools.wraps(panel)
+    def wrapper(*args, **kwargs):
+        try:
+            return panel(*args, **kwargs)
+        except GeeUnavailable as e:
+            st.warning(f"Earth Engine no responde por ahora y este panel no está en caché. "
+                       f"Intenta de nuevo en unos segundos. ({e})")
+    return wrapper
+
+def local_backend():
+    return get_local_backend(str(LANDSAT_DIR), memory_limit=LOCAL_MEMORY_LIMIT, scratch_dir=str(CACHE_DIR / "cubes"))
+
+def get_local_composite(locality_name, period=None):
+    """Compuesto p50 calculado con NumPy sobre las escenas de LANDSAT_DIR (sin GEE)."""
+    start, end = period or get_period()
+    return local_backend().composite(LOCALIDADES.get(locality_name), start, end, MAX_NUBES)
+
+def get_composite(locality_name, bands=("LST", "NDVI"), period=None):
+    """Compuesto p50 compartido entre paneles para la localidad y el periodo activos.
+
+    Desde hilos de trabajo debe pasarse `period`, porque ahí no hay session_state.
+    """
+    start, end = period or get_period()
+    # Con el catálogo al día, los valores en caché siguen valiendo mientras no cambien las escenas
+    scene_key = CATALOG.scene_key(LOCALIDADES.get(locality_name), start, end, MAX_NUBES)
+    return COMPOSITES.get(locality_name, start, end, MAX_NUBES, bands,
+                          roi_factory=lambda: get_roi(locality_name), scene_key=scene_key)
+
+def get_thresholds(comp):
+    """Conteo de escenas y umbrales p90 (LST) / p95 (NDVI) del compuesto, en un solo viaje a GEE."""
+    return comp.get_many(threshold_builders(comp))
+
+def get_local_clusters(lc):
+    """(FeatureCollection, máscaras filtradas) de islas de calor y refugios del compuesto local."""
+    return lc.get("clusters", lambda: find_clusters(
+        lc.bands, lc.grid, lc.mask, lc.percentile("LST_p50", 90), lc.percentile("NDVI_p50", 95)))
+
+def get_clusters(locality_name):
+    """Islas de calor y refugios verdes vectorizados (GeoJSON) de la localidad y el periodo activos.
+
+    Con GEE el mosaico se baja una vez como arreglo (computePixels) y el
+    resultado queda en la caché del compuesto (memoria + disco).
+    """
+    if use_local():
+        return get_local_clusters(get_local_composite(locality_name))[0]
+    return composite_clusters(get_composite(locality_name), LOCALIDADES.get(locality_name))
+
+def get_inspector(locality_name):
+    """Malla LST/NDVI p50 en memoria para el inspector; con GEE se baja una sola vez por compuesto."""
+    bands = ("LST_p50", "NDVI_p50")
+    if use_local():
+        lc = get_local_composite(locality_name)
+        return Inspector({b: lc.band(b) for b in bands}, lc.grid)
+    grid = Grid.for_locality(LOCALIDADES.get(locality_name))
+    return Inspector(get_composite(locality_name).arrays(grid, bands), grid)
+
+def get_seasonal(locality_name, first_year, last_year):
+    """Estadísticas por temporada y por mes de todas las escenas de varios años (filas ordenadas).
+
+    Con GEE todas las agrupaciones salen de un solo viaje; el resultado queda en la
+    caché del compuesto de ese periodo como cualquier otro valor.
+    """
+    period = (f"{first_year}-01-01", f"{last_year + 1}-01-01")
+    if use_local():
+        return group_scene_rows(get_local_composite(locality_name, period=period).scenes)
+    comp = get_composite(locality_name, period=period)
+    return tidy_groups(comp.get_many(seasonal_builders(comp)))
+
+def get_trend(locality_name, first_year, last_year, season):
+    """Tendencia de LST por píxel (°C/año) de varios años: {summary, tiles, overlays}.
+
+    Con GEE la pila de compuestos anuales, el ajuste y el resumen salen de una sola
+    reducción (un viaje) y las capas son URLs de teselas; con el motor local cada
+    escena se lee una vez y las capas son (arreglo, malla, vis_params).
+    """
+    months = TREND_SEASONS[season]
+    if use_local():
+        lt = local_backend().trend(LOCALIDADES.get(locality_name), first_year, last_year, MAX_NUBES, months)
+        summary = trend_summary(array_trend_stats(lt.slope, lt.p_value, lt.mask), lt.years, lt.grid.pixel_area_m2())
+        warming = np.where(warming_pixels(lt.slope, lt.p_value), 1.0, np.nan)
+        return {"summary": summary, "tiles": {},
+                "overlays": {"slope": (lt.slope, lt.grid, VIZ_TREND), "warming": (warming, lt.grid, VIZ_WARMING)}}
+    comp = get_composite(locality_name, bands=("LST",), period=(f"{first_year}-01-01", f"{last_year + 1}-01-01"))
+    values = comp.get_many(trend_builders(comp, season))
+    summary = trend_summary(values[f"trend_{season}_stats"], values[f"trend_{season}_years"], TREND_SCALE ** 2)
+    tiles = {}
+    if summary["n"]:
+        image = trend_image(comp.collection, comp.roi, months)
+        tiles = {"slope": MAP_IDS.url(image.select("slope"), VIZ_TREND),
+                 "warming": MAP_IDS.url(warming_image(image), VIZ_WARMING)}
+    return {"summary": summary, "tiles": tiles, "overlays": {}}
+
+def get_roi(locality_name):
+    locality = LOCALIDADES.get(locality_name)
+    if locality:
+        return locality.ee_geometry()
+    return None
+
+def show_status():
+    """Estado de GEE y de las cachés del motor en la barra lateral."""
+    gee_status = GEE_SESSION.status()
+    if gee_status["state"] != GEE_CLOSED:
+        st.warning(f"Earth Engine degradado: reintento en {gee_status['retry_in']:.0f} s "
+                   f"({gee_status['stale_served']} respuestas desde caché)")
+    elif gee_status["initialized"]:
+        st.caption(f"GEE: {gee_status['in_flight']}/{gee_status['max_concurrent']} consultas en curso · "
+                   f"{gee_status['retried']} reintentos")
+
+    cache_stats = COMPOSITES.stats()
+    st.caption(f"Caché de compuestos: {cache_stats['hits']} aciertos / {cache_stats['misses']} fallos "
+               f"({cache_stats['entries']} en memoria)")
+    catalog = CATALOG.status()
+    if catalog["refreshing"]:
+        st.caption("Catálogo de escenas: actualizando...")
+    elif catalog["error"]:
+        st.caption(f"Catálogo de escenas sin actualizar: {catalog['error']}")
+    elif catalog["scenes"]:
+        st.caption(f"Catálogo de escenas: {catalog['scenes']} (última del {catalog['last']})")
+    map_stats = MAP_IDS.stats()
+    st.caption(f"Caché de capas GEE: {map_stats['hits']} aciertos / {map_stats['misses']} fallos")
+    if TILES:
+        tile_stats = TILES.stats()
+        st.caption(f"Teselas locales: {tile_stats['tiles']} en caché ({tile_stats['bytes'] / 2**20:.1f} MB)")
@@ -0,0 +1,183 @@
+# --------------------------------------------------------------
+# mapping.py — Integración con folium (mapas base, capas, leyendas)
+# Se importa con el primer panel que dibuja un mapa. Los mapas base y
+# las plantillas de leyenda se construyen una vez por proceso; cada
+# mapa recibe copias ligeras, porque folium asigna el padre al agregar
+# un elemento y los reruns de varias sesiones corren en paralelo.
+# --------------------------------------------------------------
+
+import base64
+import copy
+from functools import lru_cache
+
+import altair as alt
+import folium
+import pandas as pd
+import streamlit as st
+from branca.element import MacroElement, Template
+from folium.plugins import Draw
+from streamlit_folium import st_folium
+
+from icu.inspector import BILINEAR, NEAREST
+from icu.overlays import get_overlay_cache
+from icu.raster import colorize, to_png
+from icu.tracing import KIND_STEP, traced
+from tablero.config import LOCALIDADES, MAP_ZOOM, show_chart
+from tablero.engine import TILES
+
+# Contornos vectoriales simplificados y cuantizados por (capa, tolerancia del zoom)
+OVERLAYS = get_overlay_cache()
+
+# --- MAPAS BASE ---
+BASEMAPS = {
+    "Google Maps": folium.TileLayer(
+        tiles="https://mt1.google.com/vt/lyrs=m&x={x}&y={y}&z={z}",
+        attr="Google", name="Google Maps", overlay=False, control=True,
+    ),
+    "Google Satellite": folium.TileLayer(
+        tiles="https://mt1.google.com/vt/lyrs=s&x={x}&y={y}&z={z}",
+        attr="Google", name="Google Satellite", overlay=False, control=True,
+    ),
+    "Google Hybrid": folium.TileLayer(
+        tiles="https://mt1.google.com/vt/lyrs=y&x={x}&y={y}&z={z}",
+        attr="Google", name="Google Hybrid", overlay=False, control=True,
+    ),
+    "Esri Satellite": folium.TileLayer(
+        tiles="https://server.arcgisonline.com/ArcGIS/rest/services/World_Imagery/MapServer/tile/{z}/{y}/{x}",
+        attr="Esri", name="Esri Satellite", overlay=False, control=True,
+    ),
+}
+
+# --- INTEGRACIÓN FOLIUM ---
+def add_tile_layer(self, url_format, name, attr="Google Earth Engine"):
+    folium.raster_layers.TileLayer(
+        tiles=url_format,
+        attr=attr, name=name, overlay=True, control=True,
+    ).add_to(self)
+
+def add_array_layer(self, array, grid, vis_params, name):
+    """Capa de imagen a partir de un arreglo local (motor NumPy), sin pedir teselas a GEE.
+
+    Con el servidor de teselas activo se sirve como capa XYZ; si no, como una sola imagen.
+    """
+    if TILES:
+        self.add_tile_layer(TILES.register(array, grid, vis_params), name, attr="ICU (motor local)")
+        return
+    png = base64.b64encode(to_png(colorize(array, vis_params))).decode("ascii")
+    folium.raster_layers.ImageOverlay(
+        image=f"data:image/png;base64,{png}", bounds=grid.latlon_bounds(),
+        name=name, overlay=True, control=True,
+    ).add_to(self)
+
+def add_outline(self, locality, name):
+    """Contorno de la localidad, simplificado para el zoom inicial del mapa (caché por tolerancia)."""
+    folium.GeoJson(
+        data=OVERLAYS.locality(locality, self.options.get("zoom", MAP_ZOOM)), name=name,
+        style_function=lambda x: {'color': 'black', 'fillColor': 'transparent', 'weight': 2},
+        overlay=True, control=True
+    ).add_to(self)
+
+folium.Map.add_tile_layer = add_tile_layer
+folium.Map.add_array_layer = add_array_layer
+folium.Map.add_outline = add_outline
+
+@lru_cache(maxsize=64)
+def legend_template(title, colors, vmin, vmax):
+    """Plantilla Jinja de la leyenda, compilada una vez por proceso para cada combinación."""
+    css_gradient = f"linear-gradient(to right, {', '.join(colors)})"
+    template = f"""
+    {{% macro html(this, kwargs) %}}
+    <div style="
+        position: fixed; 
+        bottom: 50px; left: 50px; width: 250px; height: 85px; 
+        z-index:9999; font-size:14px;
+        background-color: rgba(255, 255, 255, 0.9);
+        color: #000000; /* FORZAR TEXTO NEGRO */
+        padding: 10px;
+        border-radius: 6px;
+        border: 1px solid #ccc;
+        box-shadow: 2px 2px 5px rgba(0,0,0,0.3);
+        ">
+        <div style="font-weight: bold; margin-bottom: 5px;">{title}</div>
+        <div style="width: 100%; height: 15px; background: {css_gradient}; border: 1px solid #888;"></div>
+        <div style="display: flex; justify-content: space-between; margin-top: 4px; font-size: 12px;">
+            <span>{vmin}</span>
+            <span>{vmax}</span>
+        </div>
+    </div>
+    {{% endmacro %}}
+    """
+    return Template(template)
+
+def add_legend(m, title, colors, vmin, vmax):
+    """Agrega leyenda flotante con texto NEGRO forzado para visibilidad"""
+    macro = MacroElement()
+    macro._template = legend_template(title, tuple(colors), vmin, vmax)
+    m.get_root().add_child(macro)
+
+INTERPOLACIONES = {"Vecino más cercano": NEAREST, "Bilineal": BILINEAR}
+
+def add_inspector_tools(m):
+    """Herramientas de dibujo: marcadores (consulta de varios puntos) y líneas (perfil de temperatura)."""
+    Draw(export=False, draw_options={
+        "polyline": True, "marker": True, "polygon": False,
+        "rectangle": False, "circle": False, "circlemarker": False,
+    }).add_to(m)
+
+def show_inspector(map_data, inspector):
+    """Responde clics, puntos y transectos desde la malla en memoria (sin consultas a GEE)."""
+    if not map_data:
+        return
+    method = INTERPOLACIONES[st.radio("Interpolación del inspector", list(INTERPOLACIONES), horizontal=True)]
+
+    if map_data.get('last_clicked'):
+        clicked_lat = map_data['last_clicked']['lat']
+        clicked_lng = map_data['last_clicked']['lng']
+        values = inspector.point(clicked_lng, clicked_lat, method)
+        val_lst, val_ndvi = values["LST_p50"], values["NDVI_p50"]
+        clicked_loc = LOCALIDADES.locate(clicked_lng, clicked_lat)
+        loc_label = clicked_loc.name if clicked_loc else "fuera del área urbana"
+        st.info(f"📍 **Inspector:** Lat: {clicked_lat:.4f}, Lon: {clicked_lng:.4f} ({loc_label})")
+        k1, k2 = st.columns(2)
+        k1.metric("🌡️ Temperatura", f"{val_lst:.2f} °C" if val_lst is not None else "N/A")
+        k2.metric("🌿 NDVI", f"{val_ndvi:.2f}" if val_ndvi is not None else "N/A")
+
+    drawings = [d.get("geometry") or {} for d in (map_data.get("all_drawings") or [])]
+    points = [g["coordinates"] for g in drawings if g.get("type") == "Point"]
+    lines = [g["coordinates"] for g in drawings if g.get("type") == "LineString"]
+    if points:
+        st.markdown("#### 📌 Puntos marcados")
+        df_points = pd.DataFrame(inspector.points(points, method)).rename(
+            columns={"LST_p50": "LST (°C)", "NDVI_p50": "NDVI"})
+        st.dataframe(df_points, hide_index=True, use_container_width=True)
+    for i, line in enumerate(lines, start=1):
+        profile = [r for r in inspector.profile(line, method=method) if r["LST_p50"] is not None]
+        if not profile:
+            continue
+        st.markdown(f"#### 📈 Perfil de temperatura (línea {i})")
+        df_profile = pd.DataFrame(profile)
+        chart = alt.Chart(df_profile).mark_line(point=True).encode(
+            x=alt.X('distance_m', title='Distancia (m)'),
+            y=alt.Y('LST_p50', title='LST (°C)', scale=alt.Scale(zero=False)),
+            tooltip=[alt.Tooltip('distance_m', format='.0f'), alt.Tooltip('LST_p50', format='.1f'),
+                     alt.Tooltip('NDVI_p50', format='.2f')]
+        ).properties(height=250).interactive()
+        show_chart(chart)
+
+@traced("st_folium", KIND_STEP)
+def show_map(m, **kwargs):
+    """st_folium medido (serializar el mapa y sus capas puede ser lo más lento del render)."""
+    return st_folium(m, **kwargs)
+
+
+def create_map(center=None, height=500):
+    location = center if center else [st.session_state.coordinates[0], st.session_state.coordinates[1]]
+    m = folium.Map(location=location, zoom_start=MAP_ZOOM, height=height, tiles=None)
+    for layer in BASEMAPS.values():
+        copy.copy(layer).add_to(m)
+    return m
+
+def show_status():
+    """Caché de contornos en la barra lateral."""
+    overlay_stats = OVERLAYS.stats()
+    st.caption(f"Contornos simplificados: {overlay_stats['entries']} en caché")
@@ -0,0 +1,20 @@
+# --------------------------------------------------------------
+# panels — Un módulo por panel, importado la primera vez que se abre
+# --------------------------------------------------------------
+
+import importlib
+
+# Opción del menú -> (módulo de tablero.panels, función que dibuja el panel)
+PANELS = {
+    "Mapas": ("mapas", "show_map_panel"),
+    "Gráficas": ("graficas", "show_graphics_panel"),
+    "Comparativa": ("comparativa", "show_comparison_panel"),
+    "Descargas": ("descargas", "show_report_panel"),
+    "Info": ("info", "show_info_panel"),
+}
+
+
+def load_panel(window):
+    """Función del panel; la primera vez importa su módulo (y con él ee, folium, pandas... si los usa)."""
+    module, function = PANELS[window]
+    return getattr(importlib.import_module(f"{__name__}.{module}"), function)
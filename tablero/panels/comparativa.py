@@ -0,0 +1,257 @@
+# --------------------------------------------------------------
+# comparativa.py — Panel de comparativa de ciudades y ranking
+# Cada ciudad se consulta en un hilo del pool y se pinta al terminar; el
+# ranking de todas las localidades sale de un solo viaje a GEE.
+# --------------------------------------------------------------
+
+import altair as alt
+import ee
+import folium
+import numpy as np
+import pandas as pd
+import streamlit as st
+from branca.colormap import LinearColormap
+
+from icu.overlays import zoom_for_bounds
+from icu.parallel import run_parallel
+from icu.products import summary_builders
+from icu.ranking import NAME_PROPERTY, ranking_builders, ranking_region, ranking_rows
+from icu.tracing import traced
+from tablero.config import (ASSET_ID, LOCALIDADES, MAX_NUBES, VIZ_LST, VIZ_NDVI, clean_scene_count, get_period,
+                            show_chart, use_local, warn_no_clean_scenes)
+from tablero.engine import (COMPOSITES, MAP_IDS, SCENES, connect_with_gee, gee_panel, get_composite,
+                            get_local_composite)
+from tablero.mapping import OVERLAYS, add_legend, create_map, show_map
+
+COMPARISON_WORKERS = 6
+COMPARISON_TIMEOUT = 120
+
+
+def fetch_city_comparison(city, period):
+    """Trabajo de una ciudad para la comparativa (corre en un hilo del pool, sin st.*)."""
+    if clean_scene_count(city, period) == 0:
+        return {"count": 0, "stats": {}, "series": [], "tiles": {}, "overlays": {}}
+    comp = get_composite(city, bands=("LST",), period=period)
+    roi = comp.roi
+    lst = comp.mosaic.select("LST_p50")
+
+    # Conteo, estadísticas e IDs de escena en un solo viaje
+    values = comp.get_many(summary_builders(comp))
+    result = {"count": values["count"], "stats": values["lst_mean_max_100"] or {},
+              "series": [], "tiles": {}, "overlays": {}}
+    if result["count"] > 0:
+        # Serie desde el almacén local; solo las escenas nuevas se calculan en GEE
+        scenes = SCENES.series(city, roi, values["product_ids"])
+        result["series"] = [{'date': r['date'], 'val': r['LST_mean'], 'city': city}
+                            for r in scenes if r['LST_mean'] is not None]
+        viz = VIZ_LST
+        outline = ee.Image().byte().paint(featureCollection=ee.FeatureCollection([ee.Feature(roi)]), color=1, width=2)
+        result["tiles"] = {
+            "Temperatura": MAP_IDS.url(lst, viz),
+            "Límite": MAP_IDS.url(outline, {'palette': 'black'}),
+        }
+    return result
+
+
+# Columnas del ranking -> encabezado de la tabla
+RANKING_COLUMNS = {
+    "name": "Localidad",
+    "uhi_intensity": "Intensidad ICU (°C)",
+    "lst_mean": "LST Promedio (°C)",
+    "lst_max": "LST Máxima (°C)",
+    "lst_p90": "LST p90 (°C)",
+    "lst_rural": "LST Rural (°C)",
+    "ndvi_mean": "NDVI Promedio",
+    "hotspot_fraction": "Área Caliente (%)",
+}
+# Nombre con el que el compuesto de todas las localidades entra a la caché
+RANKING_KEY = "Todas las localidades"
+
+
+def get_ranking(period):
+    """(conteo, umbral, filas) del ranking de todas las localidades en un solo viaje a GEE."""
+    urban = ee.FeatureCollection(ASSET_ID)
+    comp = COMPOSITES.get(RANKING_KEY, *period, MAX_NUBES, ("LST", "NDVI"),
+                          roi_factory=lambda: ranking_region(urban))
+    values = comp.get_many(ranking_builders(comp, urban))
+    return values["count"], values["ranking_threshold"], ranking_rows(values)
+
+
+@traced()
+def show_ranking():
+    """Ranking de islas de calor de todas las localidades: tabla ordenable y coropletas."""
+    if use_local():
+        st.info("El ranking de todas las localidades usa Earth Engine; cambia el motor en la barra lateral.")
+        return
+    with st.spinner("Calculando el ranking de todas las localidades..."):
+        count, threshold, rows = get_ranking(get_period())
+    if not count or not rows or threshold is None:
+        st.warning("No hay imágenes limpias en este periodo.")
+        return
+
+    df = pd.DataFrame(rows, columns=list(RANKING_COLUMNS))
+    # Columnas numéricas en float: los valores nulos de GEE quedan como NaN
+    numeric = list(RANKING_COLUMNS)[1:]
+    df[numeric] = df[numeric].apply(pd.to_numeric, errors="coerce").astype(float)
+    df["hotspot_fraction"] *= 100
+    metric = st.selectbox("Métrica", list(RANKING_COLUMNS)[1:], format_func=RANKING_COLUMNS.get)
+    df = df.sort_values(metric, ascending=metric == "ndvi_mean", na_position="last")
+    st.dataframe(df.rename(columns=RANKING_COLUMNS), hide_index=True, use_container_width=True)
+    st.caption(f"{count} imágenes · umbral común de isla de calor (p90 urbano): {threshold:.1f} °C · "
+               "intensidad = LST urbana − LST de una franja rural de 2 km.")
+
+    values = df.set_index("name")[metric].dropna()
+    if values.empty:
+        return
+    palette = VIZ_NDVI['palette'] if metric == "ndvi_mean" else VIZ_LST['palette']
+    colormap = LinearColormap(palette, vmin=float(values.min()), vmax=float(values.max()),
+                              caption=RANKING_COLUMNS[metric])
+    # Todas las localidades a la vez: contornos simplificados al zoom con el que se ve todo Tabasco
+    bboxes = np.array([LOCALIDADES.get(name).bbox for name in values.index if name in LOCALIDADES])
+    bounds = (bboxes[:, 0].min(), bboxes[:, 1].min(), bboxes[:, 2].max(), bboxes[:, 3].max())
+    zoom = zoom_for_bounds(bounds, height=550)
+    features = []
+    for name, value in values.items():
+        locality = LOCALIDADES.get(name)
+        if locality:
+            features.append({"type": "Feature", "geometry": OVERLAYS.locality(locality, zoom),
+                             "properties": {NAME_PROPERTY: name, "valor": round(float(value), 2)}})
+    m = create_map(height=550)
+    m.fit_bounds([[bounds[1], bounds[0]], [bounds[3], bounds[2]]])
+    folium.GeoJson(
+        {"type": "FeatureCollection", "features": features}, name=RANKING_COLUMNS[metric],
+        style_function=lambda f: {"fillColor": colormap(f["properties"]["valor"]), "color": "black",
+                                  "weight": 1, "fillOpacity": 0.8},
+        tooltip=folium.GeoJsonTooltip([NAME_PROPERTY, "valor"], aliases=["Localidad", RANKING_COLUMNS[metric]]),
+    ).add_to(m)
+    colormap.add_to(m)
+    show_map(m, width="100%", height=550, key="map_ranking")
+
+
+def fetch_city_comparison_local(city, period):
+    """Igual que fetch_city_comparison pero con el motor local (NumPy)."""
+    lc = get_local_composite(city, period=period)
+    result = {"count": lc.count, "stats": {}, "series": [], "tiles": {}, "overlays": {}}
+    if lc.count > 0:
+        values = lc.band("LST_p50")[lc.mask]
+        values = values[np.isfinite(values)]
+        if values.size:
+            result["stats"] = {"LST_p50_mean": float(values.mean()), "LST_p50_max": float(values.max())}
+        result["series"] = [{'date': r['date'], 'val': r['LST_mean'], 'city': city}
+                            for r in lc.scenes if r['LST_mean'] is not None]
+        result["overlays"] = {"Temperatura": (lc.band("LST_p50"), lc.grid)}
+    return result
+
+
+@gee_panel
+@traced()
+def show_comparison_panel():
+    st.markdown("### ⚖️ Comparativa de Ciudades")
+    local = use_local()
+    if not local and not connect_with_gee(): return
+
+    if st.radio("Modo", ["Ciudades seleccionadas", "Ranking de todas"], horizontal=True) == "Ranking de todas":
+        show_ranking()
+        return
+
+    ciudades_disp = LOCALIDADES.names()
+    
+    all_cities = st.checkbox("Comparar todas las localidades")
+    selected = ciudades_disp if all_cities else st.multiselect(
+        "Selecciona las ciudades:", 
+        ciudades_disp, 
+        default=[c for c in st.session_state.compare_cities if c in LOCALIDADES],
+    )
+
+    if len(selected) < 2:
+        st.info("Selecciona al menos 2 ciudades.")
+        return
+
+    period = get_period()
+    n_cols = min(len(selected), 3)
+    grid = st.columns(n_cols)
+    slots = {}
+    for idx, city in enumerate(selected):
+        with grid[idx % n_cols]:
+            slots[city] = st.container()
+            slots[city].subheader(f"📍 {city}")
+            slots[city].caption("⏳ Calculando...")
+
+    st.markdown("---")
+    st.subheader("📊 Resultados Comparativos")
+    progress = st.progress(0.0, text="Consultando Earth Engine...")
+    st.markdown("##### 1. Promedios y Máximos")
+    table_slot = st.empty()
+    bar_slot = st.empty()
+    st.markdown("---")
+    st.markdown("##### 2. Evolución Temporal Simultánea")
+    line_slot = st.empty()
+
+    stats_data = []
+    timeseries_data = []
+
+    # Cada ciudad corre en paralelo; se pinta conforme termina (la más lenta marca el total)
+    fetch = fetch_city_comparison_local if local else fetch_city_comparison
+    results = run_parallel(selected, lambda city: fetch(city, period),
+                           max_workers=COMPARISON_WORKERS, timeout=COMPARISON_TIMEOUT)
+    for done, res in enumerate(results, start=1):
+        city = res.item
+        progress.progress(done / len(selected), text=f"{done}/{len(selected)} ciudades listas")
+        with slots[city]:
+            if not res.ok:
+                st.error(f"Error: {res.error}")
+                continue
+            data = res.value
+            if data["count"] == 0:
+                warn_no_clean_scenes(city, period)
+                continue
+
+            stats = data["stats"]
+            stats_data.append({
+                "Ciudad": city,
+                "LST Promedio (°C)": stats.get("LST_p50_mean"),
+                "LST Máxima (°C)": stats.get("LST_p50_max")
+            })
+            timeseries_data.extend(data["series"])
+
+            locality = LOCALIDADES.get(city)
+            centroid = locality.centroid
+            m = create_map(center=[centroid[1], centroid[0]], height=350)
+            for name, url in data["tiles"].items():
+                m.add_tile_layer(url, name)
+            for name, (array, grid) in data["overlays"].items():
+                m.add_array_layer(array, grid, VIZ_LST, name)
+            if data["overlays"]:
+                m.add_outline(locality, "Límite")
+            viz = VIZ_LST
+            add_legend(m, f"LST {city}", viz['palette'], viz['min'], viz['max'])
+            show_map(m, width="100%", height=350, key=f"map_{city}")
+            st.caption(f"{data['count']} imágenes · {res.elapsed:.1f} s")
+
+        if stats_data:
+            df_stats = pd.DataFrame(stats_data).sort_values("LST Promedio (°C)", ascending=False)
+            table_slot.dataframe(df_stats, hide_index=True, use_container_width=True)
+            df_melt = df_stats.melt("Ciudad", var_name="Métrica", value_name="Temperatura")
+            bar_chart = alt.Chart(df_melt).mark_bar().encode(
+                x=alt.X('Ciudad', sort='-y', title=None),
+                y=alt.Y('Temperatura', title='Grados Celsius'),
+                color='Métrica',
+                xOffset='Métrica',
+                tooltip=['Ciudad', 'Métrica', alt.Tooltip('Temperatura', format='.1f')]
+            ).properties(height=300)
+            show_chart(bar_chart, bar_slot)
+
+        if timeseries_data:
+            df_ts = pd.DataFrame(timeseries_data)
+            df_ts['date'] = pd.to_datetime(df_ts['date'])
+            line_chart = alt.Chart(df_ts).mark_line(point=True).encode(
+                x=alt.X('date', title='Fecha de Captura'),
+                y=alt.Y('val', title='LST Promedio de la Ciudad (°C)', scale=alt.Scale(zero=False)),
+                color='city',
+                tooltip=['date', 'city', 'val']
+            ).properties(height=400).interactive()
+            show_chart(line_chart, line_slot)
+
+    progress.empty()
+    if not stats_data:
+        st.info("Ninguna ciudad tiene imágenes limpias en este periodo.")
@@ -0,0 +1,181 @@
+# --------------------------------------------------------------
+# descargas.py — Panel de descarga de datos
+# Serie por escena, muestra de puntos, cúmulos (GeoJSON / GeoParquet) y
+# la exportación completa de píxeles por bloques (tabla o COG).
+# --------------------------------------------------------------
+
+import pandas as pd
+import streamlit as st
+
+from icu.batch import get_info
+from icu.export import COLUMNS, FORMATS, RASTER_BANDS, RASTER_FORMATS, export_pixels, export_raster
+from icu.hotspots import KIND_HOTSPOT, KIND_REFUGE, to_geojson_bytes, to_geoparquet_bytes
+from icu.products import scene_builders
+from icu.raster import Grid, locality_mask
+from icu.tracing import traced
+from tablero.config import CACHE_DIR, LOCALIDADES, clean_scene_count, get_period, use_local, warn_no_clean_scenes
+from tablero.engine import SCENES, connect_with_gee, gee_panel, get_clusters, get_composite, get_local_composite
+
+EXPORT_WORKERS = 4
+EXPORT_MIME = {
+    "parquet": "application/vnd.apache.parquet",
+    "csv": "text/csv",
+    "cog": "image/tiff; application=geotiff; profile=cloud-optimized",
+}
+
+
+@gee_panel
+@traced()
+def show_report_panel():
+    st.markdown(f"### 📥 Descarga de Datos: {st.session_state.locality}")
+    if st.session_state.locality not in LOCALIDADES: return
+
+    if use_local():
+        lc = get_local_composite(st.session_state.locality)
+        count = lc.count
+    else:
+        if clean_scene_count(st.session_state.locality) == 0:
+            return warn_no_clean_scenes(st.session_state.locality)
+        if not connect_with_gee(): return
+        comp = get_composite(st.session_state.locality)
+        roi = comp.roi
+
+        scalars = comp.get_many(scene_builders(comp))
+        count = scalars["count"]
+    if count == 0:
+        st.warning("No hay datos para exportar.")
+        return
+    
+    st.info("Generando archivos para exportación...")
+
+    if use_local():
+        scenes = lc.scenes
+    else:
+        mosaic = comp.mosaic
+        scenes = SCENES.series(st.session_state.locality, roi, scalars["product_ids"])
+    # El motor local no calcula todas las estadísticas por escena: las faltantes quedan vacías
+    ts_export = [{
+        'Fecha': r['date'],
+        'LST_Promedio': r['LST_mean'],
+        'LST_Maxima': r.get('LST_max'),
+        'LST_Minima': r.get('LST_min'),
+        'LST_DesvEst': r.get('LST_stdDev'),
+        'LST_p10': r.get('LST_p10'),
+        'LST_p50': r.get('LST_p50'),
+        'LST_p90': r.get('LST_p90'),
+        'NDVI_Promedio': r.get('NDVI_mean'),
+        'Pixeles_Validos': r.get('LST_count'),
+        'Fraccion_Valida': r.get('valid_fraction'),
+    } for r in scenes if r['LST_mean'] is not None]
+    df_ts = pd.DataFrame(ts_export)
+
+    st.markdown("#### Datos Disponibles")
+    c1, c2 = st.columns(2)
+    
+    if not df_ts.empty:
+        csv_ts = df_ts.to_csv(index=False).encode('utf-8')
+        c1.download_button(
+            "📅 Descargar Serie Temporal (.csv)",
+            csv_ts, f"serie_tiempo_{st.session_state.locality}.csv", "text/csv"
+        )
+    
+    def get_sample_rows():
+        if use_local():
+            return [{"Lon": r["Lon"], "Lat": r["Lat"], "LST_C": r["LST_p50"], "NDVI": r["NDVI_p50"]}
+                    for r in lc.sample(500)]
+        sample = mosaic.select(["LST_p50", "NDVI_p50"]).sample(region=roi, scale=100, numPixels=500, geometries=True)
+        rows = []
+        for feat in get_info(sample)['features']:
+            props = feat['properties']
+            coords = feat['geometry']['coordinates']
+            rows.append({
+                "Lon": coords[0], "Lat": coords[1], 
+                "LST_C": props.get("LST_p50"), "NDVI": props.get("NDVI_p50")
+            })
+        return rows
+
+    rows = get_sample_rows() if use_local() else comp.get("sample_500", get_sample_rows)
+    if rows:
+        df_sample = pd.DataFrame(rows)
+        csv_sample = df_sample.to_csv(index=False).encode('utf-8')
+        c2.download_button(
+            "📍 Descargar Puntos Muestreo (.csv)",
+            csv_sample, f"puntos_muestreo_{st.session_state.locality}.csv", "text/csv"
+        )
+
+    st.markdown("#### Islas de Calor y Refugios Verdes")
+    with st.spinner("Delimitando cúmulos..."):
+        clusters = get_clusters(st.session_state.locality)
+    if clusters and clusters["features"]:
+        props = [f["properties"] for f in clusters["features"]]
+        hot = [p for p in props if p["kind"] == KIND_HOTSPOT]
+        veg = [p for p in props if p["kind"] == KIND_REFUGE]
+        st.caption(f"{len(hot)} islas de calor ({sum(p['area_m2'] for p in hot) / 1e4:.1f} ha) y "
+                   f"{len(veg)} refugios verdes ({sum(p['area_m2'] for p in veg) / 1e4:.1f} ha).")
+        c3, c4 = st.columns(2)
+        c3.download_button(
+            "🔥 Descargar Cúmulos (.geojson)",
+            to_geojson_bytes(clusters), f"cumulos_{st.session_state.locality}.geojson", "application/geo+json"
+        )
+        c4.download_button(
+            "🗂️ Descargar Cúmulos (.parquet)",
+            to_geoparquet_bytes(clusters), f"cumulos_{st.session_state.locality}.parquet",
+            "application/vnd.apache.parquet"
+        )
+    else:
+        st.info("No se encontraron cúmulos en este periodo.")
+
+    show_full_export()
+
+
+@traced()
+def show_full_export():
+    """Todos los píxeles de 30 m de la localidad, pedidos por bloques y escritos directo a archivo.
+
+    Como tabla (un renglón por píxel) o como Cloud-Optimized GeoTIFF con las bandas LST y NDVI.
+    """
+    st.markdown("#### Exportación Completa (píxeles de 30 m)")
+    extensions = {**FORMATS, **RASTER_FORMATS}
+    fmt = st.radio("Formato", list(extensions), horizontal=True, format_func=str.upper,
+                   help="COG: GeoTIFF en teselas, comprimido y con vistas generales (QGIS, GDAL, navegador)."
+                   if RASTER_FORMATS else None)
+    raster = fmt in RASTER_FORMATS
+    locality = LOCALIDADES.get(st.session_state.locality)
+    start, end = get_period()
+    backend = "local" if use_local() else "gee"
+    path = CACHE_DIR / "exports" / f"pixeles_{locality.cvegeo}_{start}_{end}_{backend}{extensions[fmt]}"
+
+    if not path.exists():
+        if not st.button("⚙️ Preparar exportación completa"):
+            return
+        bands = RASTER_BANDS if raster else tuple(COLUMNS.values())
+        if use_local():
+            lc = get_local_composite(locality.name)
+            grid, mask = lc.grid, lc.mask
+            fetch = lambda window, sub: {b: lc.band(b)[window[0]:window[0] + window[2], window[1]:window[1] + window[3]]
+                                         for b in bands}
+        else:
+            comp = get_composite(locality.name)
+            grid = Grid.for_locality(locality)
+            mask = locality_mask(locality, grid)
+            fetch = lambda window, sub: comp.fetch_arrays(sub, bands)
+        bar = st.progress(0.0, text="Descargando bloques...")
+        progress = lambda done, total: bar.progress(done / total, text=f"Bloque {done} de {total}")
+        try:
+            if raster:
+                rows = export_raster(path, grid, mask, fetch, bands=bands, workers=EXPORT_WORKERS, progress=progress)
+            else:
+                rows = export_pixels(path, grid, mask, fetch, fmt=fmt, workers=EXPORT_WORKERS, progress=progress)
+        except ImportError as e:
+            bar.empty()
+            st.error(str(e))
+            return
+        bar.empty()
+        st.success(f"{rows:,} píxeles exportados.")
+
+    with open(path, "rb") as f:
+        st.download_button(
+            f"🧾 Descargar Píxeles ({extensions[fmt]})", f,
+            f"pixeles_{st.session_state.locality}_{start}_{end}{extensions[fmt]}",
+            EXPORT_MIME[fmt]
+        )
@@ -0,0 +1,245 @@
+# --------------------------------------------------------------
+# graficas.py — Panel de análisis estadístico
+# Correlación y distribución LST / NDVI (exactas o de una muestra), serie
+# de tiempo por escena o tendencia por píxel y comparación por temporada.
+# --------------------------------------------------------------
+
+import datetime as dt
+
+import altair as alt
+import pandas as pd
+import streamlit as st
+
+from icu.batch import get_info
+from icu.distribution import LST_BINS, NDVI_BINS, array_distribution, distribution_builders, distribution_summary
+from icu.products import scene_builders
+from icu.seasonal import COLUMNS as SEASONAL_COLUMNS
+from icu.tracing import traced
+from icu.trend import ALPHA, MIN_YEARS, TREND_SEASONS
+from tablero.config import (LANDSAT8_FIRST_YEAR, LOCALIDADES, SEASONAL_BANDS, VIZ_TREND, clean_scene_count, show_chart,
+                            use_local, warn_no_clean_scenes)
+from tablero.engine import (SCENES, connect_with_gee, gee_panel, get_composite, get_local_composite, get_seasonal,
+                            get_trend)
+
+GRAPHICS_EXACT = "Todos los píxeles (exacto)"
+GRAPHICS_SAMPLE = "Muestra de 1000 puntos"
+TREND_SERIES = "Serie de la ciudad"
+TREND_PIXELS = "Tendencia por píxel"
+TREND_LAYERS = {"slope": "Tendencia LST (°C/año)", "warming": f"Calentamiento significativo (p < {ALPHA})"}
+
+def show_distribution(dist):
+    """Correlación, ajuste lineal, histograma y densidad 2-D NDVI × LST calculados sobre todos los píxeles."""
+    if not dist["n"]:
+        return
+    st.markdown("#### 1. Correlación Calor vs. Vegetación")
+    df_density = pd.DataFrame(dist["density"])
+    df_density["ndvi_hi"] = df_density["ndvi"] + NDVI_BINS[2]
+    df_density["lst_hi"] = df_density["lst"] + LST_BINS[2]
+    density = alt.Chart(df_density).mark_rect().encode(
+        x=alt.X('ndvi:Q', title='Índice de Vegetación (NDVI)'), x2='ndvi_hi:Q',
+        y=alt.Y('lst:Q', title='Temperatura (°C)', scale=alt.Scale(zero=False)), y2='lst_hi:Q',
+        color=alt.Color('count:Q', title='Píxeles', scale=alt.Scale(type='log', scheme='turbo')),
+        tooltip=[alt.Tooltip('ndvi', title='NDVI desde', format='.2f'),
+                 alt.Tooltip('lst', title='LST desde (°C)', format='.0f'), alt.Tooltip('count', title='Píxeles')]
+    )
+    chart = density
+    if dist["slope"] is not None:
+        ndvi_range = [df_density["ndvi"].min(), df_density["ndvi_hi"].max()]
+        df_fit = pd.DataFrame({"ndvi": ndvi_range,
+                               "lst": [dist["offset"] + dist["slope"] * x for x in ndvi_range]})
+        chart = density + alt.Chart(df_fit).mark_line(color='black', strokeDash=[6, 3]).encode(x='ndvi:Q', y='lst:Q')
+    show_chart(chart.properties(height=350))
+
+    if dist["correlation"] is not None:
+        st.info(f"📉 **Coeficiente de Correlación:** {dist['correlation']:.2f} sobre {dist['n']:,} píxeles "
+                f"(p = {dist['p_value']:.2g}). Ajuste: LST = {dist['slope']:.1f} · NDVI + {dist['offset']:.1f} °C. "
+                "(Un valor negativo indica que a mayor vegetación, menor temperatura).")
+
+    st.markdown("#### 2. Distribución de Temperaturas")
+    df_hist = pd.DataFrame(dist["histogram"])
+    df_hist["lst_hi"] = df_hist["lst"] + LST_BINS[2]
+    hist = alt.Chart(df_hist).mark_bar().encode(
+        x=alt.X('lst:Q', title='Rango de Temperatura (°C)', scale=alt.Scale(zero=False)), x2='lst_hi:Q',
+        y=alt.Y('count:Q', title='Píxeles'),
+        color=alt.value('#ffaa00'),
+        tooltip=[alt.Tooltip('lst', title='LST desde (°C)', format='.0f'), alt.Tooltip('count', title='Píxeles')]
+    ).properties(height=300)
+    show_chart(hist)
+
+def show_pixel_trend(locality_name):
+    """Mapa de tendencia de LST por píxel (°C/año) con su significancia y resumen de las zonas que se calientan."""
+    # folium solo se importa si se abre esta vista
+    import folium
+
+    from tablero.mapping import add_legend, create_map, show_map
+
+    this_year = dt.date.today().year
+    col1, col2 = st.columns([3, 1])
+    first_year, last_year = col1.slider("Años de la tendencia", LANDSAT8_FIRST_YEAR, this_year,
+                                        (max(LANDSAT8_FIRST_YEAR, this_year - 10), this_year - 1), key="trend_years")
+    season = col2.selectbox("Compuesto", list(TREND_SEASONS), key="trend_season",
+                            help="Un compuesto p50 por año con todas las escenas o solo las de una temporada.")
+    if last_year - first_year + 1 < MIN_YEARS:
+        st.info(f"Elige al menos {MIN_YEARS} años.")
+        return
+    with st.spinner("Ajustando la tendencia por píxel..."):
+        trend = get_trend(locality_name, first_year, last_year, season)
+    summary = trend["summary"]
+    if not summary["n"]:
+        st.info(f"No hay píxeles con escenas limpias en al menos {MIN_YEARS} años de ese rango.")
+        return
+
+    locality = LOCALIDADES.get(locality_name)
+    centroid = locality.centroid
+    m = create_map(center=[centroid[1], centroid[0]])
+    for name, url in trend["tiles"].items():
+        m.add_tile_layer(url, TREND_LAYERS[name])
+    for name, (array, grid, vis) in trend["overlays"].items():
+        m.add_array_layer(array, grid, vis, TREND_LAYERS[name])
+    m.add_outline(locality, "Límite Urbano")
+    add_legend(m, "Tendencia LST (°C/año)", VIZ_TREND['palette'], VIZ_TREND['min'], VIZ_TREND['max'])
+    folium.LayerControl().add_to(m)
+    show_map(m, width="100%", height=500, key="map_trend")
+
+    warming = summary["warming"]
+    c1, c2, c3 = st.columns(3)
+    c1.metric("Tendencia mediana", f"{summary['p50'] or 0:+.2f} °C/año", help=f"p90: {summary['p90'] or 0:+.2f} °C/año")
+    c2.metric("Se calienta (significativo)", f"{warming['fraction'] or 0:.0%} del área", f"{warming['area_km2']:.2f} km²",
+              delta_color="inverse")
+    c3.metric("Tendencia en esas zonas", f"{warming['mean'] or 0:+.2f} °C/año",
+              help=f"Máxima: {warming['max'] or 0:+.2f} °C/año")
+    years = summary["years"]
+    st.caption(f"Recta por píxel sobre {len(years)} compuestos ({season}, {years[0]}–{years[-1]}); "
+               f"{summary['n']:,} píxeles con al menos {MIN_YEARS} años. Significativo: p < {ALPHA} (t de Student). "
+               f"{summary['cooling']['fraction'] or 0:.0%} del área se enfría de forma significativa.")
+
+def show_sample(data):
+    """Gráficas de una muestra de puntos (dispersión e histograma en el navegador)."""
+    if not data:
+        return
+    df = pd.DataFrame(data)
+
+    st.markdown("#### 1. Correlación Calor vs. Vegetación")
+    chart = alt.Chart(df).mark_circle(size=60, opacity=0.6).encode(
+        x=alt.X('NDVI_p50', title='Índice de Vegetación (NDVI)'),
+        y=alt.Y('LST_p50', title='Temperatura (°C)', scale=alt.Scale(zero=False)),
+        color=alt.Color('LST_p50', scale=alt.Scale(scheme='turbo')),
+        tooltip=['NDVI_p50', 'LST_p50']
+    ).properties(height=350).interactive()
+    show_chart(chart)
+
+    # --- RESULTADOS RESTAURADOS ---
+    # Calcular correlación
+    corr = df['LST_p50'].corr(df['NDVI_p50'])
+    st.info(f"📉 **Coeficiente de Correlación:** {corr:.2f}. (Un valor negativo indica que a mayor vegetación, menor temperatura).")
+
+    st.markdown("#### 2. Distribución de Temperaturas")
+    hist = alt.Chart(df).mark_bar().encode(
+        x=alt.X('LST_p50', bin=alt.Bin(maxbins=20), title='Rango de Temperatura'),
+        y=alt.Y('count()', title='Frecuencia'),
+        color=alt.value('#ffaa00')
+    ).properties(height=300)
+    show_chart(hist)
+
+@gee_panel
+@traced()
+def show_graphics_panel():
+    st.markdown(f"### 📊 Análisis Estadístico: {st.session_state.locality}")
+    if st.session_state.locality not in LOCALIDADES: return
+
+    if use_local():
+        with st.spinner("Procesando escenas locales..."):
+            lc = get_local_composite(st.session_state.locality)
+        count = lc.count
+        get_sample = lambda: lc.sample(1000)
+        get_distribution = lambda: lc.get("distribution", lambda: array_distribution(
+            lc.band("NDVI_p50")[lc.mask], lc.band("LST_p50")[lc.mask]))
+        get_scenes = lambda: lc.scenes
+    else:
+        if clean_scene_count(st.session_state.locality) == 0:
+            return warn_no_clean_scenes(st.session_state.locality)
+        if not connect_with_gee(): return
+        comp = get_composite(st.session_state.locality)
+        roi = comp.roi
+        
+        scalars = comp.get_many(scene_builders(comp))
+        count = scalars["count"]
+        mosaic = comp.mosaic
+        get_sample = lambda: comp.get("sample_1000", lambda: [x['properties'] for x in get_info(mosaic.select(["LST_p50", "NDVI_p50"]).sample(
+            region=roi, scale=30, numPixels=1000, geometries=False))['features']])
+        def get_distribution():
+            values = comp.get_many(distribution_builders(comp))
+            return distribution_summary(values["dist_fit"], values["dist_density"])
+        get_scenes = lambda: SCENES.series(st.session_state.locality, roi, scalars["product_ids"])
+
+    if count == 0:
+        st.warning("No hay datos suficientes.")
+        return
+
+    mode = st.radio("Datos", [GRAPHICS_EXACT, GRAPHICS_SAMPLE], horizontal=True, key="graphics_mode",
+                    help="Exacto: GEE reduce todos los píxeles y solo envía los agregados.")
+    with st.spinner("Calculando estadísticas..."):
+        if mode == GRAPHICS_EXACT:
+            show_distribution(get_distribution())
+        else:
+            show_sample(get_sample())
+
+    st.markdown("---")
+    st.markdown("#### 3. Tendencia Histórica")
+    if st.radio("Vista", [TREND_SERIES, TREND_PIXELS], horizontal=True, key="trend_view") == TREND_PIXELS:
+        show_pixel_trend(st.session_state.locality)
+    else:
+        with st.spinner("Calculando serie de tiempo..."):
+            scenes = get_scenes()
+        ts_features = [{'date': r['date'], 'LST_mean': r['LST_mean']} for r in scenes if r['LST_mean'] is not None]
+        
+        if ts_features:
+            df_ts = pd.DataFrame(ts_features)
+            df_ts['date'] = pd.to_datetime(df_ts['date'])
+            
+            line_chart = alt.Chart(df_ts).mark_line(point=True).encode(
+                x=alt.X('date', title='Fecha de Captura', axis=alt.Axis(format='%Y-%m-%d')),
+                y=alt.Y('LST_mean', title='LST Promedio de la Ciudad (°C)', scale=alt.Scale(zero=False)),
+                tooltip=[alt.Tooltip('date', format='%Y-%m-%d'), alt.Tooltip('LST_mean', format='.1f')]
+            ).properties(height=350).interactive()
+            show_chart(line_chart)
+        else:
+            st.info("No hay suficientes puntos temporales.")
+
+    st.markdown("---")
+    st.markdown("#### 4. Comparación por Temporada (Seca vs. Lluvias)")
+    last_year = st.session_state.date_range[1].year
+    first_year, last_year = st.slider("Años", LANDSAT8_FIRST_YEAR, dt.date.today().year,
+                                      (max(LANDSAT8_FIRST_YEAR, last_year - 4), last_year))
+    band = st.radio("Variable", list(SEASONAL_BANDS), horizontal=True, key="seasonal_band")
+    with st.spinner("Agrupando escenas por temporada y mes..."):
+        df_groups = pd.DataFrame(get_seasonal(st.session_state.locality, first_year, last_year),
+                                 columns=SEASONAL_COLUMNS)
+    df_groups = df_groups[df_groups["band"] == band]
+    if df_groups.empty:
+        st.info("No hay escenas en esos años.")
+        return
+
+    title = SEASONAL_BANDS[band]
+    df_season = df_groups[df_groups["level"] == "temporada"]
+    season_chart = alt.Chart(df_season).mark_bar().encode(
+        x=alt.X('year:O', title='Año'),
+        xOffset='season:N',
+        y=alt.Y('mean:Q', title=title, scale=alt.Scale(zero=False)),
+        color=alt.Color('season:N', title='Temporada',
+                        scale=alt.Scale(domain=['seca', 'lluvias', 'otra'], range=['#d7301f', '#2b8cbe', '#bdbdbd'])),
+        tooltip=['year', 'season', alt.Tooltip('mean', format='.2f'), alt.Tooltip('min', format='.2f'),
+                 alt.Tooltip('max', format='.2f'), alt.Tooltip('stdDev', format='.2f'), 'count']
+    ).properties(height=300)
+    show_chart(season_chart)
+
+    df_month = df_groups[df_groups["level"] == "mes"]
+    month_chart = alt.Chart(df_month).mark_rect().encode(
+        x=alt.X('month:O', title='Mes'),
+        y=alt.Y('year:O', title='Año'),
+        color=alt.Color('mean:Q', title=title, scale=alt.Scale(scheme='turbo' if band == "LST" else 'greens')),
+        tooltip=['year', 'month', alt.Tooltip('mean', format='.2f'), 'count']
+    ).properties(height=220)
+    show_chart(month_chart)
+    st.caption(f"{int(df_season['count'].sum())} escenas con datos entre {first_year} y {last_year}, "
+               "promediadas por escena y agrupadas por temporada y mes.")
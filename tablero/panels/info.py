@@ -0,0 +1,30 @@
+# --------------------------------------------------------------
+# info.py — Panel de información del proyecto
+# Solo texto: no importa ee, folium ni pandas.
+# --------------------------------------------------------------
+
+import streamlit as st
+
+from icu.tracing import traced
+
+@traced()
+def show_info_panel():
+    st.markdown("""
+    ### Descripción
+    Este proyecto tiene como objetivo permitir identificar, analizar y visualizar las 
+    **Islas de Calor Urbano (ICU)** en el municipio de **Teapa, Tabasco** como área de estudio principal, mediante el 
+    procesamiento de imágenes satelitales (Landsat 8) y el cálculo de la 
+    **Temperatura Superficial Terrestre (LST)**.
+    
+    ---
+    ### Autores
+    - **Adrian Lara Vázquez** — Residente
+    - **Ing. Daniel Perez Flores** — Colaborador
+    - **M.I José de Jesús Lenin Valencia Cruz** — Asesor Interno
+    - **Mtro. Candelario Peralta Carreta** — Asesor Externo
+
+    ---
+    ### Instituciones
+    - **Instituto Tecnológico Superior de la Región Sierra (ITSS)**
+    - **Centro del Cambio Global y la Sustentabilidad en el Sureste A.C. (CCGSS)**
+    """)
@@ -0,0 +1,205 @@
+# --------------------------------------------------------------
+# mapas.py — Panel de mapas (LST, hotspots, NDVI, refugios e inspector)
+# Con GEE las capas se piden en paralelo y se pintan conforme llegan;
+# con el motor local son imágenes generadas en el servidor.
+# --------------------------------------------------------------
+
+import folium
+import numpy as np
+import streamlit as st
+
+from icu.hotspots import KIND_HOTSPOT, KIND_REFUGE
+from icu.parallel import JobGroup, get_shared_pool
+from icu.tracing import traced
+from tablero.config import (LANDSAT_DIR, LOCALIDADES, VIZ_LST, VIZ_NDVI, clean_scene_count, get_period, use_local,
+                            warn_no_clean_scenes)
+from tablero.engine import (MAP_IDS, connect_with_gee, gee_panel, get_composite, get_inspector,
+                            get_local_clusters, get_local_composite, get_thresholds)
+from tablero.mapping import add_inspector_tools, add_legend, add_tile_layer, create_map, show_inspector, show_map
+
+@traced()
+def show_local_map_panel():
+    """Variante del panel de mapas con el motor local: las capas son imágenes generadas en el servidor."""
+    locality = LOCALIDADES.get(st.session_state.locality)
+    if not locality:
+        st.error("Localidad no encontrada.")
+        return
+
+    with st.spinner("Procesando escenas locales..."):
+        lc = get_local_composite(locality.name)
+
+    centroid = locality.centroid
+    m = create_map(center=[centroid[1], centroid[0]])
+    m.add_outline(locality, "Límite Urbano")
+
+    if lc.count > 0:
+        lst = lc.band("LST_p50")
+        ndvi = lc.band("NDVI_p50")
+        m.add_array_layer(lst, lc.grid, VIZ_LST, "1. LST (°C)")
+        add_legend(m, "Temperatura LST (°C)", VIZ_LST['palette'], VIZ_LST['min'], VIZ_LST['max'])
+
+        # Mismo filtro que en GEE: cúmulos de al menos 3 píxeles (8-conectividad)
+        clusters, masks = get_local_clusters(lc)
+        p90_val_info = clusters["properties"]["LST_threshold"]
+        if p90_val_info is not None:
+            hot = np.where(masks[KIND_HOTSPOT], 1.0, np.nan)
+            m.add_array_layer(hot, lc.grid, {"palette": ['#000000']}, f"2. Hotspots (> {p90_val_info:.1f}°C)")
+
+        m.add_array_layer(ndvi, lc.grid, VIZ_NDVI, "3. NDVI")
+
+        p95_ndvi_info = clusters["properties"]["NDVI_threshold"]
+        if p95_ndvi_info is not None:
+            veg = np.where(masks[KIND_REFUGE], 1.0, np.nan)
+            m.add_array_layer(veg, lc.grid, {"palette": ['#00FF00']}, f"4. Refugios Verdes (> {p95_ndvi_info:.2f})")
+
+        st.success(f"Análisis local basado en {lc.count} imágenes procesadas.")
+        c1, c2 = st.columns(2)
+        c1.metric("🔥 Umbral Calor Crítico (p90)", f"{p90_val_info or 0:.2f} °C")
+        c2.metric("🌳 Umbral Alta Vegetación (p95)", f"{p95_ndvi_info or 0:.2f} NDVI")
+    else:
+        st.warning(f"Sin imágenes locales limpias en este periodo ({LANDSAT_DIR}).")
+
+    folium.LayerControl().add_to(m)
+    if lc.count > 0:
+        add_inspector_tools(m)
+    map_data = show_map(m, width="100%", height=600)
+
+    if lc.count > 0:
+        show_inspector(map_data, get_inspector(locality.name))
+
+
+# Capas del panel de mapas con GEE: se piden en paralelo y se pintan conforme llegan
+MAP_WORKERS = 6
+MAP_POLL_SECONDS = 0.5
+MAP_LAYERS = ("lst", "hotspots", "ndvi", "refuges")
+
+def hotspot_url(lst_band, p90):
+    if p90 is None: return None
+    uhi = lst_band.gte(p90)
+    uhi_clean = uhi.updateMask(uhi.connectedPixelCount(100, True).gte(3)).selfMask()
+    return MAP_IDS.url(uhi_clean, {"palette": ['#000000']})
+
+def refuge_url(ndvi_band, p95):
+    if p95 is None: return None
+    return MAP_IDS.url(ndvi_band.gte(p95).selfMask(), {"palette": ['#00FF00']})
+
+def start_map_jobs(locality_name):
+    """Umbrales y map IDs del panel de mapas en el pool compartido; hotspots y refugios esperan a los umbrales."""
+    comp = get_composite(locality_name)
+    lst_band = comp.mosaic.select("LST_p50")
+    ndvi_band = comp.mosaic.select("NDVI_p50")
+    jobs = JobGroup(get_shared_pool(MAP_WORKERS))
+    jobs.submit("scalars", get_thresholds, comp)
+    jobs.submit("lst", MAP_IDS.url, lst_band, VIZ_LST)
+    jobs.submit("ndvi", MAP_IDS.url, ndvi_band, VIZ_NDVI)
+    jobs.then("hotspots", "scalars", lambda s: hotspot_url(lst_band, s["lst_p90"]))
+    jobs.then("refuges", "scalars", lambda s: refuge_url(ndvi_band, s["ndvi_p95"]))
+    return jobs
+
+def get_map_jobs(locality_name):
+    """Trabajos del mapa de la localidad y el periodo activos.
+
+    Se relanzan si cambian, o si alguno falló y el error ya se mostró en un render
+    completo: el siguiente rerun lo reintenta sin entrar en un ciclo de reruns.
+    """
+    key = (locality_name, *get_period())
+    current = st.session_state.get("map_jobs")
+    failed = current and st.session_state.get("map_errors_shown") is current[1]
+    if not current or current[0] != key or failed:
+        current = (key, start_map_jobs(locality_name))
+        st.session_state.map_jobs = current
+    return current[1]
+
+def render_map_layers(locality, jobs):
+    """Mapa base y contorno al instante; cada capa y métrica terminada se agrega sin redibujar el mapa."""
+    scalars = jobs.result("scalars")
+    count = scalars["count"] if scalars else None
+    p90_val_info = scalars["lst_p90"] if scalars else None
+    p95_ndvi_info = scalars["ndvi_p95"] if scalars else None
+    labels = {
+        "lst": "1. LST (°C)",
+        "hotspots": f"2. Hotspots (> {p90_val_info:.1f}°C)" if p90_val_info is not None else "2. Hotspots",
+        "ndvi": "3. NDVI",
+        "refuges": f"4. Refugios Verdes (> {p95_ndvi_info:.2f})" if p95_ndvi_info is not None else "4. Refugios Verdes",
+    }
+
+    centroid = locality.centroid
+    m = create_map(center=[centroid[1], centroid[0]])
+    m.add_outline(locality, "Límite Urbano")
+    add_legend(m, "Temperatura LST (°C)", VIZ_LST['palette'], VIZ_LST['min'], VIZ_LST['max'])
+    add_inspector_tools(m)
+    groups = []
+    if count:
+        for name in MAP_LAYERS:
+            url = jobs.result(name)
+            if url:
+                group = folium.FeatureGroup(name=labels[name])
+                add_tile_layer(group, url, labels[name])
+                groups.append(group)
+    map_data = show_map(m, width="100%", height=600, key="map_gee",
+                        feature_group_to_add=groups, layer_control=folium.LayerControl())
+
+    pending = jobs.pending()
+    if count is None:
+        if "scalars" in jobs.errors():
+            st.error(f"Error GEE: {jobs.errors()['scalars']}")
+        else:
+            st.caption("⏳ Contando imágenes y calculando umbrales...")
+        return None
+    if count == 0:
+        warn_no_clean_scenes(locality.name)
+        return None
+    st.success(f"Análisis basado en {count} imágenes procesadas.")
+    c1, c2 = st.columns(2)
+    c1.metric("🔥 Umbral Calor Crítico (p90)", f"{p90_val_info or 0:.2f} °C")
+    c2.metric("🌳 Umbral Alta Vegetación (p95)", f"{p95_ndvi_info or 0:.2f} NDVI")
+    if pending:
+        st.caption("⏳ Cargando capas: " + ", ".join(labels[n] for n in pending))
+    for name, error in jobs.errors().items():
+        st.warning(f"Capa {labels.get(name, name)} no disponible: {error}")
+    return map_data
+
+@st.fragment(run_every=MAP_POLL_SECONDS)
+def poll_map_layers(locality, jobs):
+    """Se repite mientras haya capas pendientes; al terminar, un rerun completo deja el mapa sin sondeo."""
+    render_map_layers(locality, jobs)
+    if not jobs.pending():
+        st.rerun()
+
+@st.fragment
+def show_map_layers(locality, jobs):
+    """Mapa completo; los clics del inspector solo repiten este fragmento."""
+    map_data = render_map_layers(locality, jobs)
+    if jobs.errors():
+        st.session_state.map_errors_shown = jobs
+    if map_data is not None:
+        # La malla se baja una vez con el compuesto; los clics ya no consultan a GEE
+        with st.spinner("Preparando inspector..."):
+            inspector = get_inspector(locality.name)
+        show_inspector(map_data, inspector)
+
+@gee_panel
+@traced()
+def show_map_panel():
+    st.markdown(f"### 🗺️ Monitor Urbano: {st.session_state.locality}")
+    if use_local(): return show_local_map_panel()
+    # El catálogo local responde sin GEE si el periodo no tiene escenas limpias
+    if clean_scene_count(st.session_state.locality) == 0:
+        return warn_no_clean_scenes(st.session_state.locality)
+    if not connect_with_gee(): return
+    
+    locality = LOCALIDADES.get(st.session_state.locality)
+    if not locality:
+        st.error("Localidad no encontrada.")
+        return
+
+    jobs = get_map_jobs(locality.name)
+    # map_progressive=False (icu.benchmark) espera todas las capas antes de dibujar
+    if jobs.pending() and st.session_state.get("map_progressive", True):
+        poll_map_layers(locality, jobs)
+    else:
+        jobs.wait()
+        # Las consultas de los trabajos cuentan en el render que pinta sus resultados
+        jobs.collect()
+        show_map_layers(locality, jobs)
+
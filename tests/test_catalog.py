@@ -0,0 +1,149 @@
+# --------------------------------------------------------------
+# test_catalog.py — Catálogo local de escenas Landsat
+# GEE se reemplaza por un `fetch` que responde desde una lista de
+# escenas sintéticas y anota las ventanas que se le piden.
+# --------------------------------------------------------------
+
+import datetime as dt
+import os
+
+import numpy as np
+import pytest
+
+from icu.catalog import FIRST_DATE, LC08, SETTLE_DAYS, SceneCatalog, footprint_covers
+from icu.localities import Locality
+
+TODAY = dt.date(2024, 6, 20)
+BBOX = (-93.0, 17.9, -92.8, 18.1)
+
+
+def square(lon, lat, half):
+    """Anillo cerrado en sentido horario (como los exteriores del shapefile)."""
+    return np.array([[lon - half, lat - half], [lon - half, lat + half], [lon + half, lat + half],
+                     [lon + half, lat - half], [lon - half, lat - half]])
+
+
+def locality(name, lon, lat, half=0.02):
+    ring = square(lon, lat, half)
+    return Locality(name=name, cvegeo=name, rings=(ring,), bbox=(lon - half, lat - half, lon + half, lat + half),
+                    centroid=(lon, lat), area_km2=1.0)
+
+
+CITY = locality("Ciudad", -92.93, 17.99)
+TOWN = locality("Pueblo", -91.0, 17.5)
+NEAR = square(-92.93, 17.99, 0.9)      # escena que cubre la ciudad
+FAR = square(-80.0, 10.0, 0.9)         # escena lejos de todo
+
+
+def scene(date, cloud_cover, ring=NEAR, tag="a"):
+    return {"geometry": {"type": "Polygon", "coordinates": [ring.tolist()]},
+            "properties": {"product_id": f"LC08_{date:%Y%m%d}_{tag}", "date": date.isoformat(),
+                           "path": 21, "row": 47, "cloud_cover": cloud_cover}}
+
+
+class FakeGee:
+    def __init__(self, scenes):
+        self.scenes = list(scenes)
+        self.windows = []
+
+    def __call__(self, bbox, windows):
+        self.windows.append(windows)
+        return [(collection, s) for collection, start, end in windows for s in self.scenes
+                if start <= s["properties"]["date"] < end]
+
+
+SCENES = [
+    scene(dt.date(2024, 3, 28), 5),
+    scene(dt.date(2024, 4, 13), 10),
+    scene(dt.date(2024, 4, 29), 80),                    # nublada
+    scene(dt.date(2024, 5, 15), 20),
+    scene(dt.date(2024, 5, 15), 0, FAR, "lejos"),       # no toca la ciudad
+    scene(dt.date(2024, 5, 31), 15),
+]
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    return SceneCatalog(tmp_path / "catalogo.sqlite")
+
+
+def test_footprint_covers():
+    assert footprint_covers(NEAR, CITY)                                    # la ciudad cae dentro de la escena
+    assert footprint_covers(square(-92.90, 17.99, 0.02), CITY)             # se traslapan por un vértice
+    assert footprint_covers(square(-92.93, 17.99, 0.005), CITY)            # escena dentro de la ciudad
+    assert not footprint_covers(FAR, CITY)
+    assert not footprint_covers(NEAR, TOWN)
+
+
+def test_refresh_asks_gee_only_for_the_missing_years(catalog):
+    fake = FakeGee(SCENES)
+    assert catalog.refresh(BBOX, today=TODAY, fetch=fake) == len(SCENES)
+    windows = fake.windows[-1]
+    assert windows[0] == (LC08, FIRST_DATE[LC08], "2014-01-01")
+    assert windows[-1] == (LC08, "2024-01-01", "2024-06-21")
+    assert len(windows) == TODAY.year - 2013 + 1
+    settled = (TODAY - dt.timedelta(days=SETTLE_DAYS)).isoformat()
+    assert catalog.status()["covered_until"] == {LC08: settled}
+
+    # La siguiente actualización empieza donde el catálogo dejó de estar completo
+    later = TODAY + dt.timedelta(days=30)
+    fake.scenes.append(scene(dt.date(2024, 7, 2), 5))
+    assert catalog.refresh(BBOX, today=later, fetch=fake) == 1
+    assert fake.windows[-1] == [(LC08, settled, (later + dt.timedelta(days=1)).isoformat())]
+
+
+def test_queries_outside_coverage_return_none(catalog):
+    assert catalog.count(CITY, "2024-04-01", "2024-05-30", 30) is None
+    catalog.refresh(BBOX, today=TODAY, fetch=FakeGee(SCENES))
+    assert catalog.count(CITY, "2024-04-01", "2024-05-30", 30) == 2
+    assert catalog.count(CITY, "2024-06-01", "2024-06-21", 30) is None      # después de covered_until
+    assert catalog.count(CITY, "2012-01-01", "2013-06-01", 30) is None      # antes de la colección
+    assert catalog.count(None, "2024-04-01", "2024-05-30", 30) is None
+    assert catalog.count(TOWN, "2024-04-01", "2024-05-30", 30) == 0
+    # Mismo criterio que build_collection: CLOUD_COVER < max_clouds y la escena toca la localidad
+    dates = [s.date for s in catalog.scenes(CITY, "2024-03-01", "2024-06-01", 100)]
+    assert dates == ["2024-03-28", "2024-04-13", "2024-04-29", "2024-05-15", "2024-05-31"]
+
+
+def test_scene_key_depends_only_on_the_scenes(catalog):
+    catalog.refresh(BBOX, today=TODAY, fetch=FakeGee(SCENES))
+    key = catalog.scene_key(CITY, "2024-04-01", "2024-05-30", 30)
+    assert key.startswith(f"{LC08}:30:")
+    assert key == catalog.scene_key(CITY, "2024-04-05", "2024-05-20", 30)            # mismas escenas
+    assert key == SceneCatalog(catalog.path).scene_key(CITY, "2024-04-01", "2024-05-30", 30)
+    assert key != catalog.scene_key(CITY, "2024-03-20", "2024-05-30", 30)
+    assert key != catalog.scene_key(CITY, "2024-04-01", "2024-05-30", 90)
+    assert catalog.scene_key(CITY, "2024-06-01", "2024-06-21", 30) is None
+
+
+def test_nearest_clean_scenes(catalog):
+    assert catalog.nearest(CITY, "2024-04-20", "2024-05-10", 30) == (None, None)
+    catalog.refresh(BBOX, today=TODAY, fetch=FakeGee(SCENES))
+    # La del 29 de abril está nublada: no cuenta como limpia
+    assert catalog.nearest(CITY, "2024-04-20", "2024-05-10", 30) == ("2024-04-13", "2024-05-15")
+    assert catalog.nearest(CITY, "2024-03-01", "2024-03-20", 30) == (None, "2024-03-28")
+    assert catalog.nearest(TOWN, "2024-04-20", "2024-05-10", 30) == (None, None)
+
+
+def test_snapshot_sees_writes_from_another_catalog(catalog):
+    catalog.refresh(BBOX, today=TODAY, fetch=FakeGee(SCENES))
+    assert catalog.count(CITY, "2024-06-01", "2024-06-30", 30) is None
+    # Otro proceso (icu.precompute) actualiza el mismo archivo: la copia en memoria se invalida
+    other = SceneCatalog(catalog.path)
+    later = TODAY + dt.timedelta(days=30)
+    other.refresh(BBOX, today=later, fetch=FakeGee(SCENES + [scene(dt.date(2024, 6, 16), 1)]))
+    assert catalog.count(CITY, "2024-06-01", "2024-06-30", 30) == 1
+    assert catalog.status()["scenes"] == len(SCENES) + 1
+
+
+def test_snapshot_sees_writes_within_the_same_mtime(catalog):
+    catalog.refresh(BBOX, today=TODAY, fetch=FakeGee(SCENES))
+    assert catalog.count(CITY, "2024-04-01", "2024-05-30", 30) == 2
+    info = os.stat(catalog.path)
+    with catalog._connect() as conn:
+        conn.execute("UPDATE scenes SET cloud_cover = 1 WHERE date = '2024-04-29'")
+    conn.close()
+    # Mismo tamaño y misma mtime que antes de escribir (sistemas de archivos con mtime gruesa)
+    os.utime(catalog.path, ns=(info.st_atime_ns, info.st_mtime_ns))
+    assert os.stat(catalog.path).st_size == info.st_size
+    assert catalog.count(CITY, "2024-04-01", "2024-05-30", 30) == 3
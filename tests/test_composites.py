@@ -0,0 +1,113 @@
+# --------------------------------------------------------------
+# test_composites.py — Caché de compuestos: nivel en disco y lotes
+# Las consultas van a un destino de mentira (icu.batch.set_gee) que
+# cuenta los viajes y devuelve el diccionario pedido tal cual.
+# --------------------------------------------------------------
+
+import os
+import time
+
+import pytest
+
+from icu import batch
+from icu.composites import CompositeCache, DiskTier
+
+PERIOD = ("Teapa", "2024-04-01", "2024-05-30", 30, ("LST", "NDVI"))
+
+
+class FakeGee(batch.LiveGee):
+    def __init__(self):
+        self.requests = []
+
+    def get_info(self, ee_object):
+        self.requests.append(sorted(ee_object))
+        return dict(ee_object)
+
+
+@pytest.fixture
+def gee(monkeypatch):
+    fake = FakeGee()
+    # Sin ee.Initialize: el lote llega al destino como dict
+    monkeypatch.setattr(batch.ee, "Dictionary", dict)
+    batch.set_gee(fake)
+    yield fake
+    batch.set_gee()
+
+
+def composite(cache):
+    return cache.get(*PERIOD, roi_factory=lambda: None)
+
+
+def builders(**values):
+    return {name: (lambda v=value: v) for name, value in values.items()}
+
+
+def test_disk_round_trip_and_ttl(tmp_path):
+    tier = DiskTier(tmp_path, ttl=60)
+    tier.save(PERIOD, time.time(), {"count": 4, "lst_p90": 35.2})
+    assert tier.load(PERIOD)[1] == {"count": 4, "lst_p90": 35.2}
+    assert tier.load(("Otra", *PERIOD[1:]))[1] == {}
+    # Entrada vencida: se descarta y se borra del disco
+    tier.save(PERIOD, time.time() - 120, {"count": 4})
+    assert tier.load(PERIOD)[1] == {}
+    assert not list(tmp_path.glob("*.json"))
+
+
+def test_eviction_drops_expired_then_oldest_first(tmp_path):
+    tier = DiskTier(tmp_path, ttl=3600)
+    keys = [(f"L{i}", *PERIOD[1:]) for i in range(4)]
+    for key in keys[:3]:
+        tier.save(key, time.time(), {"count": 1})
+    size = tier._path(keys[0]).stat().st_size
+    now = time.time()
+    os.utime(tier._path(keys[0]), (now - 300, now - 300))     # la más antigua
+    os.utime(tier._path(keys[1]), (now - 10, now - 10))
+    os.utime(tier._path(keys[2]), (now - 200, now - 200))
+    tier.max_bytes = 2 * size
+    tier.save(keys[3], time.time(), {"count": 1})
+    assert [tier.load(k)[1] for k in keys] == [{}, {"count": 1}, {}, {"count": 1}]
+
+    # Por mtime vencida se borra en la siguiente escritura aunque sobre espacio
+    tier.max_bytes = 10 * size
+    os.utime(tier._path(keys[1]), (now - 7200, now - 7200))
+    tier.save(keys[0], time.time(), {"count": 2})
+    assert not tier._path(keys[1]).exists()
+    assert sorted(p.name for p in tmp_path.glob("*.json")) == sorted(
+        tier._path(k).name for k in (keys[0], keys[3]))
+
+
+def test_get_many_batches_only_missing_values(tmp_path, gee):
+    cache = CompositeCache(disk=DiskTier(tmp_path))
+    comp = composite(cache)
+    assert comp.get_many(builders(count=4, lst_p90=35.2)) == {"count": 4, "lst_p90": 35.2}
+    assert gee.requests == [["count", "lst_p90"]]
+    assert comp.get_many(builders(count=0, lst_p90=0, ndvi_p95=0.61)) == {"count": 4, "lst_p90": 35.2,
+                                                                          "ndvi_p95": 0.61}
+    assert gee.requests[1] == ["ndvi_p95"]
+    assert comp.get_many(builders(count=0)) == {"count": 4}
+    assert len(gee.requests) == 2
+    assert cache.stats()["hits"] == 3 and cache.stats()["misses"] == 3
+    assert composite(cache) is comp
+
+
+def test_disk_tier_serves_a_new_process(tmp_path, gee):
+    composite(CompositeCache(disk=DiskTier(tmp_path))).get_many(builders(count=4, lst_p90=35.2))
+    # Otro proceso (caché en memoria vacía) lee del disco sin consultar
+    fresh = CompositeCache(disk=DiskTier(tmp_path))
+    assert composite(fresh).get_many(builders(count=0, lst_p90=0)) == {"count": 4, "lst_p90": 35.2}
+    assert len(gee.requests) == 1 and fresh.stats()["misses"] == 0
+    # Con el TTL vencido se vuelve a pedir
+    expired = CompositeCache(disk=DiskTier(tmp_path, ttl=-1))
+    composite(expired).get_many(builders(count=5, lst_p90=36.0))
+    assert len(gee.requests) == 2
+
+
+def test_memory_tier_is_lru(gee):
+    cache = CompositeCache(max_entries=2)
+    get = lambda name: cache.get(name, *PERIOD[1:], roi_factory=lambda: None)
+    first = get("A")
+    get("B")
+    assert get("A") is first                 # A pasa a ser la más reciente
+    get("C")                                 # sale B, la menos usada
+    assert [key[0] for key in cache._entries] == ["A", "C"]
+    assert get("A") is first
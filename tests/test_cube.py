@@ -0,0 +1,47 @@
+# --------------------------------------------------------------
+# test_cube.py — Percentiles por píxel y cubo temporal
+# --------------------------------------------------------------
+
+import warnings
+
+import numpy as np
+import pytest
+
+from icu.cube import TemporalCube, nan_percentiles, plan_cube
+
+
+@pytest.mark.parametrize("percentiles", [(50,), (10, 50, 75, 90), (0, 100)])
+def test_nan_percentiles_matches_numpy(percentiles):
+    rng = np.random.default_rng(0)
+    stack = rng.normal(30, 5, size=(11, 8, 9)).astype(np.float32)
+    stack[rng.random(stack.shape) < 0.3] = np.nan
+    stack[:, 0, 0] = np.nan              # píxel sin observaciones
+    stack[1:, 0, 1] = np.nan             # píxel con una sola observación
+    out = nan_percentiles(stack, percentiles)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        expected = np.nanpercentile(stack.astype(np.float64), percentiles, axis=0)
+    for p, exp in zip(percentiles, expected):
+        assert out[p].dtype == np.float32
+        np.testing.assert_allclose(out[p], exp, rtol=1e-5, equal_nan=True)
+
+
+def test_plan_cube_moves_cube_to_disk_before_failing():
+    in_ram = plan_cube((100, 100), 10, 2, 3, memory_limit=1024 * 2**20, workers=2)
+    assert not in_ram.on_disk
+    on_disk = plan_cube((2000, 2000), 200, 2, 3, memory_limit=256 * 2**20, workers=2)
+    assert on_disk.on_disk
+    assert on_disk.work_bytes + 3 * 2000 * 2000 * 4 <= 256 * 2**20
+    with pytest.raises(MemoryError):
+        plan_cube((2000, 2000), 200, 2, 3, memory_limit=2**20)
+
+
+def test_temporal_cube_roundtrip_pads_edge_tiles(tmp_path):
+    with TemporalCube(2, 3, 4, directory=tmp_path) as cube:
+        path = cube.path
+        cube.write(1, 2, np.ones((3, 2), dtype=np.float32))
+        tile = cube.read(1)
+        assert tile.shape == (3, 4, 4)
+        assert (tile[2, :3, :2] == 1).all()
+        assert np.isnan(tile[2, 3, :]).all() and np.isnan(tile[2, :, 2:]).all()
+    assert not path.exists()
@@ -0,0 +1,48 @@
+# --------------------------------------------------------------
+# test_hotspots.py — Componentes conectadas sobre una malla a mano
+# --------------------------------------------------------------
+
+import numpy as np
+
+from icu.hotspots import label_components
+
+MASK = np.array([
+    [1, 1, 0, 0, 1],
+    [0, 1, 0, 0, 1],
+    [0, 0, 0, 1, 0],
+    [1, 0, 0, 0, 0],
+], dtype=bool)
+
+
+def components(labels):
+    """Conjuntos de píxeles por etiqueta (independiente de la numeración)."""
+    return {frozenset(zip(*np.nonzero(labels == k))) for k in np.unique(labels) if k}
+
+
+def test_label_components_8_connectivity_joins_diagonals():
+    labels, n = label_components(MASK, connectivity=8)
+    assert n == 3
+    assert (labels > 0).tolist() == MASK.tolist()
+    assert components(labels) == {
+        frozenset({(0, 0), (0, 1), (1, 1)}),
+        frozenset({(0, 4), (1, 4), (2, 3)}),
+        frozenset({(3, 0)}),
+    }
+
+
+def test_label_components_4_connectivity_splits_diagonals():
+    labels, n = label_components(MASK, connectivity=4)
+    assert n == 4
+    assert frozenset({(2, 3)}) in components(labels)
+    assert frozenset({(0, 4), (1, 4)}) in components(labels)
+
+
+def test_label_components_labels_are_consecutive():
+    rng = np.random.default_rng(1)
+    labels, n = label_components(rng.random((40, 50)) < 0.4)
+    assert sorted(np.unique(labels[labels > 0])) == list(range(1, n + 1))
+
+
+def test_label_components_empty_mask():
+    labels, n = label_components(np.zeros((3, 3), dtype=bool))
+    assert n == 0 and not labels.any()
@@ -0,0 +1,108 @@
+# --------------------------------------------------------------
+# test_local.py — Motor local contra rásteres sintéticos
+# Escenas ArraySource ya en la malla de destino: máscara QA (bits 3 y
+# 5), escala de ST_B10 a °C, NDVI y compuesto p50 por píxel, en
+# memoria y con el cubo temporal en disco.
+# --------------------------------------------------------------
+
+import datetime as dt
+
+import numpy as np
+import pytest
+
+from icu.cube import plan_cube
+from icu.local import ArraySource, build_local_composite, process_scene
+from icu.raster import Grid
+
+GRID = Grid(x0=500000.0, y0=2000000.0, res=30.0, width=6, height=5)
+CLOUD = 1 << 3
+SNOW = 1 << 5
+
+
+def celsius_to_dn(celsius):
+    """DN de ST_B10 que corresponde a `celsius` con la escala de Collection 2."""
+    return np.uint16(round((celsius + 273.15 - 149.0) / 0.00341802))
+
+
+def scene(day, celsius, qa=None, b4=1000, b5=3000):
+    shape = GRID.shape
+    arrays = {
+        "QA_PIXEL": np.full(shape, 21824, dtype=np.uint16) if qa is None else qa,
+        "ST_B10": np.full(shape, celsius_to_dn(celsius), dtype=np.uint16),
+        "SR_B4": np.full(shape, b4, dtype=np.uint16),
+        "SR_B5": np.full(shape, b5, dtype=np.uint16),
+    }
+    return ArraySource(f"LC08_{day}", dt.date(2024, 4, day), 10.0, arrays)
+
+
+def test_process_scene_masks_cloud_and_snow_bits():
+    qa = np.array([[21824, 21824 | CLOUD, 21824 | SNOW, 21824 | (1 << 4)]], dtype=np.uint16)
+    st_b10 = np.full(qa.shape, celsius_to_dn(30.0), dtype=np.uint16)
+    lst, nd = process_scene(qa, st_b10, np.full(qa.shape, 1000), np.full(qa.shape, 3000))
+    assert np.isfinite(lst).tolist() == [[True, False, False, True]]
+    assert np.isfinite(nd).tolist() == [[True, False, False, True]]
+
+
+def test_process_scene_masks_thermal_nodata():
+    qa = np.full((1, 3), 21824, dtype=np.uint16)
+    st_b10 = np.array([[0, celsius_to_dn(25.0), 65535]], dtype=np.uint16)
+    lst, _ = process_scene(qa, st_b10, np.ones((1, 3)), np.ones((1, 3)))
+    assert np.isfinite(lst).tolist() == [[False, True, False]]
+
+
+def test_st_b10_scaling_to_celsius():
+    qa = np.full((1, 2), 21824, dtype=np.uint16)
+    st_b10 = np.array([[44000, 50000]], dtype=np.uint16)
+    lst, _ = process_scene(qa, st_b10, np.ones((1, 2)), np.ones((1, 2)))
+    np.testing.assert_allclose(lst, st_b10 * 0.00341802 + 149.0 - 273.15, atol=1e-3)
+
+
+def test_ndvi_is_normalized_difference_of_b5_and_b4():
+    qa = np.full((1, 3), 21824, dtype=np.uint16)
+    st_b10 = np.full((1, 3), celsius_to_dn(30.0), dtype=np.uint16)
+    b4 = np.array([[1000, 2000, 0]], dtype=np.uint16)
+    b5 = np.array([[3000, 2000, 0]], dtype=np.uint16)
+    _, nd = process_scene(qa, st_b10, b4, b5)
+    np.testing.assert_allclose(nd[0, :2], [0.5, 0.0], atol=1e-6)
+    assert np.isnan(nd[0, 2])
+
+
+@pytest.fixture
+def sources():
+    cloudy = np.full(GRID.shape, 21824, dtype=np.uint16)
+    cloudy[0, 0] = 21824 | CLOUD
+    return [scene(5, 20.0), scene(21, 30.0, b5=1000), scene(7, 40.0, qa=cloudy)]
+
+
+def check_composite(comp):
+    lst, nd = comp.band("LST_p50"), comp.band("NDVI_p50")
+    # Mediana de 20, 30 y 40 °C; en (0, 0) la tercera escena está nublada: media de 20 y 30
+    np.testing.assert_allclose(lst[1:, :], 30.0, atol=0.01)
+    np.testing.assert_allclose(lst[0, 0], 25.0, atol=0.01)
+    # NDVI 0.5, 0.0 y 0.5 -> 0.5; en (0, 0) solo quedan 0.5 y 0.0
+    np.testing.assert_allclose(nd[1:, :], 0.5, atol=1e-6)
+    np.testing.assert_allclose(nd[0, 0], 0.25, atol=1e-6)
+    assert comp.count == 3
+    assert [row["LST_count"] for row in comp.scenes] == [30, 30, 29]
+
+
+def test_p50_composite_in_memory(sources):
+    check_composite(build_local_composite(sources, GRID, workers=2))
+
+
+def test_p50_composite_with_cube_on_disk(sources, tmp_path):
+    limit = 3 * 2**20
+    assert plan_cube(GRID.shape, len(sources), 2, 3, limit, workers=1).on_disk
+    comp = build_local_composite(sources, GRID, percentiles=(50, 75, 90), memory_limit=limit,
+                                 workers=1, scratch_dir=tmp_path)
+    check_composite(comp)
+    assert not list(tmp_path.glob("*.cube"))
+
+
+def test_roi_mask_leaves_outside_pixels_empty(sources):
+    roi = np.zeros(GRID.shape, dtype=bool)
+    roi[2:, 3:] = True
+    comp = build_local_composite(sources, GRID, roi_mask=roi)
+    lst = comp.band("LST_p50")
+    assert np.isfinite(lst[roi]).all()
+    assert np.isnan(lst[~roi]).all()
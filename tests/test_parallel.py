@@ -0,0 +1,57 @@
+# --------------------------------------------------------------
+# test_parallel.py — Trabajos en segundo plano y su traza
+# --------------------------------------------------------------
+
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from icu.parallel import JobGroup
+from icu.tracing import KIND_GEE, span, start_trace
+
+
+def gee_call(release=None):
+    if release is not None:
+        release.wait(5)
+    with span("getInfo", KIND_GEE) as info:
+        info.bytes = 10
+    return 1
+
+
+@pytest.fixture
+def pool():
+    executor = ThreadPoolExecutor(max_workers=2)
+    yield executor
+    executor.shutdown(wait=True)
+
+
+def test_job_finishing_after_its_render_is_counted_where_it_is_consumed(pool):
+    launching = start_trace(panel="Mapas")
+    release = threading.Event()
+    jobs = JobGroup(pool)
+    jobs.submit("a", gee_call, release)
+    jobs.then("b", "a", lambda _: gee_call())
+    launching.finish()
+    release.set()
+    jobs.wait(5)
+    assert launching.round_trips == 0
+
+    consuming = start_trace(panel="Mapas")
+    jobs.collect()
+    assert consuming.round_trips == 2 and consuming.gee_bytes == 20
+    # Lo ya sumado no se vuelve a contar en el render siguiente
+    following = start_trace()
+    jobs.collect()
+    assert following.round_trips == 0
+
+
+def test_collect_without_trace_keeps_the_spans(pool):
+    jobs = JobGroup(pool)
+    jobs.submit("a", gee_call)
+    jobs.wait(5)
+    contextvars.Context().run(jobs.collect)
+    trace = start_trace()
+    jobs.collect()
+    assert trace.round_trips == 1
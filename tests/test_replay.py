@@ -0,0 +1,117 @@
+# --------------------------------------------------------------
+# test_replay.py — Grabación y reproducción de consultas a GEE
+# Sin red ni credenciales: las expresiones son objetos con serialize()
+# y getInfo(), como los de ee, y la grabación vive en tmp_path.
+# --------------------------------------------------------------
+
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from icu import replay
+from icu.replay import (COMPUTE_PIXELS, GET_INFO, GET_MAP_ID, Recorder, Recording, Replayer, ReplayMiss,
+                        _decode, _encode, request_key)
+from icu.tracing import start_trace
+
+
+class Expr:
+    """Expresión de ee de mentira: serialize() la identifica, getInfo() la responde."""
+
+    def __init__(self, text, value=None):
+        self.text = text
+        self.value = value
+
+    def serialize(self):
+        return self.text
+
+    def getInfo(self):
+        return self.value
+
+
+def map_id(url="https://earthengine.googleapis.com/v1/projects/p/maps/abc/tiles/{z}/{x}/{y}"):
+    return {"mapid": "abc", "token": "", "tile_fetcher": SimpleNamespace(url_format=url), "image": object()}
+
+
+@pytest.fixture
+def recording(tmp_path):
+    return Recording(tmp_path / "grabacion")
+
+
+def test_compute_pixels_round_trip_keeps_band_fields():
+    pixels = np.zeros((3, 4), dtype=[("LST_p50", "<f4"), ("NDVI_p50", "<f4")])
+    pixels["LST_p50"] = np.arange(12, dtype=np.float32).reshape(3, 4)
+    pixels["NDVI_p50"][1, 2] = np.nan
+    out = _decode(COMPUTE_PIXELS, _encode(COMPUTE_PIXELS, pixels))
+    assert out.dtype == pixels.dtype and out.shape == pixels.shape
+    np.testing.assert_array_equal(out["LST_p50"], pixels["LST_p50"])
+    assert np.isnan(out["NDVI_p50"][1, 2])
+
+
+def test_map_id_round_trip_rebuilds_the_tile_fetcher():
+    value = map_id()
+    out = _decode(GET_MAP_ID, _encode(GET_MAP_ID, value))
+    assert out["mapid"] == "abc" and out["token"] == ""
+    assert out["tile_fetcher"].url_format == value["tile_fetcher"].url_format
+    assert "image" not in out and "url_format" not in out
+
+
+def test_get_info_round_trip():
+    value = {"count": 3, "LST_p50_mean": 31.5, "dates": ["2024-04-02"], "vacío": None}
+    assert _decode(GET_INFO, _encode(GET_INFO, value)) == value
+
+
+def test_request_key_is_stable():
+    expr = Expr('{"values": {"0": 1}}')
+    key = request_key(GET_MAP_ID, expr, {"min": 20, "max": 45, "palette": ["blue", "red"]})
+    assert key == request_key(GET_MAP_ID, Expr(expr.text), {"palette": ["blue", "red"], "max": 45, "min": 20})
+    assert key != request_key(GET_INFO, expr, {"min": 20, "max": 45, "palette": ["blue", "red"]})
+    assert key != request_key(GET_MAP_ID, expr, {"min": 20, "max": 40, "palette": ["blue", "red"]})
+    assert request_key(GET_INFO, expr) == request_key(GET_INFO, expr, {})
+
+
+def test_recording_put_get_and_miss(recording):
+    start_trace(panel="Mapas", locality="Teapa", start="2024-04-01", end="2024-05-30")
+    recording.put("k1", GET_INFO, {"count": 2}, 0.25)
+    recording.put("k2", GET_MAP_ID, map_id(), 0.5)
+    assert recording.get("k1") == ({"count": 2}, 0.25)
+    value, latency = recording.get("k2", GET_MAP_ID)
+    assert value["tile_fetcher"].url_format.endswith("{z}/{x}/{y}") and latency == 0.5
+    [(locality, start, end, count, size)] = recording.scenarios()
+    assert (locality, start, end, count) == ("Teapa", "2024-04-01", "2024-05-30", 2) and size > 0
+    with pytest.raises(ReplayMiss) as miss:
+        recording.get("sin-grabar", GET_INFO)
+    assert isinstance(miss.value, KeyError)
+    # Otra instancia sobre el mismo directorio ve lo grabado
+    assert Recording(recording.directory).get("k1")[0] == {"count": 2}
+
+
+def test_recorder_then_replayer_answer_the_same(recording, monkeypatch):
+    monkeypatch.setattr(recording, "save_algorithms", lambda: None)
+    expr = Expr("expresión", {"count": 5})
+    assert Recorder(recording).get_info(expr) == {"count": 5}
+    monkeypatch.setattr(replay.time, "sleep", lambda s: None)
+    assert Replayer(recording, latency=0).get_info(Expr("expresión")) == {"count": 5}
+    with pytest.raises(ReplayMiss):
+        Replayer(recording, latency=0).get_info(Expr("otra expresión"))
+
+
+def test_replayer_latency_override_and_jitter(recording, monkeypatch):
+    delays = []
+    monkeypatch.setattr(replay.time, "sleep", delays.append)
+    expr = Expr("expresión")
+    recording.put(request_key(GET_INFO, expr), GET_INFO, 1, 0.8)
+
+    Replayer(recording).get_info(expr)                          # latencia grabada
+    Replayer(recording, latency=0.2).get_info(expr)             # latencia fija
+    Replayer(recording, latency=0).get_info(expr)               # sin espera: no duerme
+    assert delays == [pytest.approx(0.8), pytest.approx(0.2)]
+
+    delays.clear()
+    for seed in (1, 1, 2):
+        player = Replayer(recording, latency=0.2, jitter=0.05, seed=seed)
+        for _ in range(20):
+            player.get_info(expr)
+    assert all(0.15 <= d <= 0.25 for d in delays)
+    # La misma semilla repite la misma secuencia de esperas
+    assert delays[:20] == delays[20:40] != delays[40:]
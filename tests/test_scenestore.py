@@ -0,0 +1,87 @@
+# --------------------------------------------------------------
+# test_scenestore.py — Almacén local de estadísticas por escena
+# GEE se reemplaza en icu.scenestore: la colección es la lista de IDs
+# pedidos y get_info cuenta las consultas y responde una fila por escena.
+# --------------------------------------------------------------
+
+import pytest
+
+from icu import scenestore
+from icu.scenestats import SceneStatsConfig
+from icu.scenestore import SceneStore
+
+# Escenas de prueba: ID -> (fecha, LST media); None = totalmente nublada
+SCENES = {
+    "LC08_20240405": ("2024-04-05", 33.0),
+    "LC08_20240421": ("2024-04-21", None),
+    "LC08_20240507": ("2024-05-07", 35.5),
+    "LC08_20240523": ("2024-05-23", 36.0),
+}
+TOTAL_PIXELS = 1000
+
+
+class FakeGee:
+    def __init__(self):
+        self.requested = []
+
+    def collection(self, roi, product_ids, config):
+        return list(product_ids)
+
+    def get_info(self, product_ids):
+        self.requested.append(sorted(product_ids))
+        features = []
+        for pid in product_ids:
+            date, lst = SCENES[pid]
+            props = {"product_id": pid, "date": date, "total_pixels": TOTAL_PIXELS}
+            # Escena nublada: reduceRegion devuelve nulos y conteo cero
+            props.update({"LST_mean": lst, "LST_count": 800 if lst is not None else 0,
+                          "NDVI_mean": 0.4 if lst is not None else None})
+            features.append({"type": "Feature", "geometry": None, "properties": props})
+        return {"type": "FeatureCollection", "features": features}
+
+
+@pytest.fixture
+def gee(monkeypatch):
+    fake = FakeGee()
+    monkeypatch.setattr(scenestore, "scene_stats_collection", fake.collection)
+    monkeypatch.setattr(scenestore, "get_info", fake.get_info)
+    return fake
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SceneStore(tmp_path / "escenas.sqlite")
+
+
+def test_superset_only_requests_missing_scenes(store, gee):
+    first = ["LC08_20240507", "LC08_20240405"]
+    rows = store.series("Teapa", None, first)
+    assert gee.requested == [sorted(first)]
+    assert [r["date"] for r in rows] == ["2024-04-05", "2024-05-07"]
+    assert rows[0]["LST_mean"] == 33.0 and rows[0]["valid_fraction"] == pytest.approx(0.8)
+
+    rows = store.series("Teapa", None, list(SCENES))
+    assert gee.requested[1] == ["LC08_20240421", "LC08_20240523"]
+    assert [r["product_id"] for r in rows] == sorted(SCENES)
+
+    # Todo guardado: ya no hay consulta
+    store.series("Teapa", None, list(SCENES))
+    assert len(gee.requested) == 2
+
+
+def test_clouded_scenes_are_stored_and_not_requested_again(store, gee):
+    rows = store.series("Teapa", None, ["LC08_20240421"])
+    assert rows[0]["LST_mean"] is None and rows[0]["NDVI_mean"] is None
+    assert rows[0]["valid_fraction"] == 0
+    assert store.known("Teapa", ["LC08_20240421"]) == {"LC08_20240421"}
+    store.series("Teapa", None, ["LC08_20240421"])
+    assert gee.requested == [["LC08_20240421"]]
+
+
+def test_records_are_kept_per_locality_and_config(store, gee):
+    store.series("Teapa", None, ["LC08_20240405"])
+    store.series("Villahermosa", None, ["LC08_20240405"])
+    other = SceneStatsConfig(stats=("mean",), bands=("LST",))
+    rows = store.series("Teapa", None, ["LC08_20240405"], other)
+    assert len(gee.requested) == 3
+    assert set(rows[0]) == {"product_id", "date", "valid_fraction", "LST_mean"}
@@ -0,0 +1,64 @@
+# --------------------------------------------------------------
+# test_session.py — Cortacircuitos de la sesión de GEE
+# --------------------------------------------------------------
+
+import threading
+
+import pytest
+
+from icu.session import CLOSED, HALF_OPEN, OPEN, GeeSession, GeeUnavailable
+
+
+def failing():
+    raise ConnectionError("503 service unavailable")
+
+
+def open_session():
+    session = GeeSession(retries=0, failure_threshold=1, cooldown=0.0)
+    with pytest.raises(GeeUnavailable):
+        session.call("get_info", lambda: "k", failing)
+    assert session.state == OPEN
+    return session
+
+
+def test_half_open_lets_a_single_probe_through():
+    session = open_session()
+    started, release = threading.Event(), threading.Event()
+
+    def probe():
+        started.set()
+        release.wait(5)
+        return "ok"
+
+    result = {}
+    thread = threading.Thread(target=lambda: result.update(value=session.call("get_info", lambda: "p", probe)))
+    thread.start()
+    assert started.wait(5)
+    assert session.state == HALF_OPEN
+    # Mientras la prueba no termina, las demás consultas no llegan a GEE
+    calls = []
+    with pytest.raises(GeeUnavailable):
+        session.call("get_info", lambda: "q", lambda: calls.append(1))
+    assert not calls
+    release.set()
+    thread.join(5)
+    assert result["value"] == "ok"
+    assert session.state == CLOSED
+    assert session.call("get_info", lambda: "q", lambda: "again") == "again"
+
+
+def test_failed_probe_reopens_and_serves_stale():
+    session = GeeSession(retries=0, failure_threshold=1, cooldown=0.0)
+    assert session.call("get_info", lambda: "k", lambda: "bueno") == "bueno"
+    assert session.call("get_info", lambda: "k", failing) == "bueno"
+    assert session.state == OPEN
+    assert session.call("get_info", lambda: "k", failing) == "bueno"     # la prueba falla
+    assert session.state == OPEN
+    assert not session.status()["probing"]
+
+
+def test_probe_flag_is_released_on_query_errors():
+    session = open_session()
+    with pytest.raises(ValueError):
+        session.call("get_info", lambda: "k", lambda: (_ for _ in ()).throw(ValueError("consulta inválida")))
+    assert session.state == CLOSED and not session.status()["probing"]
@@ -0,0 +1,69 @@
+# --------------------------------------------------------------
+# test_trend.py — Tendencia por píxel: p de la t y mínimos cuadrados
+# --------------------------------------------------------------
+
+import numpy as np
+import pytest
+
+from icu.trend import MIN_YEARS, array_trend, array_trend_stats, t_pvalue
+
+
+@pytest.mark.parametrize("t, df", [(12.706, 1), (4.303, 2), (2.776, 4), (2.228, 10), (2.042, 30)])
+def test_t_pvalue_matches_critical_values(t, df):
+    # Valores críticos bilaterales de la t de Student con alfa = 0.05
+    p = t_pvalue(np.array([t, -t]), np.array([df, df]))
+    np.testing.assert_allclose(p, 0.05, atol=2e-4)
+
+
+def test_t_pvalue_edges():
+    p = t_pvalue(np.array([0.0, 1e6, np.nan, 2.0]), np.array([5, 5, 5, 0]))
+    assert p[0] == pytest.approx(1.0)
+    assert p[1] == pytest.approx(0.0, abs=1e-9)
+    assert np.isnan(p[2]) and np.isnan(p[3])
+
+
+def test_array_trend_exact_slope_with_gaps():
+    years = np.arange(2014, 2024)
+    base = np.array([[0.5, -0.25], [0.0, 1.0]], dtype=np.float32)
+    stack = 30 + base * (years - years[0])[:, None, None].astype(np.float32)
+    stack[[1, 4, 7], 0, 0] = np.nan                  # huecos: sigue habiendo años de sobra
+    stack[MIN_YEARS - 1:, 1, 1] = np.nan             # menos de MIN_YEARS años con dato
+    stack[:, 1, 0] = np.nan                          # sin datos
+    slope, p_value, n = array_trend(years, stack)
+
+    assert slope.dtype == np.float32 and p_value.dtype == np.float32
+    np.testing.assert_array_equal(n, [[7, 10], [0, MIN_YEARS - 1]])
+    np.testing.assert_allclose(slope[0], [0.5, -0.25], atol=1e-5)
+    assert p_value[0, 0] < 1e-6 and p_value[0, 1] < 1e-6
+    for row, col in ((1, 0), (1, 1)):
+        assert np.isnan(slope[row, col]) and np.isnan(p_value[row, col])
+
+
+def test_array_trend_flat_series_is_not_significant():
+    years = np.arange(2015, 2021)
+    rng = np.random.default_rng(0)
+    stack = 30 + rng.normal(0, 0.01, size=(len(years), 1, 1))
+    stack[:, 0, 0] -= np.mean(stack[:, 0, 0]) - 30     # sin pendiente apreciable
+    slope, p_value, _ = array_trend(years, stack)
+    assert abs(slope[0, 0]) < 0.01 and p_value[0, 0] > 0.05
+
+
+def test_array_trend_stats_zone_counts():
+    slope = np.array([[0.3, 0.2, -0.4], [0.1, np.nan, -0.2]], dtype=np.float32)
+    p_value = np.array([[0.01, 0.2, 0.001], [0.04, np.nan, 0.5]], dtype=np.float32)
+    mask = np.array([[True, True, True], [False, True, True]])
+    stats = array_trend_stats(slope, p_value, mask)
+    # Fuera de la máscara no cuenta: (1, 0) es significativo pero queda fuera
+    assert stats["slope_count"] == 4
+    assert stats["warming_count"] == 1 and stats["warming_max"] == pytest.approx(0.3)
+    assert stats["cooling_count"] == 1 and stats["cooling_mean"] == pytest.approx(-0.4)
+    assert stats["slope_max"] == pytest.approx(0.3)
+    assert stats["slope_p50"] == pytest.approx(np.median([0.3, 0.2, -0.4, -0.2]))
+
+
+def test_array_trend_stats_empty_zones():
+    slope = np.array([[0.1, -0.1]], dtype=np.float32)
+    p_value = np.array([[0.5, 0.5]], dtype=np.float32)
+    stats = array_trend_stats(slope, p_value, np.ones(slope.shape, dtype=bool))
+    assert stats["warming_count"] == 0 and "warming_mean" not in stats
+    assert stats["cooling_count"] == 0 and stats["slope_count"] == 2